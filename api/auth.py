@@ -1,15 +1,19 @@
 from flask import Blueprint, request, jsonify, flash, redirect, url_for, render_template, session, make_response
 from services.github_service import GitHubService
-from utils.storage import StorageManager
+from utils.storage import get_storage
 from utils.auth import AuthManager
 import os
+import re
 
 # 创建蓝图
 auth_bp = Blueprint('auth', __name__)
 
 # 初始化服务
 auth_manager = AuthManager()
-storage = StorageManager()
+storage = get_storage()
+
+# 用户管理页面每页显示的用户数
+WHITELIST_PAGE_SIZE = 50
 
 def get_github_service():
     """获取当前用户的 GitHub 服务实例"""
@@ -172,15 +176,18 @@ def login_page():
                                  username=username,
                                  messages={})
         
+        # 一次检查白名单和管理员权限
+        access = auth_manager.get_user_access(username)
+        
         # 检查用户是否在白名单中
-        if not auth_manager.is_user_allowed(username):
+        if not access['allowed']:
             return render_template('login.html', 
                                  error='当前您不在白名单中，请联系管理员',
                                  username=username,
                                  messages={})
         
         # 检查是否为管理员
-        is_admin = auth_manager.is_user_admin(username)
+        is_admin = access['admin']
         
         # 记录用户登录统计
         storage.record_user_login(username)
@@ -393,26 +400,120 @@ def user_management():
         flash('您没有管理员权限', 'error')
         return redirect(url_for('index'))
     
-    # 获取用户白名单
-    whitelist = storage.get_user_whitelist()
+    # 分页读取白名单用户
+    page = request.args.get('page', 1, type=int)
+    query = request.args.get('q', '').strip()
+    whitelist = storage.list_whitelist_users(page, WHITELIST_PAGE_SIZE, query)
+    whitelist['query'] = query
+    whitelist['total_pages'] = max((whitelist['total'] + WHITELIST_PAGE_SIZE - 1) // WHITELIST_PAGE_SIZE, 1)
     
-    # 获取用户统计信息
-    user_stats = storage.get_user_stats()
-    
-    # 获取今日登录次数
-    import datetime
-    today = datetime.datetime.now().strftime('%Y-%m-%d')
-    today_logins = user_stats.get('daily_stats', {}).get(today, {}).get('logins', 0)
+    # 只读取页面展示的登录汇总（总次数、今日 / 本周 / 本月次数和本页用户的计数）
+    summary = storage.get_login_summary([user['username'] for user in whitelist['users']])
     
     # 合并数据
-    whitelist['user_stats'] = user_stats.get('user_stats', {})
+    whitelist['user_stats'] = summary['user_stats']
     whitelist['stats'] = {
-        'total_logins': user_stats.get('total_logins', 0),
-        'today_logins': today_logins
+        'total_logins': summary['total_logins'],
+        'today_logins': summary['today_logins'],
+        'week_logins': summary['week_logins'],
+        'month_logins': summary['month_logins']
     }
     
     return render_template('user_management.html', whitelist=whitelist)
 
+@auth_bp.route('/api/whitelist', methods=['GET'])
+def api_list_whitelist():
+    """分页列出白名单用户 API（?page=&per_page=&q=用户名前缀）"""
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': '您没有管理员权限'}), 403
+    
+    try:
+        result = storage.list_whitelist_users(request.args.get('page', 1, type=int),
+                                              request.args.get('per_page', WHITELIST_PAGE_SIZE, type=int),
+                                              request.args.get('q', ''))
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'获取白名单失败: {str(e)}'}), 500
+
+@auth_bp.route('/api/whitelist/batch', methods=['POST'])
+def api_batch_whitelist():
+    """批量添加 / 移除白名单用户 API
+    
+    请求体: {"action": "add" | "remove", "usernames": [...], "is_admin": false}
+    """
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': '您没有管理员权限'}), 403
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': '请求体必须是 JSON 对象'}), 400
+    
+    action = data.get('action')
+    usernames = data.get('usernames')
+    is_admin = data.get('is_admin', False)
+    if action not in ('add', 'remove'):
+        return jsonify({'success': False, 'error': 'action 必须是 add 或 remove'}), 400
+    if not isinstance(usernames, list) or not all(isinstance(name, str) for name in usernames):
+        return jsonify({'success': False, 'error': 'usernames 必须是用户名字符串数组'}), 400
+    if not isinstance(is_admin, bool):
+        return jsonify({'success': False, 'error': 'is_admin 必须是布尔值'}), 400
+    
+    usernames = [name.strip() for name in usernames if name.strip()]
+    if not usernames:
+        return jsonify({'success': False, 'error': '请提供 usernames'}), 400
+    invalid = [name for name in usernames if not re.fullmatch(AuthManager.USERNAME_PATTERN, name)]
+    if invalid:
+        return jsonify({'success': False, 'error': f"无效的用户名: {', '.join(invalid[:10])}", 'invalid': invalid}), 400
+    
+    if action == 'add':
+        result = storage.add_whitelist_users({name: is_admin for name in usernames})
+    else:
+        # 防止管理员移除自己
+        current_user = session.get('username', '').lower()
+        result = storage.remove_whitelist_users([name for name in usernames if name.lower() != current_user])
+    return jsonify(result), (200 if result['success'] else 500)
+
+@auth_bp.route('/api/storage/stats', methods=['GET'])
+def api_storage_stats():
+    """存储运行统计 API（管理员）：存储类型和本进程条件写入的冲突统计"""
+    if not session.get('is_admin', False):
+        return jsonify({'success': False, 'error': '您没有管理员权限'}), 403
+    
+    return jsonify({
+        'success': True,
+        'storage_type': storage.storage_type,
+        'contention': storage.get_contention_stats()
+    })
+
+@auth_bp.route('/import-users', methods=['POST'])
+def import_users_to_whitelist():
+    """从 CSV 文件批量导入白名单用户"""
+    if 'username' not in session or not session.get('is_admin', False):
+        session['login_error'] = '您没有管理员权限'
+        return redirect(url_for('auth.login_page'))
+    
+    upload = request.files.get('csv_file')
+    if not upload or not upload.filename:
+        flash('请选择 CSV 文件', 'error')
+        return redirect(url_for('auth.user_management'))
+    
+    try:
+        content = upload.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        flash('CSV 文件需要使用 UTF-8 编码', 'error')
+        return redirect(url_for('auth.user_management'))
+    
+    result = auth_manager.import_whitelist_csv(content)
+    if result['success']:
+        message = f"导入完成：{result['imported']} 个用户，新增 {result['added']} 个"
+        if result['invalid']:
+            message += f"，跳过 {len(result['invalid'])} 个无效用户名"
+        flash(message, 'success')
+    else:
+        flash(result['error'], 'error')
+    
+    return redirect(url_for('auth.user_management'))
+
 @auth_bp.route('/add-user', methods=['POST'])
 def add_user_to_whitelist():
     """添加用户到白名单"""
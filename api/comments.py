@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from services.github_service import GitHubService
 from utils.auth import AuthManager
+from utils.etag import conditional_json, version_stamp
 import os
 
 # 创建蓝图
@@ -17,6 +18,8 @@ def get_github_service():
     return GitHubService(github_token)
 
 @comments_bp.route('/api/repos/<path:repo_full_name>/issues/<int:issue_number>/comments', methods=['GET'])
+@conditional_json(scope=lambda repo_full_name, issue_number: repo_full_name,
+                  version=lambda result: version_stamp(result.get('data')))
 def api_get_comments(repo_full_name, issue_number):
     """获取 Issue 的所有评论"""
     github_service = get_github_service()
@@ -28,7 +31,7 @@ def api_get_comments(repo_full_name, issue_number):
     
     try:
         result = github_service.get_issue_comments(repo_full_name, issue_number)
-        return jsonify(result)
+        return result
     except Exception as e:
         return jsonify({
             'success': False,
@@ -69,6 +72,8 @@ def api_create_comment(repo_full_name, issue_number):
         }), 500
 
 @comments_bp.route('/api/repos/<path:repo_full_name>/comments/<int:comment_id>', methods=['GET'])
+@conditional_json(scope=lambda repo_full_name, comment_id: repo_full_name,
+                  version=lambda result: version_stamp([result.get('data') or {}]))
 def api_get_comment(repo_full_name, comment_id):
     """获取单个评论详情"""
     github_service = get_github_service()
@@ -80,7 +85,7 @@ def api_get_comment(repo_full_name, comment_id):
     
     try:
         result = github_service.get_comment(repo_full_name, comment_id)
-        return jsonify(result)
+        return result
     except Exception as e:
         return jsonify({
             'success': False,
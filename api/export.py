@@ -0,0 +1,225 @@
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
+from utils.data_exporter import DataExporter
+from utils.export_jobs import export_jobs
+
+# 创建蓝图
+export_bp = Blueprint('export', __name__)
+
+@export_bp.before_request
+def require_login():
+    """导出接口只对已登录用户开放（使用用户自己的 GitHub Token）"""
+    if 'github_token' not in session:
+        return jsonify({
+            'success': False,
+            'error': '请先登录'
+        }), 401
+
+def get_export_token():
+    """获取导出使用的 GitHub Token（当前登录用户的 Token）"""
+    return session['github_token']
+
+@export_bp.route('/api/export/repos', methods=['GET'])
+def api_get_exportable_repos():
+    """获取可导出的仓库列表"""
+    try:
+        exporter = DataExporter(get_export_token(), session.get('username'))
+        repos = exporter.get_available_repos(session.get('is_admin', False))
+        return jsonify({
+            'success': True,
+            'repos': repos
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'获取仓库列表失败: {str(e)}'
+        }), 500
+
+@export_bp.route('/api/export/<path:repo_full_name>', methods=['POST'])
+def api_export_repo_data(repo_full_name):
+    """导出仓库数据（边获取边流式写出）"""
+    try:
+        data = request.get_json(silent=True) or {}
+        export_format = data.get('format', 'json').lower()
+        export_mode = data.get('mode', 'full')
+        
+        # 验证导出格式
+        if export_format not in DataExporter.EXPORT_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f'不支持的导出格式: {export_format}'
+            }), 400
+        
+        # 执行导出（仓库信息在这里获取，Issues 在写出响应时逐页获取）
+        exporter = DataExporter(get_export_token(), session.get('username'))
+        result = exporter.stream_repo_data(repo_full_name, export_format, export_mode)
+        
+        if not result.get('success'):
+            return jsonify(result), 400
+        
+        return Response(
+            stream_with_context(result['stream']),
+            mimetype=result['content_type'],
+            headers={
+                'Content-Disposition': f'attachment; filename="{result["filename"]}"',
+                'X-Export-Cache': 'hit' if result.get('cached') else 'miss'
+            }
+        )
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'导出数据时发生错误: {str(e)}'
+        }), 500
+
+def get_job_or_404(job_id):
+    """获取当前用户的导出任务，不存在时返回错误响应"""
+    username = session.get('username')
+    if not username:
+        return None, (jsonify({
+            'success': False,
+            'error': '请先登录'
+        }), 401)
+    
+    job = export_jobs.get_job(job_id, username)
+    if not job:
+        return None, (jsonify({
+            'success': False,
+            'error': '导出任务不存在'
+        }), 404)
+    
+    return job, None
+
+def get_requested_repos(data):
+    """解析请求中的仓库列表（repos 为 "all" 时为当前用户可见的所有仓库），参数无效时返回 None"""
+    repos = data.get('repos') or ([data['repo']] if data.get('repo') else [])
+    if repos == 'all':
+        exporter = DataExporter(get_export_token(), session.get('username'))
+        repos = [repo['full_name'] for repo in exporter.get_available_repos(session.get('is_admin', False))]
+    
+    if not isinstance(repos, list) or not all(isinstance(repo, str) and repo.strip() for repo in repos):
+        return None
+    return [repo.strip() for repo in repos]
+
+@export_bp.route('/api/export/estimate', methods=['POST'])
+def api_estimate_export():
+    """预估导出的 API 请求数、耗时和文件大小（不实际导出）"""
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        repos = get_requested_repos(data)
+        if not repos:
+            return jsonify({
+                'success': False,
+                'error': '缺少必要的参数'
+            }), 400
+        
+        exporter = DataExporter(get_export_token(), session.get('username'))
+        result = exporter.estimate_exports(repos, data.get('format', 'json'), data.get('mode', 'full'))
+        if not result.get('success'):
+            return jsonify(result), 400
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'预估导出开销失败: {str(e)}'
+        }), 500
+
+@export_bp.route('/api/export/jobs', methods=['POST'])
+def api_create_export_job():
+    """创建后台导出任务"""
+    username = session.get('username')
+    if not username:
+        return jsonify({
+            'success': False,
+            'error': '请先登录'
+        }), 401
+    
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        repos = get_requested_repos(data)
+        if repos is None:
+            return jsonify({
+                'success': False,
+                'error': '缺少必要的参数'
+            }), 400
+        
+        result = export_jobs.create_job(
+            get_export_token(),
+            username,
+            repos,
+            data.get('format', 'json'),
+            data.get('mode', 'full')
+        )
+        if not result.get('success'):
+            return jsonify(result), 400
+        return jsonify(result), 201
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'创建导出任务失败: {str(e)}'
+        }), 500
+
+@export_bp.route('/api/export/jobs/<job_id>', methods=['GET'])
+def api_get_export_job(job_id):
+    """获取导出任务进度"""
+    job, error = get_job_or_404(job_id)
+    if error:
+        return error
+    
+    return jsonify({
+        'success': True,
+        'job': export_jobs.get_progress(job)
+    })
+
+@export_bp.route('/api/export/jobs/<job_id>/step', methods=['POST'])
+def api_run_export_job(job_id):
+    """在时间预算内继续执行导出任务，并返回最新进度"""
+    job, error = get_job_or_404(job_id)
+    if error:
+        return error
+    
+    try:
+        job = export_jobs.run_steps(job, get_export_token())
+        return jsonify({
+            'success': True,
+            'job': export_jobs.get_progress(job)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'执行导出任务失败: {str(e)}'
+        }), 500
+
+@export_bp.route('/api/export/jobs/<job_id>/download', methods=['GET'])
+def api_download_export_job(job_id):
+    """下载已完成的导出文件"""
+    job, error = get_job_or_404(job_id)
+    if error:
+        return error
+    
+    if job['status'] != 'completed':
+        return jsonify({
+            'success': False,
+            'error': '导出任务尚未完成'
+        }), 409
+    
+    artifact = export_jobs.stream_artifact(job)
+    return Response(
+        stream_with_context(artifact['stream']),
+        mimetype=artifact['content_type'],
+        headers={
+            'Content-Disposition': f'attachment; filename="{artifact["filename"]}"'
+        }
+    )
+
+@export_bp.route('/api/export/jobs/<job_id>', methods=['DELETE'])
+def api_delete_export_job(job_id):
+    """删除导出任务及其数据"""
+    job, error = get_job_or_404(job_id)
+    if error:
+        return error
+    
+    return jsonify({
+        'success': export_jobs.delete_job(job)
+    })
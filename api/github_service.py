@@ -1,8 +1,11 @@
 import requests
 from github import Github
+from github.IssueComment import IssueComment
+from github.PaginatedList import PaginatedList
 from datetime import datetime
 import json
 import os
+from urllib.parse import parse_qs, urlparse
 
 class GitHubService:
     def __init__(self, token=None):
@@ -135,21 +138,7 @@ class GitHubService:
                 if issue.pull_request:
                     continue
                 
-                issues_list.append({
-                    'number': issue.number,
-                    'title': issue.title,
-                    'body': issue.body,
-                    'state': issue.state,
-                    'user': {
-                        'login': issue.user.login,
-                        'avatar_url': issue.user.avatar_url
-                    },
-                    'labels': [{'name': label.name, 'color': label.color} for label in issue.labels],
-                    'created_at': issue.created_at.isoformat(),
-                    'updated_at': issue.updated_at.isoformat(),
-                    'comments_count': issue.comments,
-                    'html_url': issue.html_url
-                })
+                issues_list.append(self._format_issue(issue))
             
             return {
                 'success': True,
@@ -162,6 +151,143 @@ class GitHubService:
                 'error': str(e)
             }
     
+    def iter_issues(self, repo_full_name, state='all', since=None, per_page=100):
+        """逐页迭代仓库的所有 Issues（跳过 Pull Requests），边获取边产出
+        
+        按创建时间升序遍历，导出过程中 Issue 被更新也不会导致分页错位
+        """
+        repo = self.github.get_repo(repo_full_name)
+        self.github.per_page = per_page
+        
+        kwargs = {'state': state, 'sort': 'created', 'direction': 'asc'}
+        if since:
+            kwargs['since'] = self._parse_since(since)
+        
+        for issue in repo.get_issues(**kwargs):
+            if issue.pull_request:
+                continue
+            yield self._format_issue(issue)
+    
+    def iter_repo_comments(self, repo_full_name, since=None, per_page=100):
+        """逐页迭代仓库内所有 Issue 的评论（一次请求最多 100 条）
+        
+        Yields:
+            (issue_number, 评论字典) 元组
+        """
+        repo = self.github.get_repo(repo_full_name, lazy=True)
+        self.github.per_page = per_page
+        
+        kwargs = {'sort': 'created', 'direction': 'asc'}
+        if since:
+            kwargs['since'] = self._parse_since(since)
+        
+        for comment in repo.get_issues_comments(**kwargs):
+            # issue_url 形如 https://api.github.com/repos/owner/repo/issues/123
+            issue_number = int(comment.issue_url.rstrip('/').rsplit('/', 1)[-1])
+            yield issue_number, self._format_comment(comment)
+    
+    def get_issues_page(self, repo_full_name, page, state='all', since=None, per_page=100):
+        """获取 Issues 列表的一页（按创建时间升序，跳过 Pull Requests）
+        
+        Args:
+            page: 页码（从 0 开始）
+        
+        Returns:
+            data 为该页的 Issue 列表，has_more 表示是否还有下一页
+        """
+        try:
+            repo = self.github.get_repo(repo_full_name, lazy=True)
+            self.github.per_page = per_page
+            
+            kwargs = {'state': state, 'sort': 'created', 'direction': 'asc'}
+            if since:
+                kwargs['since'] = self._parse_since(since)
+            
+            items = repo.get_issues(**kwargs).get_page(page)
+            
+            return {
+                'success': True,
+                'data': [self._format_issue(issue) for issue in items if not issue.pull_request],
+                'has_more': len(items) >= per_page
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def get_repo_comments_page(self, repo_full_name, page, since=None, per_page=100):
+        """获取仓库级评论列表的一页（按创建时间升序）
+        
+        Args:
+            page: 页码（从 0 开始）
+        
+        Returns:
+            data 为 [issue_number, 评论字典] 列表，has_more 表示是否还有下一页
+        """
+        try:
+            repo = self.github.get_repo(repo_full_name, lazy=True)
+            self.github.per_page = per_page
+            
+            kwargs = {'sort': 'created', 'direction': 'asc'}
+            if since:
+                kwargs['since'] = self._parse_since(since)
+            
+            items = repo.get_issues_comments(**kwargs).get_page(page)
+            
+            return {
+                'success': True,
+                'data': [
+                    [int(comment.issue_url.rstrip('/').rsplit('/', 1)[-1]), self._format_comment(comment)]
+                    for comment in items
+                ],
+                'has_more': len(items) >= per_page
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _parse_since(self, since):
+        """将 ISO 8601 字符串转换为 PyGithub 需要的 datetime（UTC）"""
+        if isinstance(since, datetime):
+            return since
+        return datetime.fromisoformat(since.replace('Z', '+00:00')).replace(tzinfo=None)
+    
+    def _format_issue(self, issue):
+        """将 Issue 对象转换为字典"""
+        return {
+            'number': issue.number,
+            'title': issue.title,
+            'body': issue.body,
+            'state': issue.state,
+            'user': {
+                'login': issue.user.login,
+                'avatar_url': issue.user.avatar_url
+            },
+            'labels': [{'name': label.name, 'color': label.color} for label in issue.labels],
+            'created_at': issue.created_at.isoformat(),
+            'updated_at': issue.updated_at.isoformat(),
+            'closed_at': issue.closed_at.isoformat() if issue.closed_at else None,
+            'comments_count': issue.comments,
+            'html_url': issue.html_url
+        }
+    
+    def _format_comment(self, comment):
+        """将评论对象转换为字典"""
+        return {
+            'id': comment.id,
+            'body': comment.body,
+            'user': {
+                'login': comment.user.login,
+                'avatar_url': comment.user.avatar_url
+            },
+            'created_at': comment.created_at.isoformat(),
+            'updated_at': comment.updated_at.isoformat(),
+            'html_url': comment.html_url
+        }
+    
     def update_issue(self, repo_full_name, issue_number, body):
         """更新 Issue 内容"""
         try:
@@ -272,26 +398,137 @@ class GitHubService:
                     'error': f'删除评论失败: {str(e2)}'
                 }
     
+    def get_rate_limit_status(self):
+        """获取当前 Token 的 API 速率限制状态（优先使用最近一次响应头中的数据）"""
+        remaining, limit = self.github.rate_limiting
+        return {
+            'remaining': remaining,
+            'limit': limit,
+            'reset': self.github.rate_limiting_resettime
+        }
+    
+    def probe_repo_freshness(self, repo_full_name, previous=None):
+        """用条件请求探测仓库的 Issues 和评论是否有变化
+        
+        分别获取最近更新的一个 Issue 和一条评论（per_page=1），带上一次的 ETag 发起请求，
+        未变化时 GitHub 返回 304（不消耗速率额度）。
+        只能发现新建和更新，删除较早的 Issue 或评论探测不到，由导出缓存的最长有效期兜底
+        
+        Args:
+            previous: 上一次的探测结果（包含 etags 和 values）
+        
+        Returns:
+            values 为最近更新的 Issue / 评论的 [id, updated_at]，etags 为本次响应的 ETag
+        """
+        previous = previous or {}
+        base_url = f'https://api.github.com/repos/{repo_full_name}/issues'
+        urls = {
+            'issue': f'{base_url}?state=all&sort=updated&direction=desc&per_page=1',
+            'comment': f'{base_url}/comments?sort=updated&direction=desc&per_page=1'
+        }
+        
+        etags = {}
+        values = {}
+        try:
+            for name, url in urls.items():
+                headers = {'Accept': 'application/vnd.github.v3+json'}
+                etag = previous.get('etags', {}).get(name)
+                if etag:
+                    headers['If-None-Match'] = etag
+                
+                response = self.session.get(url, headers=headers, timeout=10)
+                
+                if response.status_code == 304:
+                    etags[name] = etag
+                    values[name] = previous.get('values', {}).get(name)
+                    continue
+                if response.status_code != 200:
+                    return {
+                        'success': False,
+                        'error': f'HTTP {response.status_code}'
+                    }
+                
+                items = response.json()
+                etags[name] = response.headers.get('ETag')
+                values[name] = [items[0]['id'], items[0]['updated_at']] if items else None
+            
+            return {
+                'success': True,
+                'etags': etags,
+                'values': values
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def count_repo_items(self, repo_full_name, since=None):
+        """用 per_page=1 的请求统计仓库的 Issues、Pull Requests 和评论数量
+
+        每个列表只请求一条数据，从 Link 头中 rel="last" 的页码得到总数，共 3 个请求。
+        指定 since 时统计该时间之后更新的 Issues 和评论（Pull Requests 列表不支持 since，不单独统计）
+
+        Returns:
+            data 为 {'issues', 'pull_requests', 'comments'}，issues 已扣除 Pull Requests；
+            rate_limit 为最后一次响应头中的速率额度
+        """
+        base_url = f'https://api.github.com/repos/{repo_full_name}'
+        since_params = {'since': since} if since else {}
+        requests_to_send = {
+            'issues': (f'{base_url}/issues', {'state': 'all', 'per_page': 1, **since_params}),
+            'comments': (f'{base_url}/issues/comments', {'per_page': 1, **since_params})
+        }
+        if not since:
+            requests_to_send['pull_requests'] = (f'{base_url}/pulls', {'state': 'all', 'per_page': 1})
+
+        counts = {'pull_requests': 0}
+        rate_limit = None
+        try:
+            for name, (url, params) in requests_to_send.items():
+                response = self.session.get(url, params=params, timeout=10,
+                                            headers={'Accept': 'application/vnd.github.v3+json'})
+                if response.status_code != 200:
+                    return {
+                        'success': False,
+                        'error': f'HTTP {response.status_code}'
+                    }
+
+                last = response.links.get('last', {}).get('url')
+                if last:
+                    counts[name] = int(parse_qs(urlparse(last).query)['page'][0])
+                else:
+                    counts[name] = len(response.json())
+
+                if 'X-RateLimit-Remaining' in response.headers:
+                    rate_limit = {
+                        'remaining': int(response.headers['X-RateLimit-Remaining']),
+                        'limit': int(response.headers.get('X-RateLimit-Limit', 0)),
+                        'reset': int(response.headers.get('X-RateLimit-Reset', 0))
+                    }
+
+            # Issues 列表中包含 Pull Requests
+            counts['issues'] = max(counts['issues'] - counts['pull_requests'], 0)
+            return {
+                'success': True,
+                'data': counts,
+                'rate_limit': rate_limit
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
     def get_issue_comments(self, repo_full_name, issue_number):
         """获取 Issue 的所有评论"""
         try:
-            repo = self.github.get_repo(repo_full_name)
-            issue = repo.get_issue(issue_number)
-            comments = issue.get_comments()
+            # 直接分页请求评论列表：不单独获取仓库和 Issue
+            repo = self.github.get_repo(repo_full_name, lazy=True)
+            self.github.per_page = 100
+            comments = PaginatedList(IssueComment, repo._requester, f'{repo.url}/issues/{issue_number}/comments', None)
             
-            comments_list = []
-            for comment in comments:
-                comments_list.append({
-                    'id': comment.id,
-                    'body': comment.body,
-                    'user': {
-                        'login': comment.user.login,
-                        'avatar_url': comment.user.avatar_url
-                    },
-                    'created_at': comment.created_at.isoformat(),
-                    'updated_at': comment.updated_at.isoformat(),
-                    'html_url': comment.html_url
-                })
+            comments_list = [self._format_comment(comment) for comment in comments]
             
             return {
                 'success': True,
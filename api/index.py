@@ -9,15 +9,21 @@ from github import Github
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.github_service import GitHubService
-from utils.storage import StorageManager
+from utils.storage import get_storage
 from utils.auth import AuthManager
 from utils.helpers import format_datetime, render_markdown, truncate_text, get_label_style
+from utils.fragment_cache import fragment_cache
+from utils.etag import etag_registry, conditional_json, version_stamp
+from utils.compression import compressor
+from utils.assets import asset_manifest
 
 # 导入蓝图
 from api.repos import repos_bp
 from api.issues import issues_bp
 from api.comments import comments_bp
 from api.auth import auth_bp
+from api.markdown import markdown_bp
+from api.export import export_bp
 
 def get_resource_path(relative_path):
     """获取资源文件的绝对路径，支持 Vercel 部署"""
@@ -51,9 +57,24 @@ def create_app():
     app.register_blueprint(issues_bp)
     app.register_blueprint(comments_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(markdown_bp)
+    app.register_blueprint(export_bp)
+    
+    # 模板片段缓存
+    fragment_cache.init_app(app)
+    
+    # JSON 接口的 ETag 失效钩子（存储中的仓库 / 白名单变更时使 'repos' 作用域失效）
+    etag_registry.init_app(app)
+    get_storage().add_invalidation_listener(etag_registry.invalidate)
+    
+    # HTML / JSON 响应压缩（br > gzip）
+    compressor.init_app(app)
+    
+    # 静态资源指纹与预压缩（url_for('static') 解析为带哈希的文件名）
+    asset_manifest.init_app(app)
     
     # 初始化服务
-    storage = StorageManager()
+    storage = get_storage()
     auth_manager = AuthManager()
     
     def get_github_service():
@@ -69,29 +90,17 @@ def create_app():
         from flask import session
         
         # 使用 StorageManager
-        storage = StorageManager()
-        repos_data = storage.get_repos()
-        
-        # 检查是否已存在
-        for repo in repos_data.get('repositories', []):
-            if repo.get('full_name') == repo_data['full_name']:
-                return False, '仓库已存在'
+        storage = get_storage()
         
         # 添加元数据
         repo_data['added_at'] = datetime.now().isoformat()
         repo_data['added_by'] = session.get('username', '')
         
-        # 确保列表存在
-        if 'repositories' not in repos_data:
-            repos_data['repositories'] = []
-            
-        repos_data['repositories'].append(repo_data)
-        
-        # 保存
-        if storage.save_repos(repos_data):
+        # 只写入该仓库（存在性检查由存储完成）
+        result = storage.add_repo(repo_data)
+        if result['success']:
             return True, '仓库添加成功'
-        else:
-            return False, '保存仓库信息失败'
+        return False, result['error']
 
     # 模板过滤器
     @app.template_filter('datetime')
@@ -156,24 +165,14 @@ def create_app():
                     result['data']['added_by'] = username
                     result['data']['is_default'] = True  # 标记为默认仓库
                     
-                    # 获取所有仓库数据
-                    all_repos = storage.get_repos()
-                    if 'repositories' not in all_repos:
-                        all_repos['repositories'] = []
+                    add_result = storage.add_repo(result['data'])
                     
-                    # 检查是否已存在
-                    exists = any(r.get('full_name') == result['data']['full_name'] 
-                               for r in all_repos['repositories'])
-                    
-                    if not exists:
-                        all_repos['repositories'].append(result['data'])
-                        
-                        if storage.save_repos(all_repos):
-                            print(f"✅ 默认仓库 {default_repo_url} 添加成功")
-                            # 重新获取用户仓库（包含新添加的默认仓库）
-                            repos_data = storage.get_user_repos(username, is_admin)
-                        else:
-                            print(f"❌ 保存默认仓库失败")
+                    if add_result['success']:
+                        print(f"✅ 默认仓库 {default_repo_url} 添加成功")
+                        # 重新获取用户仓库（包含新添加的默认仓库）
+                        repos_data = storage.get_user_repos(username, is_admin)
+                    elif not add_result.get('exists'):
+                        print(f"❌ 保存默认仓库失败")
                     else:
                         print(f"ℹ️ 默认仓库已存在")
                         # 重新获取（可能其他用户添加过）
@@ -198,10 +197,12 @@ def create_app():
                              user=user_data)
 
     @app.route('/api/my_repos')
+    @conditional_json(scope=lambda: 'repos',
+                      version=lambda result: f"{result['is_admin']}:{result['last_updated']}:{version_stamp(result['repositories'], 'full_name')}")
     def api_my_repos():
         """获取当前用户的仓库列表（前端渲染专用）"""
         from flask import session
-        from utils.storage import StorageManager
+        from utils.storage import get_storage
         
         # 1. 获取用户信息
         username = session.get('username')
@@ -211,7 +212,7 @@ def create_app():
             return jsonify({'success': False, 'error': '未登录'}), 401
             
         # 2. 获取数据
-        storage = StorageManager()
+        storage = get_storage()
         repos_data = storage.get_user_repos(username, is_admin)
         
         repos = repos_data.get('repositories', [])
@@ -241,13 +242,14 @@ def create_app():
             repos.append(injected_repo)
         
         # 3. 返回 JSON
-        return jsonify({
+        return {
             'success': True,
             'count': len(repos),
             'username': username,
             'is_admin': is_admin,
+            'last_updated': repos_data.get('last_updated', ''),
             'repositories': repos
-        })
+        }
     
     # 设置引导页面
     @app.route('/setup')
@@ -318,30 +320,17 @@ def create_app():
     @app.route('/remove_repo/<path:repo_full_name>')
     def remove_repository(repo_full_name):
         """删除仓库"""
-        repos_data = storage.get_repos()
-        original_count = len(repos_data.get('repositories', []))
-        
-        repos_data['repositories'] = [
-            repo for repo in repos_data.get('repositories', [])
-            if repo.get('full_name') != repo_full_name
-        ]
+        result = storage.remove_repo(repo_full_name)
         
-        if len(repos_data['repositories']) < original_count:
-            if storage.save_repos(repos_data):
-                flash('仓库删除成功', 'success')
-            else:
-                flash('保存更改失败', 'error')
-        else:
+        if result['success']:
+            flash('仓库删除成功', 'success')
+        elif result.get('not_found'):
             flash('未找到要删除的仓库', 'error')
+        else:
+            flash(result['error'], 'error')
         
         return redirect(url_for('index'))
     
-    # 静态文件路由
-    @app.route('/static/<path:filename>')
-    def static_files(filename):
-        """提供静态文件"""
-        return send_from_directory(app.static_folder, filename)
-    
     # 错误处理
     @app.errorhandler(404)
     def not_found(error):
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, render_template, session
 from services.github_service import GitHubService
 from utils.auth import AuthManager
+from utils.etag import conditional_json, version_stamp
 import os
 
 # 创建蓝图
@@ -111,6 +112,8 @@ def issue_edit_page(repo_full_name, issue_number):
 
 # API 路由
 @issues_bp.route('/api/repos/<path:repo_full_name>/issues', methods=['GET'])
+@conditional_json(scope=lambda repo_full_name: repo_full_name,
+                  version=lambda result: f"{version_stamp(result.get('data'), 'number')}:{result.get('total_count')}")
 def api_get_issues(repo_full_name):
     """获取仓库 Issues API"""
     github_service = get_github_service()
@@ -129,7 +132,7 @@ def api_get_issues(repo_full_name):
         page=page, 
         per_page=20
     )
-    return jsonify(result)
+    return result
 
 @issues_bp.route('/api/repos/<path:repo_full_name>/issues', methods=['POST'])
 def api_create_issue(repo_full_name):
@@ -175,6 +178,8 @@ def api_create_issue(repo_full_name):
         }), 500
 
 @issues_bp.route('/api/repos/<path:repo_full_name>/issues/<int:issue_number>', methods=['GET'])
+@conditional_json(scope=lambda repo_full_name, issue_number: repo_full_name,
+                  version=lambda result: version_stamp([result.get('data') or {}], 'number'))
 def api_get_issue_detail(repo_full_name, issue_number):
     """获取 Issue 详情 API"""
     github_service = get_github_service()
@@ -185,7 +190,7 @@ def api_get_issue_detail(repo_full_name, issue_number):
         }), 401
     
     result = github_service.get_issue_detail(repo_full_name, issue_number)
-    return jsonify(result)
+    return result
 
 @issues_bp.route('/api/repos/<path:repo_full_name>/issues/<int:issue_number>', methods=['PUT'])
 def api_update_issue(repo_full_name, issue_number):
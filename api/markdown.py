@@ -0,0 +1,45 @@
+from flask import Blueprint, request, jsonify, session
+from utils.markdown_preview import preview_renderer
+
+# 创建蓝图
+markdown_bp = Blueprint('markdown', __name__)
+
+@markdown_bp.route('/api/markdown/preview', methods=['POST'])
+def api_markdown_preview():
+    """渲染 Markdown 预览（按块增量渲染）"""
+    if 'github_token' not in session:
+        return jsonify({
+            'success': False,
+            'error': '请先登录'
+        }), 401
+
+    data = request.get_json(silent=True)
+    if not data or 'text' not in data:
+        return jsonify({
+            'success': False,
+            'error': '缺少必要的参数'
+        }), 400
+
+    text = data.get('text') or ''
+    if not isinstance(text, str):
+        return jsonify({
+            'success': False,
+            'error': '参数 text 必须是字符串'
+        }), 400
+
+    try:
+        result = preview_renderer.render(text)
+        return jsonify({
+            'success': True,
+            'html': result['html'],
+            'stats': {
+                'blocks': result['blocks'],
+                'rendered': result['rendered'],
+                'cached': result['cached']
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'渲染预览失败: {str(e)}'
+        }), 500
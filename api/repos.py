@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify, flash, redirect, url_for, session
 from services.github_service import GitHubService
-from utils.storage import StorageManager
+from utils.storage import get_storage
 from utils.auth import AuthManager
 import os
 
@@ -8,7 +8,7 @@ import os
 repos_bp = Blueprint('repos', __name__)
 
 # 初始化服务
-storage = StorageManager()
+storage = get_storage()
 auth_manager = AuthManager()
 
 def get_github_service():
@@ -178,13 +178,6 @@ def _add_repo(repo_info):
     # 获取当前用户信息
     current_user = session.get('username', 'unknown')
     
-    repos_data = storage.get_repos()
-    
-    # 检查是否已存在
-    for repo in repos_data.get('repositories', []):
-        if repo.get('full_name') == repo_info['full_name']:
-            return False, '仓库已存在'
-    
     # 添加时间戳和用户标识
     from datetime import datetime
     repo_info['added_at'] = datetime.now().isoformat()
@@ -192,33 +185,16 @@ def _add_repo(repo_info):
     
     print(f"添加仓库: {repo_info['full_name']}, 用户: {current_user}, added_by: {repo_info['added_by']}")
     
-    # 确保 repositories 列表存在
-    if 'repositories' not in repos_data:
-        repos_data['repositories'] = []
-    
-    repos_data['repositories'].append(repo_info)
-    
-    # 保存到存储
-    if storage.save_repos(repos_data):
-        print(f"仓库 {repo_info['full_name']} 添加成功，当前总数: {len(repos_data['repositories'])}")
-        print(f"新仓库信息: {repo_info}")
+    # 只写入该仓库（存在性检查由存储完成）
+    result = storage.add_repo(repo_info)
+    if result['success']:
+        print(f"仓库 {repo_info['full_name']} 添加成功")
         return True, '仓库添加成功'
-    else:
-        return False, '保存仓库信息失败'
+    return False, result['error']
 
 def _remove_repo(repo_full_name):
     """从存储中移除仓库"""
-    repos_data = storage.get_repos()
-    original_count = len(repos_data.get('repositories', []))
-    
-    repos_data['repositories'] = [
-        repo for repo in repos_data.get('repositories', [])
-        if repo.get('full_name') != repo_full_name
-    ]
-    
-    if len(repos_data['repositories']) < original_count:
-        if storage.save_repos(repos_data):
-            return True, '仓库删除成功'
-        else:
-            return False, '保存更改失败'
-    return False, '仓库不存在'
+    result = storage.remove_repo(repo_full_name)
+    if result['success']:
+        return True, '仓库删除成功'
+    return False, result['error']
@@ -6,12 +6,18 @@ from utils.helpers import (
     load_repos, add_repo, remove_repo, 
     format_datetime, render_markdown, truncate_text, get_label_style
 )
-from utils.data_exporter import DataExporter
+from utils.fragment_cache import fragment_cache
+from utils.etag import etag_registry, conditional_json, version_stamp
+from utils.compression import compressor
+from utils.assets import asset_manifest
+from utils.storage import get_storage
 # 导入蓝图
 from api.repos import repos_bp
 from api.issues import issues_bp
 from api.comments import comments_bp
 from api.auth import auth_bp
+from api.markdown import markdown_bp
+from api.export import export_bp
 import os
 import sys
 import json
@@ -87,6 +93,21 @@ def create_app(config_name=None):
     app.register_blueprint(issues_bp)
     app.register_blueprint(comments_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(markdown_bp)
+    app.register_blueprint(export_bp)
+    
+    # 模板片段缓存
+    fragment_cache.init_app(app)
+    
+    # JSON 接口的 ETag 失效钩子（存储中的仓库 / 白名单变更时使 'repos' 作用域失效）
+    etag_registry.init_app(app)
+    get_storage().add_invalidation_listener(etag_registry.invalidate)
+    
+    # HTML / JSON 响应压缩（br > gzip）
+    compressor.init_app(app)
+    
+    # 静态资源指纹与预压缩（url_for('static') 解析为带哈希的文件名）
+    asset_manifest.init_app(app)
     
     def get_github_service():
         """获取当前用户的 GitHub 服务实例"""
@@ -118,7 +139,7 @@ def create_app(config_name=None):
     def index():
         """主页 - 显示仓库列表"""
         from flask import session
-        from utils.storage import StorageManager
+        from utils.storage import get_storage
         
         # 检查用户是否已登录
         if 'github_token' not in session or 'username' not in session:
@@ -139,7 +160,7 @@ def create_app(config_name=None):
             return redirect(url_for('auth.login_page'))
         
         # 获取仓库数据
-        storage = StorageManager()
+        storage = get_storage()
         repos_data = storage.get_repos()
         
         # 🎯 如果仓库列表为空，自动添加默认演示仓库
@@ -160,14 +181,9 @@ def create_app(config_name=None):
                     result['data']['added_by'] = username
                     result['data']['is_default'] = True  # 标记为默认仓库
                     
-                    # 添加到仓库列表
-                    if 'repositories' not in repos_data:
-                        repos_data['repositories'] = []
-                    
-                    repos_data['repositories'].append(result['data'])
-                    
-                    if storage.save_repos(repos_data):
+                    if storage.add_repo(result['data'])['success']:
                         print(f"✅ 默认仓库 {default_repo_url} 添加成功")
+                        repos_data = storage.get_repos()
                     else:
                         print(f"❌ 保存默认仓库失败")
                 else:
@@ -194,7 +210,7 @@ def create_app(config_name=None):
     @app.route('/add_repo', methods=['POST'])
     def add_repository():
         """添加仓库"""
-        from utils.storage import StorageManager
+        from utils.storage import get_storage
         from datetime import datetime
         from flask import session
         
@@ -240,17 +256,7 @@ def create_app(config_name=None):
         print(f"✅ 获取到仓库信息: {result['data'].get('full_name')}")
         
         # 使用 StorageManager 添加仓库
-        storage = StorageManager()
-        repos_data = storage.get_repos()
-        
-        # 检查是否已存在
-        for repo in repos_data.get('repositories', []):
-            if repo.get('full_name') == result['data']['full_name']:
-                print(f"⚠️ 仓库已存在: {result['data']['full_name']}")
-                if is_ajax:
-                    return jsonify({'success': False, 'error': '仓库已存在'}), 400
-                flash('仓库已存在', 'error')
-                return redirect(url_for('index'))
+        storage = get_storage()
         
         # 添加时间戳和用户信息
         result['data']['added_at'] = datetime.now().isoformat()
@@ -258,17 +264,18 @@ def create_app(config_name=None):
         
         print(f"📝 仓库将被添加: {result['data']['full_name']}, 添加人: {result['data']['added_by']}")
         
-        # 确保 repositories 列表存在
-        if 'repositories' not in repos_data:
-            repos_data['repositories'] = []
-        
-        repos_data['repositories'].append(result['data'])
-        
-        # 保存到存储
+        # 保存到存储（只写入该仓库，存在性检查由存储完成）
         print(f"💾 正在保存仓库数据...")
-        save_success = storage.save_repos(repos_data)
+        save_result = storage.add_repo(result['data'])
         
-        if save_success:
+        if save_result.get('exists'):
+            print(f"⚠️ 仓库已存在: {result['data']['full_name']}")
+            if is_ajax:
+                return jsonify({'success': False, 'error': '仓库已存在'}), 400
+            flash('仓库已存在', 'error')
+            return redirect(url_for('index'))
+        
+        if save_result['success']:
             print(f"✅ 仓库保存成功: {result['data']['full_name']}")
             if is_ajax:
                 print(f"📤 返回 JSON 响应: success=True")
@@ -288,24 +295,15 @@ def create_app(config_name=None):
     @app.route('/remove_repo/<path:repo_full_name>')
     def remove_repository(repo_full_name):
         """删除仓库"""
-        from utils.storage import StorageManager
+        from utils.storage import get_storage
         
-        storage = StorageManager()
-        repos_data = storage.get_repos()
-        original_count = len(repos_data.get('repositories', []))
+        storage = get_storage()
+        result = storage.remove_repo(repo_full_name)
         
-        repos_data['repositories'] = [
-            repo for repo in repos_data.get('repositories', [])
-            if repo.get('full_name') != repo_full_name
-        ]
-        
-        if len(repos_data['repositories']) < original_count:
-            if storage.save_repos(repos_data):
-                flash('仓库删除成功', 'success')
-            else:
-                flash('保存更改失败', 'error')
+        if result['success']:
+            flash('仓库删除成功', 'success')
         else:
-            flash('仓库不存在', 'error')
+            flash(result['error'], 'error')
         
         return redirect(url_for('index'))
     
@@ -365,10 +363,12 @@ def create_app(config_name=None):
     
     # API 路由
     @app.route('/api/my_repos')
+    @conditional_json(scope=lambda: 'repos',
+                      version=lambda result: f"{result['is_admin']}:{result['last_updated']}:{version_stamp(result['repositories'], 'full_name')}")
     def api_my_repos():
         """获取当前用户的仓库列表（前端渲染专用）"""
         from flask import session
-        from utils.storage import StorageManager
+        from utils.storage import get_storage
         
         # 1. 获取用户信息
         username = session.get('username')
@@ -378,7 +378,7 @@ def create_app(config_name=None):
             return jsonify({'success': False, 'error': '未登录'}), 401
             
         # 2. 获取数据
-        storage = StorageManager()
+        storage = get_storage()
         # 使用我们刚刚修复过的、忽略大小写的权限逻辑
         repos_data = storage.get_user_repos(username, is_admin)
         
@@ -409,13 +409,14 @@ def create_app(config_name=None):
             repos.append(injected_repo)
         
         # 3. 返回 JSON
-        return jsonify({
+        return {
             'success': True,
             'count': len(repos),
             'username': username,
             'is_admin': is_admin,
+            'last_updated': repos_data.get('last_updated', ''),
             'repositories': repos
-        })
+        }
 
     @app.route('/api/repos')
     def api_repos():
@@ -423,6 +424,8 @@ def create_app(config_name=None):
         return api_my_repos()
     
     @app.route('/api/repo/<path:repo_full_name>/issues')
+    @conditional_json(scope=lambda repo_full_name: repo_full_name,
+                      version=lambda result: f"{version_stamp(result.get('data'), 'number')}:{result.get('total_count')}")
     def api_repo_issues(repo_full_name):
         """获取仓库 Issues API"""
         page = request.args.get('page', 1, type=int)
@@ -442,7 +445,7 @@ def create_app(config_name=None):
             page=page, 
             per_page=20
         )
-        return jsonify(result)
+        return result
     
     @app.route('/api/validate_token')
     def api_validate_token():
@@ -575,61 +578,6 @@ def create_app(config_name=None):
     
     # 删除评论路由已移至 api/comments.py
     
-    @app.route('/api/export/repos', methods=['GET'])
-    def api_get_exportable_repos():
-        """获取可导出的仓库列表"""
-        try:
-            exporter = DataExporter(get_github_token())
-            repos = exporter.get_available_repos()
-            return jsonify({
-                'success': True,
-                'repos': repos
-            })
-        except Exception as e:
-            return jsonify({
-                'success': False,
-                'error': f'获取仓库列表失败: {str(e)}'
-            }), 500
-    
-    @app.route('/api/export/<path:repo_full_name>', methods=['POST'])
-    def api_export_repo_data(repo_full_name):
-        """导出仓库数据"""
-        try:
-            data = request.get_json() or {}
-            export_format = data.get('format', 'json').lower()
-            
-            # 验证导出格式
-            if export_format not in ['json', 'csv']:
-                return jsonify({
-                    'success': False,
-                    'error': f'不支持的导出格式: {export_format}'
-                }), 400
-            
-            # 执行导出
-            exporter = DataExporter(get_github_token())
-            result = exporter.export_repo_data(repo_full_name, export_format)
-            
-            if not result.get('success'):
-                return jsonify(result), 400
-            
-            # 返回文件内容
-            from flask import Response
-            response = Response(
-                result['content'],
-                mimetype=result['content_type'],
-                headers={
-                    'Content-Disposition': f'attachment; filename="{result["filename"]}"',
-                    'Content-Type': result['content_type']
-                }
-            )
-            return response
-            
-        except Exception as e:
-            return jsonify({
-                'success': False,
-                'error': f'导出数据时发生错误: {str(e)}'
-            }), 500
-    
     # 错误处理
     @app.errorhandler(404)
     def not_found(error):
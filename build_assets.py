@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态资源构建脚本
+为 static/ 下的 CSS / JS 生成带内容哈希的文件名、.gz / .br 预压缩版本和 asset-manifest.json
+"""
+
+import os
+import sys
+from utils.assets import build_assets, BROTLI_AVAILABLE, MANIFEST_FILENAME
+
+def main():
+    """构建静态资源"""
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    
+    print("🔨 开始构建静态资源...")
+    if not BROTLI_AVAILABLE:
+        print("⚠️ 未安装 brotli，只生成 .gz 预压缩文件")
+    
+    manifest = build_assets(static_folder)
+    
+    print(f"✅ 构建完成: {len(manifest)} 个资源，清单已写入 static/{MANIFEST_FILENAME}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,7 +14,7 @@ class Config:
     
     # 应用配置
     REPOS_FILE = 'data/repos.json'
-    CACHE_TIMEOUT = 300  # 5分钟缓存
+    CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', 300))  # 数据缓存的默认有效期（秒），默认 5 分钟
     ISSUES_PER_PAGE = 20
     
     # GitHub API 限制
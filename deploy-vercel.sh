@@ -49,6 +49,11 @@ echo "📍 当前分支: $CURRENT_BRANCH"
 echo "📝 最近的提交:"
 git log -1 --oneline
 
+# 构建静态资源（指纹文件名 + 预压缩）
+echo ""
+echo "🔨 构建静态资源..."
+python3 build_assets.py
+
 # 执行部署
 echo ""
 echo "🔨 开始部署..."
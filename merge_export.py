@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量导出合并脚本
+将增量导出（delta）合并到上一次的完整 JSON 导出中，生成新的完整导出
+
+用法:
+    python3 merge_export.py full.json delta.json [-o merged.json] [--drop-closed]
+"""
+
+import argparse
+import json
+import sys
+from utils.data_exporter import merge_export_delta
+
+def main():
+    """合并导出文件"""
+    parser = argparse.ArgumentParser(description='将增量导出合并到完整导出中')
+    parser.add_argument('base', help='上一次的完整导出（JSON）')
+    parser.add_argument('delta', nargs='+', help='按时间顺序排列的增量导出（JSON）')
+    parser.add_argument('-o', '--output', help='输出文件，默认覆盖完整导出文件')
+    parser.add_argument('--drop-closed', action='store_true', help='移除已关闭的 Issue')
+    args = parser.parse_args()
+    
+    with open(args.base, 'r', encoding='utf-8') as f:
+        merged = json.load(f)
+    
+    for delta_path in args.delta:
+        with open(delta_path, 'r', encoding='utf-8') as f:
+            delta = json.load(f)
+        if delta.get('export_info', {}).get('export_mode') != 'delta':
+            print(f"❌ {delta_path} 不是增量导出文件")
+            return 1
+        merged = merge_export_delta(merged, delta, drop_closed=args.drop_closed)
+        print(f"✓ 已合并 {delta_path}: {len(delta.get('issues', []))} 个 Issue, "
+              f"{len(delta.get('tombstones', []))} 条墓碑记录")
+    
+    output = args.output or args.base
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, indent=2, ensure_ascii=False)
+    
+    info = merged['export_info']
+    print(f"✅ 合并完成: {info['total_issues']} 个 Issue, {info['total_comments']} 条评论，已写入 {output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,18 +2,26 @@
  * 数据导出功能的前端交互逻辑
  */
 
+// 仓库下拉框中“全部可见仓库”选项的值
+const ALL_REPOS_VALUE = '__all__';
+
 class DataExportManager {
     constructor() {
         this.exportModal = document.getElementById('exportModal');
         this.exportProgress = document.getElementById('exportProgress');
         this.repoSelect = document.getElementById('exportRepoSelect');
         this.formatSelect = document.getElementById('exportFormatSelect');
+        this.modeSelect = document.getElementById('exportModeSelect');
         this.confirmBtn = document.getElementById('confirmExportBtn');
         this.exportInfo = document.getElementById('exportInfo');
         this.repoDescription = document.getElementById('repoDescription');
         this.progressText = document.getElementById('progressText');
+        this.estimateText = document.getElementById('exportEstimate');
+        this.estimateWarning = document.getElementById('exportEstimateWarning');
         
         this.availableRepos = [];
+        this.currentEstimate = null;
+        this.estimateRequestId = 0;
         this.initEventListeners();
     }
 
@@ -44,6 +52,15 @@ class DataExportManager {
             this.onRepoSelectionChange();
         });
 
+        // 格式或范围变化时重新预估
+        this.formatSelect.addEventListener('change', () => {
+            this.loadEstimate();
+        });
+
+        this.modeSelect.addEventListener('change', () => {
+            this.loadEstimate();
+        });
+
         // 确认导出按钮事件
         this.confirmBtn.addEventListener('click', () => {
             this.startExport();
@@ -108,6 +125,15 @@ class DataExportManager {
             option.dataset.description = repo.description || '暂无描述';
             this.repoSelect.appendChild(option);
         });
+        
+        // 多于一个仓库时提供批量导出（打包为 ZIP）
+        if (this.availableRepos.length > 1) {
+            const option = document.createElement('option');
+            option.value = ALL_REPOS_VALUE;
+            option.textContent = `全部可见仓库 (${this.availableRepos.length} 个，打包为 ZIP)`;
+            option.dataset.description = '每个仓库导出为一个文件，并附带 manifest.json 清单';
+            this.repoSelect.appendChild(option);
+        }
     }
 
     onRepoSelectionChange() {
@@ -123,6 +149,8 @@ class DataExportManager {
             
             // 启用确认按钮
             this.confirmBtn.disabled = false;
+            
+            this.loadEstimate();
         } else {
             // 隐藏仓库信息
             this.exportInfo.style.display = 'none';
@@ -132,44 +160,130 @@ class DataExportManager {
         }
     }
 
+    async loadEstimate() {
+        const selectedRepo = this.repoSelect.value;
+        this.currentEstimate = null;
+        this.estimateWarning.style.display = 'none';
+        if (!selectedRepo) {
+            return;
+        }
+        
+        // 只采用最后一次请求的结果
+        const requestId = ++this.estimateRequestId;
+        this.estimateText.textContent = '正在预估...';
+        
+        try {
+            const response = await fetch('/api/export/estimate', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    repos: selectedRepo === ALL_REPOS_VALUE ? 'all' : [selectedRepo],
+                    format: this.formatSelect.value,
+                    mode: this.modeSelect.value
+                })
+            });
+            const data = await response.json();
+            if (requestId !== this.estimateRequestId) {
+                return;
+            }
+            if (!response.ok || !data.success) {
+                throw new Error(data.error || `HTTP ${response.status}: ${response.statusText}`);
+            }
+            
+            const estimate = data.estimate;
+            this.currentEstimate = estimate;
+            this.estimateText.textContent =
+                `${estimate.issues} 个 Issue，${estimate.comments} 条评论；` +
+                `约 ${estimate.api_calls} 次 API 请求（剩余额度 ${estimate.rate_limit.remaining}），` +
+                `预计 ${this.formatDuration(estimate.estimated_seconds)}，文件约 ${this.formatBytes(estimate.estimated_bytes)}`;
+            if (estimate.warnings.length > 0) {
+                this.estimateWarning.textContent = `⚠️ ${estimate.warnings.join('；')}`;
+                this.estimateWarning.style.display = 'block';
+            }
+        } catch (error) {
+            if (requestId === this.estimateRequestId) {
+                this.estimateText.textContent = `无法预估: ${error.message}`;
+            }
+        }
+    }
+
+    formatBytes(bytes) {
+        if (bytes < 1024) {
+            return `${bytes} B`;
+        }
+        if (bytes < 1024 * 1024) {
+            return `${(bytes / 1024).toFixed(1)} KB`;
+        }
+        return `${(bytes / 1024 / 1024).toFixed(1)} MB`;
+    }
+
+    formatDuration(seconds) {
+        if (seconds < 60) {
+            return `${Math.max(Math.round(seconds), 1)} 秒`;
+        }
+        return `${Math.round(seconds / 60)} 分钟`;
+    }
+
     async startExport() {
         const selectedRepo = this.repoSelect.value;
         const selectedFormat = this.formatSelect.value;
+        const selectedMode = this.modeSelect.value;
         
         if (!selectedRepo || !selectedFormat) {
             this.showError('请选择仓库和导出格式');
             return;
         }
+        
+        // 预计会耗尽 API 额度时需要再次确认
+        if (this.currentEstimate && this.currentEstimate.exhausts_quota &&
+                !confirm(`${this.currentEstimate.warnings.join('\n')}\n\n确定要继续导出吗？`)) {
+            return;
+        }
 
         try {
             // 关闭模态框，显示进度
             this.exportModal.style.display = 'none';
             this.showProgress('正在准备导出数据...');
             
-            // 发起导出请求
-            const response = await fetch(`/api/export/${encodeURIComponent(selectedRepo)}`, {
+            // 创建后台导出任务
+            let job = await this.requestJob('/api/export/jobs', {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
                 body: JSON.stringify({
-                    format: selectedFormat
+                    repos: selectedRepo === ALL_REPOS_VALUE ? 'all' : [selectedRepo],
+                    format: selectedFormat,
+                    mode: selectedMode
                 })
             });
             
-            if (!response.ok) {
-                const errorData = await response.json();
-                throw new Error(errorData.error || `HTTP ${response.status}: ${response.statusText}`);
+            // 逐步推进任务直到完成，每次请求只执行一个时间片
+            while (job.status !== 'completed') {
+                if (job.status === 'failed') {
+                    throw new Error(job.error || '导出任务失败');
+                }
+                this.updateProgress(this.formatJobProgress(job));
+                if (job.error || job.waiting_until) {
+                    // 上一步失败或 API 额度不足时稍后重试
+                    await new Promise(resolve => setTimeout(resolve, job.waiting_until ? 30000 : 2000));
+                }
+                job = await this.requestJob(`/api/export/jobs/${job.id}/step`, { method: 'POST' });
             }
             
             // 更新进度
             this.updateProgress('正在下载文件...');
             
+            const response = await fetch(job.download_url);
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.error || `HTTP ${response.status}: ${response.statusText}`);
+            }
+            
             // 获取文件内容
             const blob = await response.blob();
             
             // 生成文件名
-            const fileName = this.generateFileName(selectedRepo, selectedFormat);
+            const fileName = this.getResponseFileName(response) || this.generateFileName(selectedRepo, selectedFormat);
             
             // 下载文件
             this.downloadFile(blob, fileName);
@@ -185,11 +299,49 @@ class DataExportManager {
         }
     }
 
+    async requestJob(url, options) {
+        // 导出任务接口统一返回 { success, job }
+        const response = await fetch(url, {
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            ...options
+        });
+        const data = await response.json();
+        if (!response.ok || !data.success) {
+            throw new Error(data.error || `HTTP ${response.status}: ${response.statusText}`);
+        }
+        return data.job;
+    }
+
+    formatJobProgress(job) {
+        let message;
+        if (job.phase === 'comments') {
+            message = `正在获取评论... 已获取 ${job.comments_done} 条`;
+        } else {
+            message = `正在获取 Issues... 已获取 ${job.issues_done} 个 Issue，${job.comments_done} 条评论`;
+        }
+        if (job.repos_total > 1) {
+            message = `[${job.repos_done}/${job.repos_total} 个仓库] ${message}`;
+        }
+        if (job.waiting_until) {
+            const resetTime = new Date(job.waiting_until * 1000).toLocaleTimeString();
+            message += `（API 额度不足，将于 ${resetTime} 后继续）`;
+        }
+        return message;
+    }
+
+    getResponseFileName(response) {
+        // 优先使用服务端在 Content-Disposition 中给出的文件名
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const match = disposition.match(/filename="([^"]+)"/);
+        return match ? match[1] : null;
+    }
+
     generateFileName(repoFullName, format) {
         const repoName = repoFullName.replace('/', '_');
         const timestamp = new Date().toISOString().slice(0, 19).replace(/[:-]/g, '');
-        const extension = format === 'json' ? 'json' : 'csv';
-        return `${repoName}_export_${timestamp}.${extension}`;
+        return `${repoName}_export_${timestamp}.${format}`;
     }
 
     downloadFile(blob, fileName) {
@@ -220,8 +372,13 @@ class DataExportManager {
     resetForm() {
         this.repoSelect.value = '';
         this.formatSelect.value = 'json';
+        this.modeSelect.value = 'full';
         this.exportInfo.style.display = 'none';
         this.confirmBtn.disabled = true;
+        this.currentEstimate = null;
+        this.estimateRequestId++;
+        this.estimateText.textContent = '-';
+        this.estimateWarning.style.display = 'none';
     }
 
     showError(message) {
@@ -273,6 +273,48 @@ function switchTab(container, tabType) {
     }
 }
 
+// 预览请求的防抖定时器和请求序号（按预览容器区分）
+const previewTimers = new WeakMap();
+const previewSequence = new WeakMap();
+
+// 请求后端渲染 Markdown 预览（防抖，丢弃过期响应）
+function requestMarkdownPreview(content, previewContent, wrapperClass) {
+    clearTimeout(previewTimers.get(previewContent));
+    
+    previewTimers.set(previewContent, setTimeout(() => {
+        const sequence = (previewSequence.get(previewContent) || 0) + 1;
+        previewSequence.set(previewContent, sequence);
+        
+        fetch('/api/markdown/preview', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                text: content
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            // 只显示最新一次请求的结果
+            if (previewSequence.get(previewContent) !== sequence) return;
+            
+            if (data.success) {
+                previewContent.innerHTML = wrapperClass
+                    ? `<div class="${wrapperClass}">${data.html}</div>`
+                    : data.html;
+            } else {
+                previewContent.innerHTML = `<pre>${escapeHtml(content)}</pre>`;
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            if (previewSequence.get(previewContent) !== sequence) return;
+            previewContent.innerHTML = `<pre>${escapeHtml(content)}</pre>`;
+        });
+    }, 150));
+}
+
 // 更新 Issue 预览
 function updateIssuePreview() {
     const editor = document.getElementById('issue-editor');
@@ -281,9 +323,7 @@ function updateIssuePreview() {
     if (editor && previewContent) {
         const content = editor.value;
         if (content.trim()) {
-            // 这里应该调用后端 API 来渲染 Markdown
-            // 暂时使用简单的文本显示
-            previewContent.innerHTML = `<p>预览功能需要后端支持 Markdown 渲染</p><pre>${escapeHtml(content)}</pre>`;
+            requestMarkdownPreview(content, previewContent);
         } else {
             previewContent.innerHTML = '<p class="no-description">没有内容可预览</p>';
         }
@@ -298,9 +338,7 @@ function updateCommentPreview(commentIndex) {
     if (editor && previewContent) {
         const content = editor.value;
         if (content.trim()) {
-            // 这里应该调用后端 API 来渲染 Markdown
-            // 暂时使用简单的文本显示
-            previewContent.innerHTML = `<p>预览功能需要后端支持 Markdown 渲染</p><pre>${escapeHtml(content)}</pre>`;
+            requestMarkdownPreview(content, previewContent);
         } else {
             previewContent.innerHTML = '<p class="no-description">没有内容可预览</p>';
         }
@@ -460,8 +498,7 @@ function updateAddCommentPreview() {
     
     const content = textarea.value.trim();
     if (content) {
-        // 简单的 Markdown 预览（实际应用中需要后端支持）
-        previewContent.innerHTML = `<div class="markdown-preview">${escapeHtml(content)}</div>`;
+        requestMarkdownPreview(content, previewContent, 'markdown-preview');
     } else {
         previewContent.innerHTML = '<div class="preview-placeholder">Nothing to preview</div>';
     }
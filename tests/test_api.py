@@ -6,6 +6,8 @@ import os
 # 添加项目根目录到 Python 路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.storage import StorageManager, get_storage
+
 class TestAPI(unittest.TestCase):
     """API 测试类"""
     
@@ -26,5 +28,247 @@ class TestAPI(unittest.TestCase):
         # 这里可以添加具体的 API 测试
         pass
 
+class TestConditionalRequests(unittest.TestCase):
+    """JSON 接口 ETag / 304 测试类"""
+
+    def setUp(self):
+        """使用内存存储创建应用，并以管理员身份登录"""
+        env = patch.dict(os.environ, {'STORAGE_TYPE': 'memory', 'FLASK_ENV': '', 'FLASK_DEBUG': ''})
+        env.start()
+        self.addCleanup(env.stop)
+        StorageManager._memory_storage.clear()
+        self.addCleanup(StorageManager._memory_storage.clear)
+        StorageManager._memory_versions.clear()
+        StorageManager._repo_layout_ready = False
+        self.storage = get_storage()
+        self.addCleanup(setattr, self.storage, 'storage_type', self.storage.storage_type)
+        self.storage.storage_type = 'memory'
+        self.storage.invalidate_read_cache()
+
+        from app import create_app
+        self.client = create_app().test_client()
+        with self.client.session_transaction() as sess:
+            sess.update({'username': 'alice', 'github_token': 'token', 'is_admin': True})
+
+    def test_if_none_match_and_invalidation_after_write(self):
+        """测试持有有效 ETag 时返回 304，仓库或白名单写入后重新返回 200"""
+        first = self.client.get('/api/my_repos')
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+
+        self.assertEqual(self.client.get('/api/my_repos', headers={'If-None-Match': etag}).status_code, 304)
+
+        self.storage.add_repo({'full_name': 'alice/notes', 'added_by': 'alice'})
+        second = self.client.get('/api/my_repos', headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second.headers['ETag'], etag)
+
+        etag = second.headers['ETag']
+        self.assertEqual(self.client.get('/api/my_repos', headers={'If-None-Match': etag}).status_code, 304)
+        self.storage.add_whitelist_users({'bob': True})
+        with patch.object(self.storage, 'get_user_repos', wraps=self.storage.get_user_repos) as load:
+            self.assertEqual(self.client.get('/api/my_repos', headers={'If-None-Match': etag}).status_code, 304)
+        # 白名单变更后需要重新读取仓库列表才能确认未修改
+        load.assert_called_once()
+
+class TestCompression(unittest.TestCase):
+    """响应压缩测试类"""
+
+    def setUp(self):
+        """创建只注册了压缩中间件的应用"""
+        from flask import Flask, jsonify, make_response
+        from utils.compression import compressor
+
+        app = Flask(__name__)
+        compressor.init_app(app)
+
+        @app.route('/large')
+        def large():
+            response = jsonify({'items': ['x' * 20] * 100})
+            response.set_etag('v1')
+            return response
+
+        @app.route('/small')
+        def small():
+            return jsonify({'ok': True})
+
+        @app.route('/unchanged')
+        def unchanged():
+            response = make_response('', 304)
+            response.set_etag('v1')
+            return response
+
+        self.client = app.test_client()
+
+    def test_encoding_negotiation(self):
+        """测试 br 优先于 gzip，压缩变体的 ETag 带后缀，并设置 Vary"""
+        import gzip
+        from utils.compression import BROTLI_AVAILABLE, brotli
+
+        if BROTLI_AVAILABLE:
+            response = self.client.get('/large', headers={'Accept-Encoding': 'gzip, br'})
+            self.assertEqual(response.headers['Content-Encoding'], 'br')
+            self.assertEqual(response.headers['ETag'], '"v1-br"')
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+            self.assertIn(b'xxxx', brotli.decompress(response.data))
+
+        response = self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['ETag'], '"v1-gzip"')
+        self.assertIn(b'xxxx', gzip.decompress(response.data))
+
+        response = self.client.get('/large')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_small_responses_are_not_compressed(self):
+        """测试小于 COMPRESS_MIN_SIZE 的响应不压缩"""
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_not_modified_keeps_variant_etag(self):
+        """测试 304 响应的 ETag 与客户端持有的压缩变体一致"""
+        response = self.client.get('/unchanged', headers={'Accept-Encoding': 'gzip, br', 'If-None-Match': '"v1-gzip"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], '"v1-gzip"')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+class TestStaticAssets(unittest.TestCase):
+    """静态资源指纹测试类"""
+
+    def _create_app(self, debug=False, build=False):
+        """在临时静态目录上创建应用"""
+        import shutil
+        import tempfile
+        from flask import Flask, url_for
+        from utils.assets import AssetManifest, build_assets
+
+        static_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_folder, True)
+        os.makedirs(os.path.join(static_folder, 'css'))
+        with open(os.path.join(static_folder, 'css', 'main.css'), 'w') as f:
+            f.write('body { color: red; }')
+        if build:
+            build_assets(static_folder)
+
+        app = Flask(__name__, static_folder=static_folder, static_url_path='/static')
+        app.debug = debug
+        AssetManifest().init_app(app)
+        app.add_url_rule('/url', 'url', lambda: url_for('static', filename='css/main.css'))
+        return app.test_client(), static_folder
+
+    def test_built_assets_are_immutable(self):
+        """测试构建后 url_for 解析为指纹文件名，以 immutable 长缓存和预压缩版本下发"""
+        client, _ = self._create_app(build=True)
+        url = client.get('/url').get_data(as_text=True)
+        self.assertRegex(url, r'^/static/css/main\.[0-9a-f]{10}\.css$')
+
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_unbuilt_assets_keep_source_urls(self):
+        """测试未构建时（非调试模式）不改写为不存在的指纹文件名，静态文件可以由 CDN 直接提供"""
+        client, _ = self._create_app()
+        self.assertEqual(client.get('/url').get_data(as_text=True), '/static/css/main.css')
+        self.assertEqual(client.get('/static/css/main.css').headers['Cache-Control'], 'no-cache')
+
+    def test_debug_assets_follow_source_changes(self):
+        """测试调试模式下源文件修改后指纹随之变化，未构建的资源不使用长缓存"""
+        client, static_folder = self._create_app(debug=True)
+        url = client.get('/url').get_data(as_text=True)
+        response = client.get(url)
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(response.get_data(as_text=True), 'body { color: red; }')
+
+        with open(os.path.join(static_folder, 'css', 'main.css'), 'w') as f:
+            f.write('body { color: blue; }')
+        new_url = client.get('/url').get_data(as_text=True)
+        self.assertNotEqual(new_url, url)
+        self.assertEqual(client.get(new_url).get_data(as_text=True), 'body { color: blue; }')
+
+class TestExportAuth(unittest.TestCase):
+    """导出接口登录检查测试类"""
+
+    def setUp(self):
+        from app import create_app
+        self.client = create_app().test_client()
+
+    def test_anonymous_export_requests_are_rejected(self):
+        """测试未登录时导出接口返回 401，且不访问 GitHub"""
+        with patch('api.export.DataExporter') as exporter:
+            responses = [
+                self.client.get('/api/export/repos'),
+                self.client.post('/api/export/owner/repo', json={'format': 'json'}),
+                self.client.post('/api/export/estimate', json={'repo': 'owner/repo'}),
+                self.client.post('/api/export/jobs', json={'repo': 'owner/repo'}),
+            ]
+        self.assertEqual([response.status_code for response in responses], [401] * 4)
+        exporter.assert_not_called()
+
+    def test_logged_in_export_uses_session_token(self):
+        """测试登录后使用当前用户的 Token 导出"""
+        with self.client.session_transaction() as sess:
+            sess.update({'username': 'alice', 'github_token': 'user-token'})
+        with patch('api.export.DataExporter') as exporter:
+            exporter.return_value.get_available_repos.return_value = []
+            response = self.client.get('/api/export/repos')
+        self.assertEqual(response.status_code, 200)
+        exporter.assert_called_once_with('user-token', 'alice')
+
+class TestAdminAPI(unittest.TestCase):
+    """管理员接口测试类"""
+
+    def setUp(self):
+        """使用内存存储创建应用"""
+        env = patch.dict(os.environ, {'STORAGE_TYPE': 'memory', 'FLASK_ENV': '', 'FLASK_DEBUG': ''})
+        env.start()
+        self.addCleanup(env.stop)
+        self.storage = get_storage()
+        self.addCleanup(setattr, self.storage, 'storage_type', self.storage.storage_type)
+        self.storage.storage_type = 'memory'
+
+        from app import create_app
+        self.client = create_app().test_client()
+
+    def test_storage_stats_for_admins_only(self):
+        """测试管理员可以查看条件写入的冲突统计，其他用户返回 403"""
+        with self.client.session_transaction() as sess:
+            sess.update({'username': 'bob', 'is_admin': False})
+        self.assertEqual(self.client.get('/api/storage/stats').status_code, 403)
+
+        with self.client.session_transaction() as sess:
+            sess.update({'username': 'alice', 'is_admin': True})
+        response = self.client.get('/api/storage/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['storage_type'], 'memory')
+        self.assertEqual(set(response.get_json()['contention']), {'attempts', 'conflicts', 'exhausted'})
+
+    def test_batch_whitelist_rejects_malformed_bodies(self):
+        """测试批量修改白名单时请求体格式错误返回 400，不写入存储"""
+        with self.client.session_transaction() as sess:
+            sess.update({'username': 'alice', 'is_admin': True})
+        bodies = [
+            ['bob'],
+            {'action': 'add', 'usernames': 'bob'},
+            {'action': 'add', 'usernames': ['bob', {'name': 'carol'}]},
+            {'action': 'add', 'usernames': ['bob'], 'is_admin': 'false'},
+            {'action': 'add', 'usernames': ['bad name!']},
+            {'action': 'add', 'usernames': [' ']},
+            {'action': 'rename', 'usernames': ['bob']},
+        ]
+        with patch.object(self.storage, 'add_whitelist_users') as add:
+            responses = [self.client.post('/api/whitelist/batch', json=body) for body in bodies]
+        self.assertEqual([response.status_code for response in responses], [400] * len(bodies))
+        self.assertTrue(all(response.get_json()['success'] is False for response in responses))
+        add.assert_not_called()
+
+        with patch.object(self.storage, 'add_whitelist_users', return_value={'success': True, 'added': 1}) as add:
+            response = self.client.post('/api/whitelist/batch', json={'action': 'add', 'usernames': ['bob']})
+        self.assertEqual(response.status_code, 200)
+        add.assert_called_once_with({'bob': False})
+
 if __name__ == '__main__':
     unittest.main()
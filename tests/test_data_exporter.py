@@ -0,0 +1,381 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import io
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+import zipfile
+import os
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_exporter import DataExporter, merge_export_delta
+from utils.export_jobs import ExportJobManager
+
+class TestDataExporter(unittest.TestCase):
+    """数据导出测试类"""
+
+    def setUp(self):
+        """构造使用模拟 GitHub 服务的导出器"""
+        self.issues = [
+            {'number': n, 'title': f'Issue {n}', 'comments_count': n % 2, 'user': {'login': 'u'}}
+            for n in range(1, 8)
+        ]
+        service = MagicMock()
+        service.get_repo_info.return_value = {'success': True, 'data': {'name': 'repo'}}
+        service.iter_issues.side_effect = lambda *args, **kwargs: iter([dict(i) for i in self.issues])
+        service.iter_repo_comments.side_effect = lambda *args, **kwargs: iter([
+            (number, {'id': number * 10 + k, 'body': 'c', 'user': {'login': 'c'}})
+            for k in range(2) for number in (3, 1, 99)
+        ])
+        service.get_rate_limit_status.return_value = {'remaining': 5000, 'limit': 5000, 'reset': 0}
+        service.probe_repo_freshness.return_value = {'success': False, 'error': 'offline'}
+        service.get_issue_comments.side_effect = lambda repo, number: {
+            'success': True,
+            'data': [{'id': number * 10, 'body': 'c', 'user': {'login': 'c'}}]
+        }
+        self.service = service
+        self.exporter = DataExporter()
+        self.exporter.github_service = service
+
+    def test_repo_comments_joined_by_issue_number(self):
+        """测试仓库级评论列表按 Issue 编号关联，且不再逐个 Issue 请求评论"""
+        result = self.exporter.stream_repo_data('owner/repo', 'ndjson')
+        rows = {row['number']: row for row in map(json.loads, result['stream'])}
+
+        self.service.get_issue_comments.assert_not_called()
+        self.assertEqual([c['id'] for c in rows[1]['comments']], [10, 11])
+        self.assertEqual([c['id'] for c in rows[3]['comments']], [30, 31])
+        self.assertEqual(rows[2]['comments'], [])
+        self.assertEqual(result['export_info']['total_comments'], 4)
+
+    def test_comments_keep_issue_order(self):
+        """测试退回并发获取评论后仍按 Issue 顺序输出，且跳过没有评论的 Issue"""
+        self.service.iter_repo_comments.side_effect = Exception('not available')
+        with patch.object(self.exporter, '_new_github_service', return_value=self.service) as new_service:
+            result = self.exporter.stream_repo_data('owner/repo', 'ndjson')
+            rows = [json.loads(line) for line in result['stream']]
+
+        # 每个工作线程创建一个独立的客户端
+        self.assertTrue(1 <= new_service.call_count <= DataExporter.COMMENT_WORKERS)
+
+        self.assertEqual([row['number'] for row in rows], list(range(1, 8)))
+        self.assertEqual(self.service.get_issue_comments.call_count, 4)
+        for row in rows:
+            self.assertEqual(len(row['comments']), row['comments_count'])
+        self.assertEqual(result['export_info']['total_comments'], 4)
+
+    def test_large_comment_map_falls_back_to_per_issue_fetching(self):
+        """测试仓库评论超过缓冲上限时不再缓冲评论映射，改为逐个 Issue 获取评论"""
+        self.exporter.COMMENT_MAP_MAX_COMMENTS = 3
+        with patch.object(self.exporter, '_new_github_service', return_value=self.service):
+            result = self.exporter.stream_repo_data('owner/repo', 'ndjson')
+            rows = [json.loads(line) for line in result['stream']]
+
+        self.assertEqual([row['number'] for row in rows], list(range(1, 8)))
+        self.assertEqual(self.service.get_issue_comments.call_count, 4)
+        self.assertEqual(result['export_info']['total_comments'], 4)
+
+    def test_json_export_is_valid_document(self):
+        """测试增量写出的 JSON 是完整合法的文档"""
+        result = self.exporter.export_repo_data('owner/repo', 'json')
+        data = json.loads(result['content'])
+
+        self.assertEqual(len(data['issues']), 7)
+        self.assertEqual(data['export_info']['total_issues'], 7)
+
+    def test_markdown_archive_export(self):
+        """测试 Markdown 压缩包中每个 Issue 一个文件，评论附在正文之后，并附带索引"""
+        self.issues[0]['body'] = 'x' * 2000
+        result = self.exporter.export_repo_data('owner/repo', 'zip')
+        archive = zipfile.ZipFile(io.BytesIO(result['content']))
+        names = archive.namelist()
+
+        self.assertEqual(result['content_type'], 'application/zip')
+        self.assertEqual(len([name for name in names if name.startswith('issues/')]), 7)
+        self.assertEqual(names[0], 'issues/0001-Issue-1.md')
+        issue = archive.read('issues/0001-Issue-1.md').decode('utf-8')
+        self.assertTrue(issue.startswith('---\nnumber: 1\ntitle: "Issue 1"'))
+        self.assertIn('x' * 2000, issue)
+        self.assertEqual(issue.count('### c · '), 2)
+        self.assertIn('(issues/0007-Issue-7.md)', archive.read('README.md').decode('utf-8'))
+
+    def test_sqlite_export(self):
+        """测试 SQLite 导出为规范化的表，并建立全文检索表"""
+        self.issues[0]['labels'] = [{'name': 'bug', 'color': 'red'}, {'name': '文档', 'color': 'blue'}]
+        self.issues[1]['labels'] = [{'name': 'bug', 'color': 'red'}]
+        self.issues[2]['body'] = 'searchable needle'
+        result = self.exporter.export_repo_data('owner/repo', 'sqlite')
+
+        with tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False) as f:
+            f.write(result['content'])
+        self.addCleanup(os.remove, f.name)
+        conn = sqlite3.connect(f.name)
+        try:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM issues').fetchone()[0], 7)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM comments WHERE issue_number = 3').fetchone()[0], 2)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM labels').fetchone()[0], 2)
+            self.assertEqual(conn.execute(
+                "SELECT COUNT(*) FROM issue_labels JOIN labels ON labels.id = label_id WHERE name = 'bug'"
+            ).fetchone()[0], 2)
+            self.assertEqual(sorted(row[0] for row in conn.execute('SELECT login FROM users')), ['c', 'u'])
+            self.assertEqual(conn.execute(
+                "SELECT rowid FROM issues_fts WHERE issues_fts MATCH 'needle'").fetchall(), [(3,)])
+        finally:
+            conn.close()
+
+    def test_estimate_warns_when_quota_exhausted(self):
+        """测试导出预估按分页推算请求数，并在超过剩余额度时给出警告"""
+        self.service.count_repo_items.return_value = {
+            'success': True,
+            'data': {'issues': 950, 'pull_requests': 50, 'comments': 1201},
+            'rate_limit': {'remaining': 70, 'limit': 5000, 'reset': 0}
+        }
+        result = self.exporter.estimate_export('owner/repo', 'json')
+        estimate = result['estimate']
+
+        # 10 页 Issues + 13 页评论 + 仓库信息 + 2 次缓存探测
+        self.assertEqual(estimate['api_calls'], 26)
+        self.assertTrue(estimate['exhausts_quota'])
+        self.assertEqual(len(estimate['warnings']), 1)
+        self.service.iter_issues.assert_not_called()
+
+        self.service.count_repo_items.return_value['rate_limit']['remaining'] = 5000
+        batch = self.exporter.estimate_exports(['owner/a', 'owner/b'], 'csv')['estimate']
+        self.assertEqual(batch['api_calls'], 52)
+        self.assertFalse(batch['exhausts_quota'])
+
+    def test_unchanged_repo_served_from_cache(self):
+        """测试仓库未变化时直接返回缓存的导出结果，变化后重新导出"""
+        cache = {}
+        probe_values = {'issue': [7, '2024-01-01T00:00:00'], 'comment': None}
+        self.service.probe_repo_freshness.side_effect = lambda repo, previous=None: {
+            'success': True, 'etags': {'issue': 'W/"1"'}, 'values': dict(probe_values)
+        }
+
+        with patch('utils.storage.StorageManager.get_export_cache', side_effect=cache.get), \
+                patch('utils.storage.StorageManager.save_export_cache', side_effect=cache.__setitem__):
+            first = self.exporter.export_repo_data('owner/repo', 'json')
+            second = self.exporter.stream_repo_data('owner/repo', 'json')
+            self.assertTrue(second['cached'])
+            self.assertEqual(''.join(second['stream']), first['content'])
+            self.assertEqual(self.service.iter_issues.call_count, 1)
+
+            probe_values['issue'] = [7, '2024-02-01T00:00:00']
+            third = self.exporter.stream_repo_data('owner/repo', 'json')
+            self.assertFalse(third['cached'])
+            ''.join(third['stream'])
+            self.assertEqual(self.service.iter_issues.call_count, 2)
+
+            # 探测不到删除，超过最长有效期后即使探测结果不变也重新导出
+            self.exporter.CACHE_MAX_AGE = 0
+            fourth = self.exporter.stream_repo_data('owner/repo', 'json')
+            self.assertFalse(fourth['cached'])
+            ''.join(fourth['stream'])
+            self.assertEqual(self.service.iter_issues.call_count, 3)
+
+    @patch('utils.storage.StorageManager.save_export_checkpoint')
+    @patch('utils.storage.StorageManager.get_export_checkpoint')
+    def test_delta_export_merges_into_full_export(self, get_checkpoint, save_checkpoint):
+        """测试增量导出只请求检查点之后的变更，并能合并回完整导出"""
+        base = {
+            'issues': [
+                {'number': 1, 'state': 'open', 'updated_at': '2024-01-01T00:00:00',
+                 'comments': [{'id': 10, 'body': 'old', 'created_at': '2024-01-01T00:00:00'}]},
+                {'number': 2, 'state': 'open', 'updated_at': '2024-01-01T00:00:00',
+                 'comments': [{'id': 20, 'body': 'x', 'created_at': '2024-01-01T00:00:00'}]},
+            ],
+            'export_info': {'max_updated_at': '2024-01-01T00:00:00'}
+        }
+        get_checkpoint.return_value = {'max_updated_at': '2024-01-01T00:00:00'}
+        self.service.iter_issues.side_effect = lambda *args, **kwargs: iter([
+            {'number': 2, 'state': 'closed', 'closed_at': '2024-02-01T00:00:00',
+             'updated_at': '2024-02-01T00:00:00'},
+            {'number': 3, 'state': 'open', 'updated_at': '2024-02-02T00:00:00'},
+        ])
+        self.service.iter_repo_comments.side_effect = lambda *args, **kwargs: iter([
+            (1, {'id': 10, 'body': 'edited', 'created_at': '2024-01-01T00:00:00',
+                 'updated_at': '2024-02-03T00:00:00'}),
+            (3, {'id': 30, 'body': 'new', 'created_at': '2024-02-02T00:00:00',
+                 'updated_at': '2024-02-02T00:00:00'}),
+            # Pull Request 的对话评论：Issues 列表中没有 #5，不能成为孤立评论
+            (5, {'id': 50, 'body': 'pr', 'created_at': '2024-03-01T00:00:00', 'updated_at': '2024-03-01T00:00:00',
+                 'html_url': 'https://github.com/owner/repo/pull/5#issuecomment-50'}),
+        ])
+
+        exporter = DataExporter(username='alice')
+        exporter.github_service = self.service
+        result = exporter.export_repo_data('owner/repo', 'json', mode='delta')
+        delta = json.loads(result['content'])
+
+        self.assertEqual(self.service.iter_issues.call_args.kwargs['since'], '2024-01-01T00:00:00')
+        self.assertEqual([c['issue_number'] for c in delta['comments']], [1])
+        self.assertEqual(delta['export_info']['total_comments'], 2)
+        self.assertEqual(delta['tombstones'][0]['number'], 2)
+        save_checkpoint.assert_called_once()
+        self.assertEqual(save_checkpoint.call_args.args[2]['max_updated_at'], '2024-02-03T00:00:00')
+
+        merged = merge_export_delta(base, delta)
+        issues = {issue['number']: issue for issue in merged['issues']}
+        self.assertEqual(issues[1]['comments'][0]['body'], 'edited')
+        self.assertEqual(issues[2]['state'], 'closed')
+        self.assertEqual(len(issues[2]['comments']), 1)
+        self.assertEqual(issues[3]['comments'][0]['id'], 30)
+        self.assertEqual(merged['export_info']['total_comments'], 3)
+
+        dropped = merge_export_delta(base, delta, drop_closed=True)
+        self.assertEqual([issue['number'] for issue in dropped['issues']], [1, 3])
+
+class TestExportJobs(unittest.TestCase):
+    """后台导出任务测试类"""
+
+    def test_job_runs_in_resumable_steps(self):
+        """测试任务按页推进，进度可查询，完成后可以下载完整导出"""
+        pages = {
+            'comments': [[[1, {'id': 10, 'updated_at': '2024-01-02T00:00:00'}]]],
+            'issues': [
+                [{'number': 1, 'state': 'open', 'updated_at': '2024-01-01T00:00:00'}],
+                [{'number': 2, 'state': 'open', 'updated_at': '2024-01-03T00:00:00'}],
+            ]
+        }
+        service = MagicMock()
+        service.get_repo_info.return_value = {'success': True, 'data': {'name': 'repo'}}
+        service.probe_repo_freshness.return_value = {'success': False, 'error': 'offline'}
+        service.get_repo_comments_page.side_effect = lambda repo, page, since=None: {
+            'success': True, 'data': pages['comments'][page], 'has_more': False
+        }
+        service.get_issues_page.side_effect = lambda repo, page, since=None: {
+            'success': True, 'data': pages['issues'][page], 'has_more': page == 0
+        }
+
+        service.get_rate_limit_status.return_value = {'remaining': 5000, 'limit': 5000, 'reset': 0}
+
+        manager = ExportJobManager()
+        manager.STEP_TIME_BUDGET = 0
+        with patch('utils.data_exporter.GitHubService', return_value=service):
+            job_id = manager.create_job('token', 'alice', ['owner/repo'])['job']['id']
+            self.assertIsNone(manager.get_job(job_id, 'bob'))
+
+            job = manager.get_job(job_id, 'alice')
+            phases = []
+            while job['status'] != 'completed':
+                job = manager.run_steps(manager.get_job(job_id, 'alice'), 'token')
+                progress = manager.get_progress(job)
+                phases.append((progress['phase'], progress['issues_done'], progress['comments_done']))
+
+            self.assertEqual(phases, [('issues', 0, 1), ('issues', 1, 1), ('done', 2, 1)])
+            self.assertEqual(job['targets'][0]['max_updated_at'], '2024-01-03T00:00:00')
+
+            artifact = manager.stream_artifact(job)
+            data = json.loads(''.join(artifact['stream']))
+            self.assertEqual([issue['number'] for issue in data['issues']], [1, 2])
+            self.assertEqual(data['issues'][0]['comments'][0]['id'], 10)
+
+    def test_batch_job_builds_archive_with_manifest(self):
+        """测试批量导出为每个仓库生成一个文件和清单，额度不足时暂停"""
+        service = MagicMock()
+        service.get_repo_info.side_effect = lambda repo: (
+            {'success': False, 'error': 'Not Found'} if repo == 'owner/missing'
+            else {'success': True, 'data': {'name': repo.split('/')[1]}}
+        )
+        service.probe_repo_freshness.return_value = {'success': False, 'error': 'offline'}
+        service.get_repo_comments_page.return_value = {'success': True, 'data': [], 'has_more': False}
+        service.get_issues_page.side_effect = lambda repo, page, since=None: {
+            'success': True, 'data': [{'number': 1, 'title': repo, 'updated_at': '2024-01-01T00:00:00'}],
+            'has_more': False
+        }
+        service.get_rate_limit_status.return_value = {'remaining': 0, 'limit': 5000, 'reset': 123}
+
+        manager = ExportJobManager()
+        manager.STEP_TIME_BUDGET = 0
+        with patch('utils.data_exporter.GitHubService', return_value=service):
+            repos = ['owner/a', 'owner/b', 'owner/missing']
+            job = manager.get_job(manager.create_job('token', 'alice', repos)['job']['id'], 'alice')
+            self.assertEqual(job['kind'], 'batch')
+
+            job = manager.run_steps(job, 'token')
+            self.assertEqual(job['waiting_until'], 123)
+            service.get_issues_page.assert_not_called()
+
+            service.get_rate_limit_status.return_value = {'remaining': 5000, 'limit': 5000, 'reset': 0}
+            while job['status'] != 'completed':
+                job = manager.run_steps(job, 'token')
+
+            artifact = manager.stream_artifact(job)
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(artifact['stream'])))
+
+        self.assertEqual(artifact['content_type'], 'application/zip')
+        self.assertEqual(sorted(archive.namelist()), ['manifest.json', 'owner_a.json', 'owner_b.json'])
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual(manifest['total_issues'], 2)
+        self.assertEqual(manifest['repositories'][2]['status'], 'failed')
+        self.assertEqual(json.loads(archive.read('owner_b.json'))['issues'][0]['title'], 'owner/b')
+
+    def test_job_chunks_are_bounded_and_removed_after_download(self):
+        """测试分页数据按字节数拆分保存、带有效期，下载完成后删除任务数据"""
+        from utils.storage import StorageManager
+        issues = [{'number': n, 'title': 'x' * 40, 'updated_at': '2024-01-01T00:00:00'} for n in range(1, 4)]
+        service = MagicMock()
+        service.get_repo_info.return_value = {'success': True, 'data': {'name': 'repo'}}
+        service.probe_repo_freshness.return_value = {'success': False, 'error': 'offline'}
+        service.get_repo_comments_page.return_value = {'success': True, 'data': [], 'has_more': False}
+        service.get_issues_page.return_value = {'success': True, 'data': issues, 'has_more': False}
+        service.get_rate_limit_status.return_value = {'remaining': 5000, 'limit': 5000, 'reset': 0}
+
+        manager = ExportJobManager()
+        manager.STEP_TIME_BUDGET = 0
+        manager.CHUNK_MAX_BYTES = 250
+        self.addCleanup(setattr, manager.storage, 'storage_type', manager.storage.storage_type)
+        manager.storage.storage_type = 'memory'
+        with patch('utils.data_exporter.GitHubService', return_value=service):
+            job = manager.get_job(manager.create_job('token', 'alice', ['owner/repo'])['job']['id'], 'alice')
+            while job['status'] != 'completed':
+                job = manager.run_steps(job, 'token')
+
+        self.assertEqual(job['targets'][0]['issue_pages'], 2)
+        job_keys = [key for key in StorageManager._memory_storage if key.startswith(f"export_job_{job['id']}")]
+        self.assertEqual(len(job_keys), 4)
+        self.assertTrue(all(key in StorageManager._memory_expiry for key in job_keys))
+
+        data = json.loads(''.join(manager.stream_artifact(job)['stream']))
+        self.assertEqual([issue['number'] for issue in data['issues']], [1, 2, 3])
+        self.assertFalse([key for key in StorageManager._memory_storage if key.startswith(f"export_job_{job['id']}")])
+
+    def test_concurrent_step_does_not_take_claimed_lease(self):
+        """测试其他调用已获取租约时，基于旧状态的调用不会重复执行同一页"""
+        service = MagicMock()
+        service.get_repo_info.return_value = {'success': True, 'data': {'name': 'repo'}}
+        service.probe_repo_freshness.return_value = {'success': False, 'error': 'offline'}
+        service.get_rate_limit_status.return_value = {'remaining': 5000, 'limit': 5000, 'reset': 0}
+
+        manager = ExportJobManager()
+        self.addCleanup(setattr, manager.storage, 'storage_type', manager.storage.storage_type)
+        manager.storage.storage_type = 'memory'
+        with patch('utils.data_exporter.GitHubService', return_value=service):
+            job_id = manager.create_job('token', 'alice', ['owner/repo'])['job']['id']
+            stale = manager.get_job(job_id, 'alice')
+            # 另一个实例在读取之后获取了租约
+            manager.storage.update_export_job(job_id, lambda job: dict(job, lease_until=time.time() + 30))
+
+            job = manager.run_steps(stale, 'token')
+
+        service.get_repo_comments_page.assert_not_called()
+        self.assertGreater(job['lease_until'], time.time())
+        manager.delete_job(job)
+
+    def test_jobs_rejected_on_blob_storage(self):
+        """测试 Vercel Blob 存储下明确拒绝创建后台导出任务"""
+        manager = ExportJobManager()
+        self.addCleanup(setattr, manager.storage, 'storage_type', manager.storage.storage_type)
+        manager.storage.storage_type = 'vercel_blob'
+
+        result = manager.create_job('token', 'alice', ['owner/repo'])
+
+        self.assertFalse(result['success'])
+        self.assertIn('Blob', result['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, render_template_string
+from utils.fragment_cache import FragmentCache
+
+class TestFragmentCache(unittest.TestCase):
+    """模板片段缓存测试类"""
+
+    def setUp(self):
+        """在临时模板目录上创建应用，片段模板输出条目名称"""
+        self.template_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.template_folder, True)
+        self._write_fragment('<li>{{ item.name }}</li>')
+
+        self.cache = FragmentCache(ttl=60)
+        self.app = Flask(__name__, template_folder=self.template_folder)
+        self.app.debug = True
+        self.cache.init_app(self.app)
+
+        @self.app.route('/page')
+        def page():
+            items = [{'id': 1, 'name': 'a', 'updated_at': 't1'}, {'id': 2, 'name': 'b', 'updated_at': 't1'}]
+            return self._render(items)
+
+        self.client = self.app.test_client()
+
+    def _write_fragment(self, source):
+        with open(os.path.join(self.template_folder, 'row.html'), 'w') as f:
+            f.write(source)
+
+    def _render(self, items):
+        return render_template_string(
+            "{% for item in items %}{{ cached_fragment('row.html', key=(item.id, item.updated_at), item=item) }}{% endfor %}",
+            items=items)
+
+    def test_key_change_rerenders_fragment(self):
+        """测试 updated_at 不变时命中缓存，变化后重新渲染"""
+        with self.app.test_request_context():
+            self.assertEqual(self._render([{'id': 1, 'name': 'a', 'updated_at': 't1'}]), '<li>a</li>')
+            self.assertEqual(self._render([{'id': 1, 'name': 'stale', 'updated_at': 't1'}]), '<li>a</li>')
+            self.assertEqual(self._render([{'id': 1, 'name': 'b', 'updated_at': 't2'}]), '<li>b</li>')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_template_change_and_ttl_invalidate_fragments(self):
+        """测试调试模式下修改片段模板后重新渲染，片段超过有效期后重新渲染"""
+        item = {'id': 1, 'name': 'a', 'updated_at': 't1'}
+        with self.app.test_request_context():
+            self.app.preprocess_request()
+            self.assertEqual(self._render([item]), '<li>a</li>')
+
+        self._write_fragment('<p>{{ item.name }}</p>')
+        with self.app.test_request_context():
+            self.app.preprocess_request()
+            self.assertEqual(self._render([item]), '<p>a</p>')
+            self.assertEqual(self.cache.misses, 2)
+
+            self.assertEqual(self._render([item]), '<p>a</p>')
+            self.assertEqual(self.cache.hits, 1)
+            with patch('utils.fragment_cache.time.time', return_value=time.time() + 61):
+                self._render([item])
+            self.assertEqual(self.cache.misses, 3)
+
+    def test_stats_header(self):
+        """测试响应头报告本页的片段命中率"""
+        self.assertEqual(self.client.get('/page').headers['X-Fragment-Cache'], 'hits=0; misses=2; hit-rate=0.0')
+        self.assertEqual(self.client.get('/page').headers['X-Fragment-Cache'], 'hits=2; misses=0; hit-rate=1.0')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.markdown_preview import MarkdownPreviewRenderer, split_markdown_blocks
+
+class TestMarkdownPreview(unittest.TestCase):
+    """Markdown 增量预览测试类"""
+
+    def test_split_keeps_fenced_code_together(self):
+        """测试围栏代码块中的空行不会拆分块"""
+        text = "# 标题\n\n```python\nx = 1\n\ny = 2\n```\n\n段落"
+        blocks = split_markdown_blocks(text)
+        self.assertEqual(len(blocks), 3)
+        self.assertIn('y = 2', blocks[1])
+
+    def test_split_keeps_loose_list_together(self):
+        """测试松散列表和缩进续行属于同一个块"""
+        text = "- a\n\n- b\n\n  续行\n\n段落"
+        blocks = split_markdown_blocks(text)
+        self.assertEqual(blocks, ["- a\n\n- b\n\n  续行", "段落"])
+
+    def test_only_changed_blocks_are_rendered(self):
+        """测试只重新渲染发生变化的块"""
+        renderer = MarkdownPreviewRenderer()
+        first = renderer.render("# 标题\n\n第一段\n\n第二段")
+        self.assertEqual(first['rendered'], 3)
+
+        second = renderer.render("# 标题\n\n第一段（已修改）\n\n第二段")
+        self.assertEqual(second['blocks'], 3)
+        self.assertEqual(second['rendered'], 1)
+        self.assertEqual(second['cached'], 2)
+        self.assertIn('第一段（已修改）', second['html'])
+
+    def test_reference_links_render_whole_document(self):
+        """测试引用式链接定义时整篇渲染"""
+        renderer = MarkdownPreviewRenderer()
+        result = renderer.render("见 [文档][doc]\n\n[doc]: https://example.com")
+        self.assertEqual(result['blocks'], 1)
+        self.assertIn('href="https://example.com"', result['html'])
+
+if __name__ == '__main__':
+    unittest.main()
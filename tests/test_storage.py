@@ -0,0 +1,481 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.kv_client import KVClient
+from utils.storage import StorageManager, get_storage
+
+class TestStorageManager(unittest.TestCase):
+    """存储管理器测试类"""
+
+    def setUp(self):
+        """使用内存存储，并清空进程内共享的数据"""
+        env = patch.dict(os.environ, {'STORAGE_TYPE': 'memory', 'FLASK_ENV': '', 'FLASK_DEBUG': ''})
+        env.start()
+        self.addCleanup(env.stop)
+        StorageManager._memory_storage.clear()
+        self.addCleanup(StorageManager._memory_storage.clear)
+        StorageManager._memory_versions.clear()
+        StorageManager._repo_layout_ready = False
+
+    def test_shared_instance_and_memory(self):
+        """测试共享实例，以及内存存储在不同实例之间不丢失数据"""
+        self.assertIs(get_storage(), get_storage())
+
+        StorageManager().save_repos({'repositories': [{'full_name': 'owner/repo'}]})
+        repos = StorageManager().get_repos()
+        self.assertEqual([repo['full_name'] for repo in repos['repositories']], ['owner/repo'])
+
+    def test_read_cache(self):
+        """测试热点数据读取走缓存，返回副本，本进程写入后立即可见"""
+        storage = StorageManager()
+        with patch.object(storage, '_load_repos', wraps=storage._load_repos) as backend:
+            first = storage.get_repos()
+            first['repositories'].append({'full_name': 'mutated/locally'})
+            self.assertEqual(storage.get_repos()['repositories'], [])
+            self.assertEqual(backend.call_count, 1)
+
+            storage.save_repos({'repositories': [{'full_name': 'owner/repo'}]})
+            self.assertEqual(len(storage.get_repos()['repositories']), 1)
+            self.assertEqual(backend.call_count, 1)
+
+            storage.get_repos(force_refresh=True)
+            self.assertEqual(backend.call_count, 2)
+
+    def test_blob_read_falls_back_to_last_good_value(self):
+        """测试 Blob 读取失败时立即返回上一次成功读取的数据，不等待重试"""
+        storage = StorageManager()
+        storage.storage_type = 'vercel_blob'
+        storage.blob_token = 'token'
+        storage.READ_CACHE_TTL = 0
+        self.addCleanup(StorageManager._blob_urls.clear)
+        self.addCleanup(StorageManager._blob_last_good.clear)
+
+        with patch.object(StorageManager._blob_session, 'get') as get:
+            get.return_value.status_code = 200
+            get.return_value.json.side_effect = [
+                {'blobs': [{'pathname': 'repos.json', 'url': 'https://store/repos.json'}], 'hasMore': False},
+                {'repositories': [{'full_name': 'owner/repo'}]}
+            ]
+            self.assertEqual(len(storage.get_repos()['repositories']), 1)
+
+            get.reset_mock()
+            get.side_effect = TimeoutError('slow')
+            self.assertEqual(len(storage.get_repos()['repositories']), 1)
+            # 已知 URL 时直接下载，不再列出文件
+            get.assert_called_once()
+            self.assertEqual(get.call_args[0][0], 'https://store/repos.json')
+
+    def test_blob_url_is_revalidated_after_ttl(self):
+        """测试缓存的 Blob URL 过期后重新列出，读到其他实例上传的新版本，下载时绕过 CDN 缓存"""
+        storage = StorageManager()
+        storage.storage_type = 'vercel_blob'
+        storage.blob_token = 'token'
+        storage.READ_CACHE_TTL = 0
+        storage.BLOB_URL_TTL = 0
+        self.addCleanup(StorageManager._blob_urls.clear)
+        self.addCleanup(StorageManager._blob_last_good.clear)
+
+        with patch.object(StorageManager._blob_session, 'get') as get:
+            get.return_value.status_code = 200
+            get.return_value.json.side_effect = [
+                {'blobs': [{'pathname': 'repos.json', 'url': 'https://store/repos-1.json'}], 'hasMore': False},
+                {'repositories': []},
+                {'blobs': [{'pathname': 'repos.json', 'url': 'https://store/repos-2.json', 'uploadedAt': '2'}],
+                 'hasMore': False},
+                {'repositories': [{'full_name': 'owner/repo'}]}
+            ]
+            self.assertEqual(storage.get_repos()['repositories'], [])
+            self.assertEqual(len(storage.get_repos()['repositories']), 1)
+
+        self.assertEqual(get.call_args[0][0], 'https://store/repos-2.json')
+        self.assertIn('v', get.call_args[1]['params'])
+
+    def test_add_and_remove_repo(self):
+        """测试逐个添加 / 删除仓库，只写入该仓库的键，保持添加顺序"""
+        storage = StorageManager()
+        self.assertTrue(storage.add_repo({'full_name': 'alice/one', 'added_by': 'alice'})['success'])
+        self.assertTrue(storage.add_repo({'full_name': 'bob/two', 'added_by': 'Bob'})['success'])
+        self.assertTrue(storage.add_repo({'full_name': 'Alice/One'})['exists'])
+
+        repos = StorageManager().get_repos(force_refresh=True)
+        self.assertEqual([repo['full_name'] for repo in repos['repositories']], ['alice/one', 'bob/two'])
+        self.assertEqual(repos['total_count'], 2)
+        self.assertEqual(StorageManager._memory_storage['repos_index']['users'], {'alice': ['alice/one'], 'bob': ['bob/two']})
+
+        storage.add_repo({'full_name': 'demo/notes', 'added_by': 'carol', 'is_default': True})
+        self.assertEqual([repo['full_name'] for repo in storage.get_user_repos('ALICE')['repositories']],
+                         ['alice/one', 'demo/notes'])
+        self.assertEqual(len(storage.get_user_repos('bob', is_admin=True)['repositories']), 3)
+
+        self.assertTrue(storage.remove_repo('ALICE/one')['success'])
+        self.assertEqual([repo['full_name'] for repo in storage.get_user_repos('alice')['repositories']],
+                         ['demo/notes'])
+        self.assertTrue(storage.remove_repo('alice/one')['not_found'])
+        self.assertNotIn('repo_alice__one', StorageManager._memory_storage)
+        self.assertEqual([repo['full_name'] for repo in storage.get_repos()['repositories']], ['bob/two', 'demo/notes'])
+
+    def test_legacy_repos_document_is_migrated(self):
+        """测试旧的整体仓库列表在首次读取时拆分为单独的键"""
+        StorageManager._memory_storage['repos'] = {
+            'repositories': [{'full_name': 'alice/one'}, {'full_name': 'bob/two'}],
+            'last_updated': '2024-01-01T00:00:00'
+        }
+        repos = StorageManager().get_repos()
+        self.assertEqual([repo['full_name'] for repo in repos['repositories']], ['alice/one', 'bob/two'])
+        self.assertEqual(repos['last_updated'], '2024-01-01T00:00:00')
+        self.assertEqual(StorageManager._memory_storage['repos_index']['names'], ['alice/one', 'bob/two'])
+
+    def test_concurrent_whitelist_updates_are_not_lost(self):
+        """测试并发修改白名单时，带版本检查的写入不会丢失更新"""
+        import threading
+        from utils.auth import AuthManager
+        storage = get_storage()
+        self.addCleanup(setattr, storage, 'storage_type', storage.storage_type)
+        storage.storage_type = 'memory'
+        storage.CAS_MAX_RETRIES = 100
+        self.addCleanup(storage.invalidate_read_cache)
+        self.addCleanup(vars(storage).pop, 'CAS_MAX_RETRIES')
+        original = storage._get_versioned
+
+        def slow_read(key):
+            # 放大读取和写入之间的窗口，让并发写入必然冲突
+            value = original(key)
+            threading.Event().wait(0.001)
+            return value
+
+        auth_manager = AuthManager()
+        with patch.object(storage, '_get_versioned', side_effect=slow_read):
+            threads = [threading.Thread(target=auth_manager.add_user_to_whitelist, args=(f'user{i}',))
+                       for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(storage.get_user_whitelist()['allowed_users'], [f'user{i}' for i in range(8)])
+        self.assertGreater(storage.get_contention_stats()['conflicts'], 0)
+
+    def test_login_counters(self):
+        """测试登录计数：内存存储原地累加，KV 存储一次往返完成"""
+        storage = StorageManager()
+        for username in ('alice', 'alice', 'bob'):
+            self.assertTrue(storage.record_user_login(username))
+        stats = storage.get_user_stats()
+        self.assertEqual(stats['total_logins'], 3)
+        self.assertEqual(stats['user_stats']['alice']['login_count'], 2)
+        self.assertEqual(sum(day['logins'] for day in stats['daily_stats'].values()), 3)
+
+        storage.storage_type = 'vercel_kv'
+        storage.kv = KVClient('https://kv.example.com', 'token')
+        StorageManager._login_counters_ready = True
+        self.addCleanup(setattr, StorageManager, '_login_counters_ready', False)
+        # 今天已清理过期汇总，只剩记录登录的一次往返
+        import datetime
+        StorageManager._login_compacted_on = datetime.datetime.now().strftime('%Y-%m-%d')
+        self.addCleanup(setattr, StorageManager, '_login_compacted_on', None)
+        with patch.object(storage.kv.session, 'post') as post:
+            post.return_value.status_code = 200
+            post.return_value.json.return_value = [{'result': 1}] * 8
+            self.assertTrue(storage.record_user_login('alice'))
+
+        post.assert_called_once()
+        commands = post.call_args[1]['json']
+        self.assertEqual(commands[0], ['INCR', 'login_total'])
+        self.assertEqual(commands[1], ['HINCRBY', 'login_user:alice', 'login_count', '1'])
+        self.assertEqual([command[0] for command in commands[2:]], ['HSET', 'HSETNX', 'SADD', 'HINCRBY', 'HINCRBY', 'HINCRBY'])
+        self.assertEqual([command[1] for command in commands[5:]], ['login_daily', 'login_weekly', 'login_monthly'])
+
+    def test_kv_login_migration_is_one_script(self):
+        """测试 KV 登录统计迁移的标记和合并在同一个脚本中执行"""
+        storage = StorageManager()
+        storage.storage_type = 'vercel_kv'
+        storage.kv = KVClient('https://kv.example.com', 'token')
+        self.addCleanup(setattr, StorageManager, '_login_counters_ready', False)
+        legacy = {'total_logins': 3, 'user_stats': {'alice': {'login_count': 3, 'first_login': '2024-01-01'}},
+                  'daily_stats': {}}
+
+        with patch.object(storage.kv.session, 'post') as post:
+            post.return_value.status_code = 200
+            post.return_value.json.side_effect = [{'result': None}, {'result': json.dumps(legacy)}, {'result': 1}]
+            storage._ensure_login_counters_in_kv()
+
+        self.assertEqual(post.call_count, 3)
+        command = post.call_args[1]['json']
+        self.assertEqual(command[:8], ['EVAL', StorageManager.LOGIN_MIGRATE_SCRIPT, '5', 'login_stats_migrated',
+                                       'login_total', 'login_users', 'login_user:alice', 'login_user:alice'])
+        self.assertEqual(command[8:], ['INCRBY', '1', '3', 'SADD', '1', 'alice', 'HINCRBY', '2', 'login_count', '3',
+                                       'HSETNX', '2', 'first_login', '2024-01-01'])
+        self.assertTrue(StorageManager._login_counters_ready)
+
+    def test_kv_conditional_write_retries_on_conflict(self):
+        """测试 KV 条件写入冲突时重新读取后重试"""
+        storage = StorageManager()
+        storage.storage_type = 'vercel_kv'
+        storage.kv = KVClient('https://kv.example.com', 'token')
+
+        with patch.object(storage.kv.session, 'post') as post, patch('utils.storage.time.sleep'):
+            post.return_value.status_code = 200
+            post.return_value.json.side_effect = [
+                {'result': [json.dumps({'names': ['alice']}), '3']},
+                {'result': 0},
+                {'result': [json.dumps({'names': ['alice', 'bob']}), '4']},
+                {'result': 5}
+            ]
+            data = storage._update_data('settings', lambda doc: {'names': doc['names'] + ['carol']})
+
+        self.assertEqual(data, {'names': ['alice', 'bob', 'carol']})
+        self.assertEqual(post.call_count, 4)
+        command = post.call_args[1]['json']
+        self.assertEqual(command[:5], ['EVAL', StorageManager.KV_COMPARE_AND_SET_SCRIPT, '2',
+                                       'settings', 'settings:version'])
+        self.assertEqual(command[5], '4')
+        self.assertEqual(json.loads(command[6])['names'], ['alice', 'bob', 'carol'])
+
+    def test_login_rollups_and_retention(self):
+        """测试登录按日 / 周 / 月汇总，超过保留期限的按日汇总被清理而按月汇总保留"""
+        import datetime
+        storage = StorageManager()
+        stats = {}
+        storage._add_login(stats, 'alice', datetime.datetime(2024, 1, 1, 9))
+        storage._add_login(stats, 'alice', datetime.datetime(2024, 1, 2, 9))
+        self.assertEqual(stats['daily_stats'], {'2024-01-01': {'logins': 1}, '2024-01-02': {'logins': 1}})
+        self.assertEqual(stats['weekly_stats'], {'2024-W01': {'logins': 2}})
+        self.assertEqual(stats['monthly_stats'], {'2024-01': {'logins': 2}})
+
+        storage._add_login(stats, 'bob', datetime.datetime(2024, 6, 1, 9))
+        self.assertEqual(list(stats['daily_stats']), ['2024-06-01'])
+        self.assertEqual(stats['monthly_stats'], {'2024-01': {'logins': 2}, '2024-06': {'logins': 1}})
+
+        StorageManager._memory_storage['user_stats'] = stats
+        summary = storage.get_login_summary(['alice', 'carol'])
+        self.assertEqual(summary['total_logins'], 3)
+        self.assertEqual(list(summary['user_stats']), ['alice'])
+
+    def test_kv_repos_read_in_two_round_trips(self):
+        """测试 KV 存储下先读取仓库索引，再通过一次 MGET 读取各仓库"""
+        storage = StorageManager()
+        storage.storage_type = 'vercel_kv'
+        storage.kv = KVClient('https://kv.example.com', 'token')
+        repos = [{'full_name': 'alice/repo', 'added_by': 'alice'}, {'full_name': 'bob/repo', 'added_by': 'bob'}]
+        meta = json.dumps({'last_updated': 'now', 'index_version': StorageManager.REPO_INDEX_VERSION})
+
+        with patch.object(storage.kv.session, 'post') as post:
+            post.return_value.status_code = 200
+            post.return_value.json.side_effect = [
+                [{'result': ['alice/repo', 'bob/repo']}, {'result': meta}],
+                {'result': [json.dumps(repo) for repo in repos]}
+            ]
+            data = storage.get_repos()
+
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(post.call_args_list[0][1]['json'], [['ZRANGE', 'repos_index', '0', '-1'], ['GET', 'repos_meta']])
+        self.assertEqual(post.call_args_list[1][1]['json'], ['MGET', 'repo_alice__repo', 'repo_bob__repo'])
+        self.assertEqual(len(data['repositories']), 2)
+
+    def test_kv_repo_writes_are_atomic(self):
+        """测试 KV 存储下添加仓库只需一个脚本，整体替换在其他实例修改后重新读取并重试"""
+        storage = StorageManager()
+        storage.storage_type = 'vercel_kv'
+        storage.kv = KVClient('https://kv.example.com', 'token')
+        StorageManager._repo_layout_ready = True
+        self.addCleanup(setattr, StorageManager, '_repo_layout_ready', False)
+
+        with patch.object(storage.kv.session, 'post') as post:
+            post.return_value.status_code = 200
+            post.return_value.json.return_value = {'result': 0}
+            self.assertTrue(storage.add_repo({'full_name': 'Alice/Repo', 'added_by': 'alice'})['exists'])
+
+        post.assert_called_once()
+        command = post.call_args[1]['json']
+        self.assertEqual(command[:8], ['EVAL', StorageManager.REPO_ADD_SCRIPT, '5', 'repo_alice__repo',
+                                       'repos_index', 'repos_user_alice', 'repos_meta', 'repos_default'])
+
+        old = {'full_name': 'old/repo', 'added_by': 'bob'}
+        with patch.object(storage.kv.session, 'post') as post, patch('utils.storage.time.sleep'):
+            post.return_value.status_code = 200
+            post.return_value.json.side_effect = [
+                [{'result': []}, {'result': None}],
+                {'result': 0},
+                [{'result': ['old/repo']}, {'result': 'meta'}],
+                {'result': [json.dumps(old)]},
+                {'result': 1}
+            ]
+            self.assertTrue(storage.save_repos({'repositories': [{'full_name': 'new/repo', 'added_by': 'carol',
+                                                                  'is_default': True}]}))
+
+        self.assertEqual(post.call_count, 5)
+        command = post.call_args[1]['json']
+        self.assertEqual(command[:3], ['EVAL', StorageManager.REPO_REPLACE_SCRIPT, '7'])
+        self.assertEqual(command[3:10], ['repos_index', 'repos_default', 'repos_meta', 'repo_old__repo',
+                                         'repos_user_bob', 'repo_new__repo', 'repos_user_carol'])
+        self.assertEqual(command[10:12], ['meta', '2'])
+        self.assertEqual(command[13], 'new/repo')
+        self.assertEqual(command[15], '1')
+
+    def test_whitelist_bulk_operations(self):
+        """测试白名单批量添加 / 移除、CSV 导入、O(1) 权限检查和分页列表"""
+        from utils.auth import AuthManager
+        storage = StorageManager()
+        self.assertEqual(storage.check_user_access('anyone'), {'allowed': True, 'admin': False})
+
+        result = AuthManager().import_whitelist_csv('username,is_admin\nAlice,true\nbob\ncarol,0\nbad name!\n')
+        self.assertEqual((result['added'], result['imported'], result['invalid']), (3, 3, ['bad name!']))
+        self.assertEqual(storage.add_whitelist_users({'BOB': False, 'dave': True})['added'], 1)
+
+        self.assertEqual(storage.check_user_access('ALICE'), {'allowed': True, 'admin': True})
+        self.assertEqual(storage.check_user_access('bob'), {'allowed': True, 'admin': False})
+        self.assertFalse(storage.check_user_access('eve')['allowed'])
+
+        page = storage.list_whitelist_users(page=2, per_page=3)
+        self.assertEqual(page['users'], [{'username': 'dave', 'is_admin': True}])
+        self.assertEqual((page['total'], page['user_count'], page['admin_count']), (4, 4, 2))
+        self.assertEqual([user['username'] for user in storage.list_whitelist_users(query='B')['users']], ['bob'])
+
+        self.assertEqual(storage.remove_whitelist_users(['alice', 'ghost'])['removed'], 1)
+        self.assertEqual(storage.get_user_whitelist(), {'allowed_users': ['bob', 'carol', 'dave'], 'admin_users': ['dave']})
+
+    def test_kv_whitelist_check_is_one_round_trip(self):
+        """测试 KV 存储下检查白名单和管理员权限只需一次往返"""
+        storage = StorageManager()
+        storage.storage_type = 'vercel_kv'
+        storage.kv = KVClient('https://kv.example.com', 'token')
+        StorageManager._whitelist_ready = True
+        self.addCleanup(setattr, StorageManager, '_whitelist_ready', False)
+
+        with patch.object(storage.kv.session, 'post') as post:
+            post.return_value.status_code = 200
+            post.return_value.json.return_value = [{'result': 2}, {'result': '0'}, {'result': 0}]
+            self.assertEqual(storage.check_user_access('Alice'), {'allowed': True, 'admin': False})
+
+        post.assert_called_once()
+        self.assertEqual(post.call_args[1]['json'], [['ZCARD', 'whitelist_users'], ['ZSCORE', 'whitelist_users', 'alice'],
+                                                     ['SISMEMBER', 'whitelist_admins', 'alice']])
+
+    def test_kv_whitelist_replace_is_atomic(self):
+        """测试 KV 存储下整体替换和迁移白名单时先写临时键，再原子替换，迁移标记与集合同时生效"""
+        storage = StorageManager()
+        storage.storage_type = 'vercel_kv'
+        storage.kv = KVClient('https://kv.example.com', 'token')
+        self.addCleanup(setattr, StorageManager, '_whitelist_ready', False)
+        legacy = json.dumps({'allowed_users': ['Alice', 'bob'], 'admin_users': ['alice']})
+
+        with patch.object(storage.kv.session, 'post') as post:
+            post.return_value.status_code = 200
+            post.return_value.json.side_effect = [
+                {'result': 0}, {'result': legacy},
+                [{'result': 2}, {'result': 2}, {'result': 1}] + [{'result': 1}] * 3,
+                {'result': 1},
+                [{'result': 1}, {'result': 1}] + [{'result': 1}] * 3,
+                {'result': 1},
+            ]
+            storage._ensure_whitelist_in_kv()
+            self.assertTrue(StorageManager._whitelist_ready)
+            self.assertTrue(storage.save_user_whitelist({'allowed_users': ['carol'], 'admin_users': []}))
+
+        commands = [call[1]['json'] for call in post.call_args_list]
+        self.assertEqual(commands[0], ['EXISTS', 'whitelist_migrated'])
+        temp_users = commands[2][0][1]
+        self.assertTrue(temp_users.startswith('whitelist_users:tmp:'))
+        self.assertEqual(commands[2][0][2:], ['0', 'alice', '0', 'bob'])
+        self.assertEqual(commands[2][1][2:], ['alice', 'Alice', 'bob', 'bob'])
+        self.assertEqual(commands[2][2][2:], ['alice'])
+        self.assertEqual(commands[3][0], 'EVAL')
+        self.assertEqual(commands[3][3:6], ['whitelist_users', 'whitelist_names', 'whitelist_admins'])
+        self.assertEqual(commands[3][-2:], ['whitelist_migrated', '1'])
+        # 整体替换不会先删除正式键
+        self.assertFalse([command for command in commands if command[0] == 'DEL'])
+        self.assertEqual(commands[-1][-1], '0')
+
+    def test_kv_user_repos_use_visibility_index(self):
+        """测试普通用户的仓库通过用户集合和默认仓库集合查找，只读取可见的仓库"""
+        storage = StorageManager()
+        storage.storage_type = 'vercel_kv'
+        storage.kv = KVClient('https://kv.example.com', 'token')
+        StorageManager._repo_layout_ready = True
+        repos = {'alice/b': {'full_name': 'alice/b', 'added_by': 'Alice'},
+                 'demo/notes': {'full_name': 'demo/notes', 'is_default': True}}
+
+        with patch.object(storage.kv.session, 'post') as post:
+            post.return_value.status_code = 200
+            post.return_value.json.side_effect = [
+                [{'result': ['alice/b']}, {'result': ['demo/notes']}, {'result': json.dumps({'last_updated': 'now'})}],
+                [{'result': [json.dumps(repos['alice/b']), json.dumps(repos['demo/notes'])]},
+                 {'result': ['1700000000', '0']}]
+            ]
+            user_repos = storage.get_user_repos('ALICE')
+            # 再次读取命中缓存
+            self.assertEqual(storage.get_user_repos('alice'), user_repos)
+
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(post.call_args_list[0][1]['json'][0], ['SMEMBERS', 'repos_user_alice'])
+        self.assertEqual(post.call_args_list[1][1]['json'][1], ['ZMSCORE', 'repos_index', 'alice/b', 'demo/notes'])
+        # 按添加顺序排列
+        self.assertEqual([repo['full_name'] for repo in user_repos['repositories']], ['demo/notes', 'alice/b'])
+        self.assertEqual(user_repos['last_updated'], 'now')
+
+    def test_memory_cache_expiry_lru_and_invalidation(self):
+        """测试内存缓存：过期、按字节限额淘汰最久未用的缓存项、按前缀和标签失效"""
+        storage = StorageManager()
+        storage.CACHE_MEMORY_MAX_BYTES = 40
+        self.assertTrue(storage.set_cache('issues:a/b', ['x' * 10], namespace='github', tags=['repo:a/b']))
+        self.assertTrue(storage.set_cache('issues:c/d', ['y' * 10], namespace='github'))
+        self.assertEqual(storage.get_cache('issues:a/b', namespace='github'), ['x' * 10])
+        self.assertIsNone(storage.get_cache('issues:a/b'))
+
+        # 超出字节限额时淘汰最久未使用的 issues:c/d
+        storage.set_cache('user', {'login': 'z'}, namespace='github')
+        self.assertIsNone(storage.get_cache('issues:c/d', namespace='github'))
+        self.assertEqual(storage.invalidate_cache_tag('repo:a/b'), 1)
+        self.assertEqual(storage.invalidate_cache('github'), 1)
+
+        storage.set_cache('short', 1, ttl=60)
+        with patch('utils.cache.time.time', return_value=time.time() + 3600):
+            self.assertIsNone(storage.get_cache('short'))
+
+        stats = storage.get_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['expired']), (1, 3, 1, 1))
+        self.assertEqual((stats['entries'], stats['bytes']), (0, 0))
+
+    def test_sqlite_cache(self):
+        """测试文件存储下的 SQLite 缓存：读写、前缀失效、清理过期缓存项"""
+        import tempfile
+        storage = StorageManager()
+        storage.storage_type = 'file'
+        storage.CACHE_SQLITE_PATH = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+
+        storage.set_cache('issues:a/b', {'count': 1}, namespace='github')
+        storage.set_cache('issues_x', 1, ttl=1, namespace='github')
+        storage.set_cache('issues:a/c', 2, namespace='other', tags=['t'])
+        self.assertEqual(storage.get_cache('issues:a/b', namespace='github'), {'count': 1})
+        # _ 不作为通配符
+        self.assertEqual(storage.invalidate_cache('github', 'issues:'), 1)
+        with patch('utils.cache.time.time', return_value=time.time() + 3600):
+            self.assertEqual(storage.clear_expired_cache(), 2)
+        self.assertIsNone(storage.get_cache('issues:a/c', namespace='other'))
+
+    def test_kv_cache_uses_native_expiry(self):
+        """测试 KV 缓存使用 SET EX 写入，默认有效期为 Config.CACHE_TIMEOUT"""
+        from config import Config
+        storage = StorageManager()
+        storage.storage_type = 'vercel_kv'
+        storage.kv = KVClient('https://kv.example.com', 'token')
+
+        with patch.object(storage.kv.session, 'post') as post:
+            post.return_value.status_code = 200
+            post.return_value.json.side_effect = [{'result': 'OK'}, {'result': json.dumps({'a': 1})}]
+            self.assertTrue(storage.set_cache('repo', {'a': 1}, namespace='github'))
+            self.assertEqual(storage.get_cache('repo', namespace='github'), {'a': 1})
+
+        self.assertEqual(post.call_args_list[0][1]['json'],
+                         ['SET', 'cache:github:repo', '{"a": 1}', 'EX', str(Config.CACHE_TIMEOUT)])
+        self.assertEqual(post.call_args_list[1][1]['json'], ['GET', 'cache:github:repo'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态资源指纹与预压缩
+url_for('static') 解析为带内容哈希的文件名（如 css/main.1a2b3c4d5e.css），
+指纹资源以 immutable 长缓存下发，并按 Accept-Encoding 选择预压缩的 .br / .gz 版本
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from typing import Dict, List
+from flask import request, send_from_directory
+
+# brotli 为可选依赖，未安装时构建只生成 .gz
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# 需要加指纹的资源类型
+FINGERPRINT_EXTENSIONS = ('.css', '.js')
+# 构建生成的清单文件（相对静态目录）
+MANIFEST_FILENAME = 'asset-manifest.json'
+# 已带指纹的文件名，如 main.1a2b3c4d5e.css
+FINGERPRINTED_RE = re.compile(r'\.[0-9a-f]{10}\.[a-z]+$')
+# 预压缩文件扩展名与 Content-Encoding 的对应关系（按优先级排列）
+PRECOMPRESSED_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _iter_source_assets(static_folder: str) -> List[str]:
+    """列出静态目录中需要加指纹的源文件（相对路径，使用 / 分隔）"""
+    assets = []
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(FINGERPRINT_EXTENSIONS) or FINGERPRINTED_RE.search(name):
+                continue
+            path = os.path.relpath(os.path.join(root, name), static_folder)
+            assets.append(path.replace(os.sep, '/'))
+    return sorted(assets)
+
+
+def fingerprint_name(path: str, content: bytes) -> str:
+    """根据文件内容生成带指纹的文件名"""
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    base, ext = os.path.splitext(path)
+    return f'{base}.{digest}{ext}'
+
+
+def compute_manifest(static_folder: str) -> Dict[str, str]:
+    """计算源文件到指纹文件名的映射"""
+    manifest = {}
+    for path in _iter_source_assets(static_folder):
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            manifest[path] = fingerprint_name(path, f.read())
+    return manifest
+
+
+def build_assets(static_folder: str) -> Dict[str, str]:
+    """构建静态资源：写出指纹文件及其 .gz / .br 预压缩版本，并生成清单
+
+    Args:
+        static_folder: 静态资源目录
+
+    Returns:
+        源文件到指纹文件名的映射
+    """
+    manifest = compute_manifest(static_folder)
+
+    for source, fingerprinted in manifest.items():
+        with open(os.path.join(static_folder, source), 'rb') as f:
+            content = f.read()
+
+        target = os.path.join(static_folder, fingerprinted)
+        with open(target, 'wb') as f:
+            f.write(content)
+
+        # mtime=0 保证相同内容的构建结果逐字节一致
+        with open(f'{target}.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+
+        if BROTLI_AVAILABLE:
+            with open(f'{target}.br', 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+
+        print(f"✓ {source} -> {fingerprinted}")
+
+    with open(os.path.join(static_folder, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    return manifest
+
+
+class AssetManifest:
+    """运行时资源清单：改写 url_for('static') 并提供指纹资源"""
+
+    def __init__(self):
+        self.manifest: Dict[str, str] = {}
+        self.reverse: Dict[str, str] = {}
+        self.precompressed: Dict[str, List[str]] = {}
+        self.static_folder = None
+        # 调试模式下源文件的 (路径, 修改时间, 大小)，变化时重新计算指纹
+        self._source_signature = None
+
+    def init_app(self, app) -> None:
+        """加载清单，注册 url_for 改写和静态资源视图"""
+        self.static_folder = app.static_folder
+        self.load(use_build_manifest=not app.debug)
+        app.url_defaults(self._fingerprint_url)
+        app.view_functions['static'] = self.send_static
+        if app.debug:
+            # 开发服务器运行期间修改的 CSS / JS 需要新的指纹，否则浏览器会一直使用长缓存的旧版本
+            app.before_request(self._reload_if_changed)
+
+    def load(self, use_build_manifest: bool = True) -> None:
+        """加载资源清单
+
+        优先读取构建生成的清单；调试模式下直接计算文件哈希，由 send_static 提供源文件，
+        此时没有预压缩版本，也不使用长缓存。非调试模式下只使用磁盘上存在的指纹文件
+        """
+        manifest_path = os.path.join(self.static_folder, MANIFEST_FILENAME)
+        manifest = None
+
+        if use_build_manifest and os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except Exception as e:
+                print(f"读取静态资源清单失败: {e}")
+
+        if manifest is None:
+            self._source_signature = self._compute_source_signature()
+            manifest = compute_manifest(self.static_folder)
+
+        if use_build_manifest:
+            # 生产环境中静态文件可能由 CDN（如 Vercel 的 @vercel/static）直接提供而不经过 send_static，
+            # 只改写指纹文件实际存在的资源，未构建的资源保持原 URL
+            manifest = {
+                source: fingerprinted for source, fingerprinted in manifest.items()
+                if os.path.exists(os.path.join(self.static_folder, fingerprinted))
+            }
+
+        self.manifest = manifest
+        self.reverse = {fingerprinted: source for source, fingerprinted in manifest.items()}
+        self.precompressed = {
+            fingerprinted: [
+                encoding for encoding, ext in PRECOMPRESSED_ENCODINGS
+                if os.path.exists(os.path.join(self.static_folder, fingerprinted + ext))
+            ]
+            for fingerprinted in self.reverse
+        }
+
+    def _compute_source_signature(self) -> List:
+        """源文件的 (路径, 修改时间, 大小) 列表"""
+        signature = []
+        for path in _iter_source_assets(self.static_folder):
+            stat = os.stat(os.path.join(self.static_folder, path))
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return signature
+
+    def _reload_if_changed(self) -> None:
+        """调试模式下每个请求前检查源文件，有变化时重新计算清单"""
+        if self._compute_source_signature() != self._source_signature:
+            self.load(use_build_manifest=False)
+
+    def _fingerprint_url(self, endpoint, values) -> None:
+        """url_for('static', filename=...) 解析为指纹文件名"""
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.manifest.get(values['filename'], values['filename'])
+
+    def send_static(self, filename):
+        """提供静态文件，指纹资源使用 immutable 长缓存"""
+        source = self.reverse.get(filename)
+
+        # 非指纹资源：每次使用前重新验证（ETag / Last-Modified）
+        if source is None:
+            response = send_from_directory(self.static_folder, filename)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        mimetype = mimetypes.guess_type(source)[0] or 'application/octet-stream'
+        accept = request.accept_encodings
+        available = self.precompressed.get(filename, [])
+
+        for encoding, ext in PRECOMPRESSED_ENCODINGS:
+            if encoding in available and accept[encoding] > 0:
+                response = send_from_directory(self.static_folder, filename + ext, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            if os.path.exists(os.path.join(self.static_folder, filename)):
+                response = send_from_directory(self.static_folder, filename, mimetype=mimetype)
+            else:
+                # 未构建时指纹文件不存在，直接提供源文件；源文件可能已被修改而与指纹不一致，不能长缓存
+                response = send_from_directory(self.static_folder, source, mimetype=mimetype)
+                response.vary.add('Accept-Encoding')
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+# 应用共享的静态资源清单
+asset_manifest = AssetManifest()
@@ -3,15 +3,18 @@ import jwt
 import time
 from typing import Dict, Any, Optional
 from services.github_service import GitHubService
-from utils.storage import StorageManager
+from utils.storage import get_storage
 
 class AuthManager:
     """认证管理器，处理用户认证和权限验证"""
     
+    # GitHub 用户名：字母、数字和连字符，不以连字符开头，最长 39 个字符
+    USERNAME_PATTERN = r'[A-Za-z0-9](?:[A-Za-z0-9-]{0,38})'
+    
     def __init__(self):
         self.secret_key = os.getenv('SECRET_KEY', 'vercel-secret-key')
         self.token_expiry = 24 * 60 * 60  # 24小时
-        self.storage = StorageManager()
+        self.storage = get_storage()
     
     def create_user_token(self, user_data: Dict[str, Any]) -> str:
         """创建用户认证令牌"""
@@ -57,78 +60,67 @@ class AuthManager:
         
         return None
     
-    def is_user_allowed(self, username: str) -> bool:
-        """检查用户是否在白名单中"""
+    def get_user_access(self, username: str) -> Dict[str, bool]:
+        """一次检查用户是否在白名单中、是否为管理员
+        
+        Returns:
+            {'allowed': bool, 'admin': bool}
+        """
         try:
-            whitelist = self.storage.get_user_whitelist()
-            allowed_users = whitelist.get('allowed_users', [])
-            
-            # 如果白名单为空，允许所有用户（向后兼容）
-            if not allowed_users:
-                return True
-            
-            return username.lower() in [user.lower() for user in allowed_users]
+            return self.storage.check_user_access(username)
         except Exception as e:
             print(f"检查用户白名单失败: {e}")
-            # 出错时默认允许（安全考虑）
-            return True
+            # 出错时默认允许登录，但不授予管理员权限
+            return {'allowed': True, 'admin': False}
+    
+    def is_user_allowed(self, username: str) -> bool:
+        """检查用户是否在白名单中（白名单为空时允许所有用户）"""
+        return self.get_user_access(username)['allowed']
     
     def is_user_admin(self, username: str) -> bool:
         """检查用户是否为管理员"""
-        try:
-            whitelist = self.storage.get_user_whitelist()
-            admin_users = whitelist.get('admin_users', [])
-            return username.lower() in [user.lower() for user in admin_users]
-        except Exception as e:
-            print(f"检查管理员权限失败: {e}")
-            return False
+        return self.get_user_access(username)['admin']
     
     def add_user_to_whitelist(self, username: str, is_admin: bool = False) -> bool:
         """添加用户到白名单"""
-        try:
-            whitelist = self.storage.get_user_whitelist()
-            allowed_users = whitelist.get('allowed_users', [])
-            admin_users = whitelist.get('admin_users', [])
-            
-            username_lower = username.lower()
-            
-            # 添加到允许用户列表
-            if username_lower not in [user.lower() for user in allowed_users]:
-                allowed_users.append(username)
-            
-            # 如果是管理员，添加到管理员列表
-            if is_admin and username_lower not in [user.lower() for user in admin_users]:
-                admin_users.append(username)
-            
-            whitelist['allowed_users'] = allowed_users
-            whitelist['admin_users'] = admin_users
-            
-            return self.storage.save_user_whitelist(whitelist)
-        except Exception as e:
-            print(f"添加用户到白名单失败: {e}")
-            return False
+        return self.storage.add_whitelist_users({username: is_admin})['success']
     
     def remove_user_from_whitelist(self, username: str) -> bool:
         """从白名单中移除用户"""
-        try:
-            whitelist = self.storage.get_user_whitelist()
-            allowed_users = whitelist.get('allowed_users', [])
-            admin_users = whitelist.get('admin_users', [])
-            
-            username_lower = username.lower()
-            
-            # 从允许用户列表中移除
-            allowed_users = [user for user in allowed_users if user.lower() != username_lower]
-            # 从管理员列表中移除
-            admin_users = [user for user in admin_users if user.lower() != username_lower]
-            
-            whitelist['allowed_users'] = allowed_users
-            whitelist['admin_users'] = admin_users
-            
-            return self.storage.save_user_whitelist(whitelist)
-        except Exception as e:
-            print(f"从白名单移除用户失败: {e}")
-            return False
+        return self.storage.remove_whitelist_users([username])['success']
+    
+    def import_whitelist_csv(self, content: str) -> Dict[str, Any]:
+        """从 CSV 批量导入白名单用户
+        
+        每行一个用户：用户名[,是否管理员]，第一行可以是表头；是否管理员接受 1 / true / yes / admin / 是
+        
+        Returns:
+            {'success', 'added': 新增用户数, 'imported': 有效行数, 'invalid': [无效的用户名]} 或 {'success': False, 'error'}
+        """
+        import csv
+        import io
+        import re
+        
+        users, invalid = {}, []
+        for row in csv.reader(io.StringIO(content)):
+            if not row or not row[0].strip():
+                continue
+            username = row[0].strip()
+            if username.lower() in ('username', 'user', '用户名'):
+                continue
+            if not re.fullmatch(self.USERNAME_PATTERN, username):
+                invalid.append(username)
+                continue
+            is_admin = len(row) > 1 and row[1].strip().lower() in ('1', 'true', 'yes', 'y', 'admin', '是')
+            users[username] = users.get(username, False) or is_admin
+        
+        if not users:
+            return {'success': False, 'error': 'CSV 中没有有效的用户名', 'invalid': invalid}
+        
+        result = self.storage.add_whitelist_users(users)
+        if not result['success']:
+            return result
+        return {'success': True, 'added': result['added'], 'imported': len(users), 'invalid': invalid}
     
     def check_repo_permission(self, github_service: GitHubService, 
                              repo_full_name: str, 
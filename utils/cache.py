@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+带有效期的数据缓存（用于缓存 GitHub 数据等可以重新获取的数据）
+按存储后端选择实现：KV 使用原生过期（SET EX），内存使用按字节限额的 LRU，文件存储使用 SQLite；
+缓存键按命名空间划分，支持按前缀和标签批量失效，并统计命中 / 未命中 / 淘汰次数
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.kv_client import KVClient
+
+
+class CacheTier:
+    """缓存的公共部分：键的命名空间和统计，子类实现具体的读写"""
+
+    def __init__(self):
+        self._stats: Dict[str, int] = {
+            'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expired': 0, 'invalidated': 0
+        }
+        self._stats_lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """读取缓存，不存在或已过期时返回 None"""
+        value = self._get(self._full_key(namespace, key))
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, namespace: str, key: str, data: Any, ttl: int, tags: Iterable[str] = ()) -> bool:
+        """写入缓存，ttl 秒后过期；tags 用于之后按标签批量失效"""
+        if ttl <= 0:
+            return False
+        stored = self._set(self._full_key(namespace, key), json.dumps(data, ensure_ascii=False), ttl, sorted(set(tags)))
+        if stored:
+            self._count('sets')
+        return stored
+
+    def delete(self, namespace: str, key: str) -> bool:
+        """删除一个缓存项"""
+        return self.invalidate_prefix(namespace, key, exact=True) > 0
+
+    def invalidate_prefix(self, namespace: str, prefix: str = '', exact: bool = False) -> int:
+        """删除命名空间中键以 prefix 开头的缓存项（prefix 为空时删除整个命名空间），返回删除的数量"""
+        full_key = self._full_key(namespace, prefix)
+        removed = self._delete_keys([full_key]) if exact else self._delete_prefix(full_key)
+        self._count('invalidated', removed)
+        return removed
+
+    def invalidate_tag(self, tag: str) -> int:
+        """删除带有该标签的缓存项，返回删除的数量"""
+        removed = self._delete_tag(tag)
+        self._count('invalidated', removed)
+        return removed
+
+    def purge_expired(self) -> int:
+        """清理已过期的缓存项，返回清理的数量"""
+        removed = self._purge_expired()
+        self._count('expired', removed)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """本进程的缓存统计"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 2) if lookups else 0.0
+        stats['backend'] = self.name
+        stats.update(self._size())
+        return stats
+
+    def _full_key(self, namespace: str, key: str) -> str:
+        return f'{namespace}:{key}'
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        if amount:
+            with self._stats_lock:
+                self._stats[name] += amount
+
+    def _size(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryCache(CacheTier):
+    """进程内缓存：按最近使用顺序淘汰，保存的 JSON 总字节数不超过 max_bytes"""
+
+    name = 'memory'
+
+    def __init__(self, max_bytes: int):
+        super().__init__()
+        self.max_bytes = max_bytes
+        # 键 -> (过期时间, JSON, 标签)，按最近使用排序
+        self._entries: 'OrderedDict[str, Tuple[float, str, List[str]]]' = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _get(self, full_key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._remove(full_key)
+                self._count('expired')
+                return None
+            self._entries.move_to_end(full_key)
+            value = entry[1]
+        # 每次都从 JSON 解析，调用方修改返回值不会影响缓存
+        return json.loads(value)
+
+    def _set(self, full_key: str, value: str, ttl: int, tags: List[str]) -> bool:
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            self._remove(full_key)
+            if size > self.max_bytes:
+                # 单项超过整个限额，不缓存（也不为它淘汰其他缓存项）
+                return False
+            self._entries[full_key] = (time.time() + ttl, value, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(full_key)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._count('evictions')
+        return True
+
+    def _delete_keys(self, full_keys: List[str]) -> int:
+        with self._lock:
+            return sum(self._remove(full_key) for full_key in full_keys)
+
+    def _delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            return sum(self._remove(full_key) for full_key in list(self._entries) if full_key.startswith(prefix))
+
+    def _delete_tag(self, tag: str) -> int:
+        with self._lock:
+            return sum(self._remove(full_key) for full_key in list(self._tags.get(tag, ())))
+
+    def _purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            return sum(self._remove(full_key) for full_key, entry in list(self._entries.items()) if entry[0] <= now)
+
+    def _remove(self, full_key: str) -> bool:
+        """删除一个缓存项（调用方持有锁）"""
+        entry = self._entries.pop(full_key, None)
+        if entry is None:
+            return False
+        self._bytes -= len(entry[1].encode('utf-8'))
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(full_key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def _size(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+class SQLiteCache(CacheTier):
+    """本地磁盘缓存（文件存储使用）：SQLite 数据库，多个进程可以共用"""
+
+    name = 'sqlite'
+    # 每写入这么多次顺带清理一次过期缓存项
+    PURGE_INTERVAL = 200
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._writes = 0
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_tags (tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))')
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_tags_key ON cache_tags (key)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程复用一个连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _get(self, full_key: str) -> Optional[Any]:
+        row = self._connect().execute('SELECT value, expires_at FROM cache WHERE key = ?', (full_key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= time.time():
+            if self._delete_keys([full_key]):
+                self._count('expired')
+            return None
+        return json.loads(row[0])
+
+    def _set(self, full_key: str, value: str, ttl: int, tags: List[str]) -> bool:
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                         (full_key, value, time.time() + ttl))
+            conn.execute('DELETE FROM cache_tags WHERE key = ?', (full_key,))
+            conn.executemany('INSERT INTO cache_tags (tag, key) VALUES (?, ?)', [(tag, full_key) for tag in tags])
+        self._writes += 1
+        if self._writes % self.PURGE_INTERVAL == 0:
+            self.purge_expired()
+        return True
+
+    def _delete_keys(self, full_keys: List[str]) -> int:
+        with self._connect() as conn:
+            removed = 0
+            for full_key in full_keys:
+                removed += conn.execute('DELETE FROM cache WHERE key = ?', (full_key,)).rowcount
+                conn.execute('DELETE FROM cache_tags WHERE key = ?', (full_key,))
+            return removed
+
+    def _delete_prefix(self, prefix: str) -> int:
+        # LIKE 中的 % 和 _ 是通配符，需要转义
+        pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache_tags WHERE key LIKE ? ESCAPE '\\'", (pattern,))
+            return conn.execute("DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (pattern,)).rowcount
+
+    def _delete_tag(self, tag: str) -> int:
+        keys = [row[0] for row in self._connect().execute('SELECT key FROM cache_tags WHERE tag = ?', (tag,))]
+        return self._delete_keys(keys)
+
+    def _purge_expired(self) -> int:
+        with self._connect() as conn:
+            now = time.time()
+            conn.execute('DELETE FROM cache_tags WHERE key IN (SELECT key FROM cache WHERE expires_at <= ?)', (now,))
+            return conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,)).rowcount
+
+    def _size(self) -> Dict[str, Any]:
+        return {'entries': self._connect().execute('SELECT COUNT(*) FROM cache').fetchone()[0]}
+
+
+class KVCache(CacheTier):
+    """Vercel KV 缓存：过期由 KV 处理（SET EX），标签是保存缓存键的集合"""
+
+    name = 'kv'
+    KEY_PREFIX = 'cache:'
+    TAG_PREFIX = 'cache_tag:'
+    # 按前缀失效时每次 SCAN / DEL 处理的键数
+    BATCH_SIZE = 500
+    # 写入缓存并加入标签集合；标签集合的有效期延长到不短于其中最晚过期的缓存项
+    SET_WITH_TAGS_SCRIPT = (
+        "redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2]) "
+        "for i = 2, #KEYS do "
+        "redis.call('SADD', KEYS[i], KEYS[1]) "
+        "if redis.call('TTL', KEYS[i]) < tonumber(ARGV[2]) then redis.call('EXPIRE', KEYS[i], ARGV[2]) end "
+        "end "
+        "return 1"
+    )
+
+    def __init__(self, kv: KVClient):
+        super().__init__()
+        self.kv = kv
+
+    def _full_key(self, namespace: str, key: str) -> str:
+        return f'{self.KEY_PREFIX}{namespace}:{key}'
+
+    def _get(self, full_key: str) -> Optional[Any]:
+        value = self.kv.get(full_key)
+        return json.loads(value) if value is not None else None
+
+    def _set(self, full_key: str, value: str, ttl: int, tags: List[str]) -> bool:
+        if not tags:
+            return self.kv.execute('SET', full_key, value, 'EX', ttl) == 'OK'
+        tag_keys = [f'{self.TAG_PREFIX}{tag}' for tag in tags]
+        return bool(self.kv.eval(self.SET_WITH_TAGS_SCRIPT, [full_key] + tag_keys, [value, ttl]))
+
+    def _delete_keys(self, full_keys: List[str]) -> int:
+        removed = 0
+        for start in range(0, len(full_keys), self.BATCH_SIZE):
+            removed += self.kv.delete(*full_keys[start:start + self.BATCH_SIZE])
+        return removed
+
+    def _delete_prefix(self, prefix: str) -> int:
+        # SCAN 的 MATCH 是通配符模式，前缀中的特殊字符需要转义
+        pattern = ''.join('\\' + char if char in '*?[]\\' else char for char in prefix) + '*'
+        removed, cursor = 0, '0'
+        while True:
+            cursor, keys = self.kv.execute('SCAN', cursor, 'MATCH', pattern, 'COUNT', self.BATCH_SIZE)
+            removed += self._delete_keys(keys)
+            if str(cursor) == '0':
+                return removed
+
+    def _delete_tag(self, tag: str) -> int:
+        tag_key = f'{self.TAG_PREFIX}{tag}'
+        keys = self.kv.execute('SMEMBERS', tag_key) or []
+        removed = self._delete_keys(keys)
+        self.kv.delete(tag_key)
+        return removed
+
+    def _purge_expired(self) -> int:
+        # 过期由 KV 自动处理
+        return 0
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应压缩中间件
+根据 Accept-Encoding 协商 br > gzip，压缩 HTML / JSON 等文本响应，支持流式响应
+"""
+
+import os
+import zlib
+from typing import Iterable, Iterator, Optional
+from flask import request, current_app
+
+# brotli 为可选依赖，未安装时只使用 gzip
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# 默认压缩的文本类型
+DEFAULT_COMPRESS_MIMETYPES = [
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/csv',
+    'text/xml',
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+]
+
+
+class Compressor:
+    """gzip / brotli 响应压缩"""
+
+    def init_app(self, app) -> None:
+        """读取压缩配置并注册 after_request 钩子
+
+        配置项（均可用同名环境变量覆盖）:
+            COMPRESS_LEVEL: gzip 压缩级别 1-9，越大越省带宽、越耗 CPU
+            COMPRESS_BR_LEVEL: brotli 压缩级别 0-11
+            COMPRESS_MIN_SIZE: 小于该字节数的响应不压缩
+            COMPRESS_MIMETYPES: 需要压缩的 MIME 类型列表
+        """
+        app.config.setdefault('COMPRESS_LEVEL', int(os.getenv('COMPRESS_LEVEL', 6)))
+        app.config.setdefault('COMPRESS_BR_LEVEL', int(os.getenv('COMPRESS_BR_LEVEL', 4)))
+        app.config.setdefault('COMPRESS_MIN_SIZE', int(os.getenv('COMPRESS_MIN_SIZE', 500)))
+        app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_COMPRESS_MIMETYPES)
+        app.after_request(self.compress_response)
+
+    def choose_encoding(self) -> Optional[str]:
+        """根据 Accept-Encoding 选择压缩算法（br 优先于 gzip）"""
+        accept = request.accept_encodings
+        if BROTLI_AVAILABLE and accept['br'] > 0:
+            return 'br'
+        if accept['gzip'] > 0:
+            return 'gzip'
+        return None
+
+    def compress_response(self, response):
+        """压缩符合条件的响应"""
+        config = current_app.config
+
+        if response.status_code == 304:
+            return self._match_variant_etag(response)
+
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in config['COMPRESS_MIMETYPES']):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+
+        level = config['COMPRESS_BR_LEVEL'] if encoding == 'br' else config['COMPRESS_LEVEL']
+
+        if response.is_streamed:
+            # 流式响应：边生成边压缩，不等待完整内容
+            response.response = self._compress_stream(response.response, encoding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(self._compress_bytes(data, encoding, level))
+
+        response.headers['Content-Encoding'] = encoding
+
+        # 压缩变体使用不同的强 ETag，避免与未压缩的表示混淆
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+
+        return response
+
+    def _match_variant_etag(self, response):
+        """304 响应使用客户端持有的压缩变体 ETag（带 -gzip / -br 后缀），与之前的 200 响应保持一致"""
+        response.vary.add('Accept-Encoding')
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            for encoding in ('br', 'gzip'):
+                if request.if_none_match.contains(f'{etag}-{encoding}'):
+                    response.set_etag(f'{etag}-{encoding}')
+                    break
+        return response
+
+    def _compress_bytes(self, data: bytes, encoding: str, level: int) -> bytes:
+        """一次性压缩完整内容"""
+        if encoding == 'br':
+            return brotli.compress(data, quality=level)
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def _compress_stream(self, chunks: Iterable, encoding: str, level: int) -> Iterator[bytes]:
+        """增量压缩流式响应，每个数据块生成后立即刷新输出"""
+        try:
+            if encoding == 'br':
+                compressor = brotli.Compressor(quality=level)
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    output = compressor.process(chunk) + compressor.flush()
+                    if output:
+                        yield output
+                yield compressor.finish()
+            else:
+                compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    output = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                    if output:
+                        yield output
+                yield compressor.flush()
+        finally:
+            # 保证原始迭代器（如 stream_with_context 生成器）被正确关闭
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+
+# 应用共享的压缩中间件
+compressor = Compressor()
@@ -3,205 +3,785 @@
 """
 数据导出服务
 支持将仓库的 Issues 和评论导出为多种格式
+导出内容由生成器逐块产出，Issue 边获取边写出，内存占用不随仓库规模增长
 """
 
 import json
 import csv
+import hashlib
 import io
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from itertools import islice
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
 from api.github_service import GitHubService
+from utils.zip_stream import stream_zip_files
 
 
 class DataExporter:
     """数据导出服务类"""
     
-    def __init__(self, github_token: Optional[str] = None):
+    # 支持的导出格式
+    EXPORT_FORMATS = ('json', 'ndjson', 'csv', 'zip', 'sqlite')
+    # 产出字节流的导出格式（不缓存，一次性导出时拼接为 bytes）
+    BINARY_FORMATS = ('zip', 'sqlite')
+    # 支持的导出模式
+    EXPORT_MODES = ('full', 'delta')
+    
+    # 并发获取评论的线程数
+    COMMENT_WORKERS = int(os.getenv('EXPORT_COMMENT_WORKERS', 8))
+    # 每批并发处理的 Issue 数（与 Issues 列表的分页大小一致）
+    COMMENT_BATCH_SIZE = 100
+    # 完整导出时仓库级评论映射最多缓冲的评论数，超过后改为逐个 Issue 获取评论
+    COMMENT_MAP_MAX_COMMENTS = int(os.getenv('EXPORT_COMMENT_MAP_MAX', 20000))
+    # 导出时保留的 API 速率额度
+    RATE_LIMIT_RESERVE = int(os.getenv('EXPORT_RATE_LIMIT_RESERVE', 50))
+    # 速率额度耗尽时最多等待的秒数
+    RATE_LIMIT_MAX_WAIT = int(os.getenv('EXPORT_RATE_LIMIT_MAX_WAIT', 60))
+    # 是否缓存导出结果（仓库未变化时直接返回）
+    CACHE_ENABLED = os.getenv('EXPORT_CACHE_ENABLED', 'true').lower() == 'true'
+    # 超过该大小的导出结果不缓存
+    CACHE_MAX_BYTES = int(os.getenv('EXPORT_CACHE_MAX_BYTES', 5 * 1024 * 1024))
+    # 缓存的导出结果最长有效期（秒）：探测只能发现新建和更新，删除 Issue 或评论后最多在该时间后重新导出
+    CACHE_MAX_AGE = int(os.getenv('EXPORT_CACHE_MAX_AGE', 6 * 3600))
+    # Markdown 压缩包中并行压缩文件的线程数
+    ARCHIVE_WORKERS = int(os.getenv('EXPORT_ARCHIVE_WORKERS', 4))
+    # SQLite 导出每批写入的 Issue 数，以及回传文件时的块大小
+    SQLITE_BATCH_SIZE = 500
+    SQLITE_CHUNK_SIZE = 64 * 1024
+    # 导出预估：每次分页请求的平均耗时（秒），以及单个 Issue / 评论在 JSON 中的平均字节数
+    ESTIMATE_SECONDS_PER_CALL = float(os.getenv('EXPORT_ESTIMATE_SECONDS_PER_CALL', 0.6))
+    ESTIMATE_ISSUE_BYTES = 1500
+    ESTIMATE_COMMENT_BYTES = 600
+    # 各格式相对 JSON 的大小比例
+    ESTIMATE_FORMAT_FACTORS = {'json': 1.0, 'ndjson': 0.8, 'csv': 0.7, 'zip': 0.3, 'sqlite': 1.2}
+    
+    def __init__(self, github_token: Optional[str] = None, username: Optional[str] = None):
         """初始化导出服务
         
         Args:
             github_token: GitHub API Token
+            username: 当前用户名，用于记录和读取导出检查点（为空时不记录）
         """
+        self.github_token = github_token
         self.github_service = GitHubService(github_token)
+        self.username = username
     
-    def export_repo_data(self, repo_full_name: str, export_format: str = 'json') -> Dict[str, Any]:
-        """导出仓库数据
+    def export_repo_data(self, repo_full_name: str, export_format: str = 'json',
+                         mode: str = 'full') -> Dict[str, Any]:
+        """导出仓库数据（一次性返回完整内容）
         
         Args:
             repo_full_name: 仓库全名 (owner/repo)
-            export_format: 导出格式 ('json', 'csv')
-            
+            export_format: 导出格式 ('json', 'ndjson', 'csv', 'zip', 'sqlite')
+            mode: 导出模式 ('full' 完整导出, 'delta' 增量导出)
+        
+        Returns:
+            包含导出数据和元信息的字典（zip / sqlite 格式的 content 为 bytes）
+        """
+        result = self.stream_repo_data(repo_full_name, export_format, mode)
+        if not result.get('success'):
+            return result
+        
+        try:
+            if result['export_info']['export_format'] in self.BINARY_FORMATS:
+                content = b''.join(result['stream'])
+            else:
+                content = ''.join(result['stream'])
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'导出数据时发生错误: {str(e)}'
+            }
+        
+        return {
+            'success': True,
+            'content': content,
+            'filename': result['filename'],
+            'content_type': result['content_type'],
+            'export_info': result['export_info']
+        }
+    
+    def stream_repo_data(self, repo_full_name: str, export_format: str = 'json',
+                         mode: str = 'full') -> Dict[str, Any]:
+        """流式导出仓库数据
+        
+        仓库信息在开始前获取（失败时可以直接返回错误），Issues 和评论在消费 stream 时才逐页获取。
+        export_info 中的统计数字在 stream 消费完毕后才是最终值；stream 完整消费后记录导出检查点。
+        
+        增量模式只导出检查点之后新建或更新的 Issue 和评论，并为期间关闭的 Issue 生成墓碑记录，
+        可通过 merge_export_delta 合并到上一次的完整导出中。
+        
+        Args:
+            repo_full_name: 仓库全名 (owner/repo)
+            export_format: 导出格式 ('json', 'ndjson', 'csv', 'zip', 'sqlite'，增量模式只支持 json)
+            mode: 导出模式 ('full', 'delta')
+        
         Returns:
-            包含导出数据和元信息的字典
+            包含 stream（逐块产出字符串的生成器，zip / sqlite 格式产出 bytes）、文件名和内容类型的字典
         """
         try:
-            # 获取仓库信息
-            repo_info_result = self.github_service.get_repo_info(repo_full_name)
-            if not repo_info_result.get('success'):
+            # 仓库未变化时直接返回缓存的导出结果
+            cached, probe = self.lookup_cache(repo_full_name, export_format, mode)
+            if cached:
+                self.save_checkpoint(repo_full_name, cached['export_info'])
                 return {
-                    'success': False,
-                    'error': repo_info_result.get('error', '获取仓库信息失败')
+                    'success': True,
+                    'stream': iter([cached['content']]),
+                    'filename': self.get_filename(repo_full_name, export_format, mode),
+                    'content_type': self.get_content_type(export_format),
+                    'export_info': cached['export_info'],
+                    'cached': True
                 }
             
-            repo_info = repo_info_result.get('data', {})
+            prepared = self.prepare_export(repo_full_name, export_format, mode)
+            if not prepared.get('success'):
+                return prepared
             
-            # 获取所有 Issues（包括评论）
-            issues_data = self._get_all_issues_with_comments(repo_full_name)
+            repository = prepared['repository']
+            export_info = prepared['export_info']
+            export_format = export_info['export_format']
             
-            # 构建导出数据结构
-            export_data = {
-                'export_info': {
-                    'repo_name': repo_full_name,
-                    'repo_description': repo_info.get('description', ''),
-                    'export_time': datetime.now().isoformat(),
-                    'total_issues': len(issues_data),
-                    'total_comments': sum(len(issue.get('comments', [])) for issue in issues_data),
-                    'export_format': export_format
-                },
-                'repository': {
-                    'name': repo_info.get('name', ''),
-                    'full_name': repo_full_name,
-                    'description': repo_info.get('description', ''),
-                    'url': repo_info.get('url', ''),
-                    'stars': repo_info.get('stars', 0),
-                    'forks': repo_info.get('forks', 0),
-                    'language': repo_info.get('language', ''),
-                    'open_issues': repo_info.get('open_issues', 0)
-                },
-                'issues': issues_data
-            }
-            
-            # 根据格式生成导出内容
-            if export_format.lower() == 'json':
-                content, filename = self._export_json(export_data, repo_full_name)
-            elif export_format.lower() == 'csv':
-                content, filename = self._export_csv(export_data, repo_full_name)
+            if mode == 'delta':
+                delta = {'comments': [], 'tombstones': []}
+                issues = self._iter_delta_issues(repo_full_name, export_info, delta)
             else:
-                return {
-                    'success': False,
-                    'error': f'不支持的导出格式: {export_format}'
-                }
+                delta = None
+                issues = self._iter_issues_with_comments(repo_full_name, export_info)
+            
+            stream = self.render_stream(issues, repository, export_info, delta)
+            stream = self._record_checkpoint(stream, repo_full_name, export_info)
+            if probe:
+                stream = self.cache_stream(stream, repo_full_name, export_format, mode, probe, export_info)
             
             return {
                 'success': True,
-                'content': content,
-                'filename': filename,
-                'content_type': self._get_content_type(export_format),
-                'export_info': export_data['export_info']
+                'stream': stream,
+                'filename': self.get_filename(repo_full_name, export_format, mode),
+                'content_type': self.get_content_type(export_format),
+                'export_info': export_info,
+                'cached': False
             }
-            
+        
         except Exception as e:
             return {
                 'success': False,
                 'error': f'导出数据时发生错误: {str(e)}'
             }
     
-    def _get_all_issues_with_comments(self, repo_full_name: str) -> List[Dict[str, Any]]:
-        """获取所有 Issues 及其评论
+    def prepare_export(self, repo_full_name: str, export_format: str = 'json',
+                       mode: str = 'full') -> Dict[str, Any]:
+        """校验导出参数并获取仓库信息，生成导出的 repository 和 export_info
         
         Args:
-            repo_full_name: 仓库全名
-            
+            repo_full_name: 仓库全名 (owner/repo)
+            export_format: 导出格式
+            mode: 导出模式
+        
         Returns:
-            包含 Issues 和评论的列表
+            包含 repository 和 export_info 的字典（增量模式下 export_info['since'] 为检查点）
         """
-        all_issues = []
-        page = 1
-        per_page = 100  # GitHub API 最大值
+        export_format = export_format.lower()
+        checked = self._check_options(repo_full_name, export_format, mode)
+        if not checked.get('success'):
+            return checked
+        checkpoint = checked['checkpoint']
         
-        while True:
-            # 获取 Issues
-            issues_result = self.github_service.get_issues(
-                repo_full_name, 
-                state='all', 
-                page=page, 
-                per_page=per_page
+        # 获取仓库信息
+        repo_info_result = self.github_service.get_repo_info(repo_full_name)
+        if not repo_info_result.get('success'):
+            return {
+                'success': False,
+                'error': repo_info_result.get('error', '获取仓库信息失败')
+            }
+        
+        repo_info = repo_info_result.get('data', {})
+        
+        export_info = {
+            'repo_name': repo_full_name,
+            'repo_description': repo_info.get('description', ''),
+            'export_time': datetime.now().isoformat(),
+            'export_mode': mode,
+            'total_issues': 0,
+            'total_comments': 0,
+            'max_updated_at': checkpoint.get('max_updated_at') if checkpoint else None,
+            'export_format': export_format
+        }
+        if checkpoint:
+            export_info['since'] = checkpoint['max_updated_at']
+        
+        repository = {
+            'name': repo_info.get('name', ''),
+            'full_name': repo_full_name,
+            'description': repo_info.get('description', ''),
+            'url': repo_info.get('url', ''),
+            'stars': repo_info.get('stars', 0),
+            'forks': repo_info.get('forks', 0),
+            'language': repo_info.get('language', ''),
+            'open_issues': repo_info.get('open_issues', 0)
+        }
+        
+        return {
+            'success': True,
+            'repository': repository,
+            'export_info': export_info
+        }
+    
+    def _check_options(self, repo_full_name: str, export_format: str, mode: str) -> Dict[str, Any]:
+        """校验导出格式和模式，增量模式下读取检查点
+
+        Returns:
+            校验通过时 checkpoint 为增量导出的检查点（完整导出为 None）
+        """
+        if export_format not in self.EXPORT_FORMATS:
+            return {
+                'success': False,
+                'error': f'不支持的导出格式: {export_format}'
+            }
+        
+        if mode not in self.EXPORT_MODES:
+            return {
+                'success': False,
+                'error': f'不支持的导出模式: {mode}'
+            }
+        
+        checkpoint = None
+        if mode == 'delta':
+            if export_format != 'json':
+                return {
+                    'success': False,
+                    'error': '增量导出只支持 JSON 格式'
+                }
+            checkpoint = self.get_checkpoint(repo_full_name)
+            if not checkpoint or not checkpoint.get('max_updated_at'):
+                return {
+                    'success': False,
+                    'error': '没有找到该仓库的导出检查点，请先进行一次完整导出'
+                }
+        
+        return {
+            'success': True,
+            'checkpoint': checkpoint
+        }
+    
+    def estimate_export(self, repo_full_name: str, export_format: str = 'json',
+                        mode: str = 'full') -> Dict[str, Any]:
+        """预估导出需要的 API 请求数、耗时和文件大小（不实际导出）
+        
+        只发起 3 个 per_page=1 的请求统计 Issues / Pull Requests / 评论数量，
+        按每页 100 条推算分页请求数，并与当前的 API 速率额度比较
+        
+        Args:
+            repo_full_name: 仓库全名 (owner/repo)
+            export_format: 导出格式
+            mode: 导出模式
+        
+        Returns:
+            estimate 包含数量、请求数、预计秒数、预计字节数、速率额度和警告信息
+        """
+        export_format = export_format.lower()
+        checked = self._check_options(repo_full_name, export_format, mode)
+        if not checked.get('success'):
+            return checked
+        since = checked['checkpoint']['max_updated_at'] if checked['checkpoint'] else None
+        
+        counted = self.github_service.count_repo_items(repo_full_name, since)
+        if not counted.get('success'):
+            return {
+                'success': False,
+                'error': f"统计仓库数据失败: {counted.get('error', '')}"
+            }
+        counts = counted['data']
+        
+        # Issues 列表分页中包含 Pull Requests；另有仓库信息和缓存探测请求
+        per_page = self.COMMENT_BATCH_SIZE
+        issue_pages = max(-(-(counts['issues'] + counts['pull_requests']) // per_page), 1)
+        comment_pages = max(-(-counts['comments'] // per_page), 1)
+        api_calls = issue_pages + comment_pages + 1 + (2 if mode == 'full' and self.CACHE_ENABLED else 0)
+        
+        rate_limit = counted.get('rate_limit') or self.github_service.get_rate_limit_status()
+        budget = rate_limit['remaining'] - self.RATE_LIMIT_RESERVE
+        
+        size_factor = self.ESTIMATE_FORMAT_FACTORS.get(export_format, 1.0)
+        estimated_bytes = int(size_factor * (counts['issues'] * self.ESTIMATE_ISSUE_BYTES
+                                             + counts['comments'] * self.ESTIMATE_COMMENT_BYTES))
+        
+        warnings = []
+        if api_calls > budget:
+            reset_time = datetime.fromtimestamp(rate_limit['reset']).strftime('%H:%M:%S')
+            warnings.append(
+                f"预计需要 {api_calls} 次 API 请求，超过当前可用额度 {max(budget, 0)} 次，"
+                f"导出会在额度耗尽后暂停，直到 {reset_time} 额度重置"
             )
+        if rate_limit.get('limit') and api_calls > rate_limit['limit']:
+            warnings.append(f"预计请求数超过每小时额度 {rate_limit['limit']} 次，导出将持续数小时")
+        if since:
+            warnings.append('增量导出的 Issue 数包含期间更新的 Pull Requests，实际导出数量可能更少')
+        
+        return {
+            'success': True,
+            'estimate': {
+                'repo_full_name': repo_full_name,
+                'export_format': export_format,
+                'export_mode': mode,
+                'since': since,
+                'issues': counts['issues'],
+                'pull_requests': counts['pull_requests'],
+                'comments': counts['comments'],
+                'api_calls': api_calls,
+                'estimated_seconds': round(api_calls * self.ESTIMATE_SECONDS_PER_CALL, 1),
+                'estimated_bytes': estimated_bytes,
+                'rate_limit': rate_limit,
+                'exhausts_quota': api_calls > budget,
+                'warnings': warnings
+            }
+        }
+    
+    def estimate_exports(self, repo_full_names: List[str], export_format: str = 'json',
+                         mode: str = 'full') -> Dict[str, Any]:
+        """预估批量导出多个仓库的总开销（各仓库共用同一个 API 速率额度）"""
+        estimates = []
+        for repo_full_name in repo_full_names:
+            result = self.estimate_export(repo_full_name, export_format, mode)
+            if not result.get('success'):
+                return {
+                    'success': False,
+                    'error': f"{repo_full_name}: {result.get('error', '')}"
+                }
+            estimates.append(result['estimate'])
+        
+        if not estimates:
+            return {
+                'success': False,
+                'error': '没有可导出的仓库'
+            }
+        
+        rate_limit = estimates[-1]['rate_limit']
+        api_calls = sum(item['api_calls'] for item in estimates)
+        exhausts_quota = api_calls > rate_limit['remaining'] - self.RATE_LIMIT_RESERVE
+        if len(estimates) == 1:
+            warnings = estimates[0]['warnings']
+        else:
+            warnings = [f"{item['repo_full_name']}: {warning}" for item in estimates for warning in item['warnings']]
+            if exhausts_quota:
+                warnings.insert(0, f"预计共需要 {api_calls} 次 API 请求，超过当前剩余额度 {rate_limit['remaining']} 次")
+        
+        return {
+            'success': True,
+            'estimate': {
+                'repos': estimates,
+                'issues': sum(item['issues'] for item in estimates),
+                'comments': sum(item['comments'] for item in estimates),
+                'api_calls': api_calls,
+                'estimated_seconds': round(sum(item['estimated_seconds'] for item in estimates), 1),
+                'estimated_bytes': sum(item['estimated_bytes'] for item in estimates),
+                'rate_limit': rate_limit,
+                'exhausts_quota': exhausts_quota,
+                'warnings': warnings
+            }
+        }
+    
+    def render_stream(self, issues: Iterator[Dict[str, Any]], repository: Dict[str, Any],
+                      export_info: Dict[str, Any],
+                      delta: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Iterator[Any]:
+        """按 export_info 中的导出格式，将已关联评论的 Issue 写出为字符串流（zip / sqlite 格式为字节流）"""
+        if delta is not None:
+            return self._stream_json(issues, repository, export_info, delta)
+        
+        writers = {
+            'json': self._stream_json,
+            'ndjson': self._stream_ndjson,
+            'csv': self._stream_csv,
+            'zip': self._stream_zip,
+            'sqlite': self._stream_sqlite
+        }
+        return writers[export_info['export_format']](issues, repository, export_info)
+    
+    def lookup_cache(self, repo_full_name: str, export_format: str,
+                     mode: str = 'full') -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """查找导出缓存，并用一次廉价的探测确认仓库是否有变化
+        
+        探测最近更新的 Issue 和评论（带 ETag 的条件请求），与缓存时的探测结果一致则缓存有效。
+        删除较早的 Issue 或评论不会改变最近更新的条目，探测无法发现，
+        因此缓存超过 CACHE_MAX_AGE 秒后无论探测结果如何都重新导出。
+        探测失败（如无权访问仓库）时不使用缓存。增量导出依赖检查点，二进制格式无法存为文本，均不缓存。
+        
+        Args:
+            repo_full_name: 仓库全名
+            export_format: 导出格式
+            mode: 导出模式
+        
+        Returns:
+            (有效的缓存条目或 None, 本次探测结果或 None)，探测结果用于导出完成后写入缓存
+        """
+        if mode != 'full' or not self.CACHE_ENABLED or export_format.lower() in self.BINARY_FORMATS:
+            return None, None
+        
+        from utils.storage import get_storage
+        storage = get_storage()
+        cache_key = self._get_cache_key(repo_full_name, export_format, mode)
+        cached = storage.get_export_cache(cache_key)
+        
+        probe = self.github_service.probe_repo_freshness(repo_full_name, cached.get('probe') if cached else None)
+        if not probe.get('success'):
+            return None, None
+        probe = {'etags': probe['etags'], 'values': probe['values']}
+        
+        if not cached or cached.get('probe', {}).get('values') != probe['values']:
+            return None, probe
+        
+        if self._cache_age(cached) > self.CACHE_MAX_AGE:
+            print(f"⏰ 仓库 {repo_full_name} 的导出缓存已超过 {self.CACHE_MAX_AGE} 秒，重新导出")
+            return None, probe
+        
+        # 内容未变但 ETag 变化时更新探测结果，下次仍可以得到 304
+        if cached['probe'].get('etags') != probe['etags']:
+            cached['probe'] = probe
+            storage.save_export_cache(cache_key, cached)
+        
+        print(f"📦 仓库 {repo_full_name} 未变化，使用缓存的导出结果")
+        return cached, probe
+    
+    def cache_stream(self, stream: Iterator[str], repo_full_name: str, export_format: str, mode: str,
+                     probe: Dict[str, Any], export_info: Dict[str, Any]) -> Iterator[str]:
+        """边产出边收集导出内容，完整写出后保存到缓存（超过 EXPORT_CACHE_MAX_BYTES 则不缓存）"""
+        chunks = []
+        size = 0
+        for chunk in stream:
+            if chunks is not None:
+                size += len(chunk.encode('utf-8'))
+                if size > self.CACHE_MAX_BYTES:
+                    chunks = None
+                else:
+                    chunks.append(chunk)
+            yield chunk
+        
+        if chunks is None:
+            return
+        
+        from utils.storage import get_storage
+        get_storage().save_export_cache(self._get_cache_key(repo_full_name, export_format, mode), {
+            'probe': probe,
+            'content': ''.join(chunks),
+            'export_info': export_info,
+            'cached_at': datetime.now().isoformat()
+        })
+    
+    @staticmethod
+    def _cache_age(cached: Dict[str, Any]) -> float:
+        """缓存条目的存在时长（秒），缺少或无法解析 cached_at 时视为已过期"""
+        try:
+            return (datetime.now() - datetime.fromisoformat(cached['cached_at'])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            return float('inf')
+    
+    def get_cached_content(self, repo_full_name: str, export_format: str, mode: str = 'full') -> Optional[str]:
+        """读取缓存的导出内容（不做新鲜度探测）"""
+        from utils.storage import get_storage
+        cached = get_storage().get_export_cache(self._get_cache_key(repo_full_name, export_format, mode))
+        return cached.get('content') if cached else None
+    
+    def _get_cache_key(self, repo_full_name: str, export_format: str, mode: str) -> str:
+        """导出缓存键：由仓库、格式和导出选项决定"""
+        options = f'{repo_full_name.lower()}|{export_format.lower()}|{mode}'
+        return hashlib.sha1(options.encode('utf-8')).hexdigest()
+    
+    def get_checkpoint(self, repo_full_name: str) -> Optional[Dict[str, Any]]:
+        """获取当前用户对仓库的导出检查点"""
+        if not self.username:
+            return None
+        from utils.storage import get_storage
+        return get_storage().get_export_checkpoint(self.username, repo_full_name)
+    
+    def _record_checkpoint(self, stream: Iterator[str], repo_full_name: str,
+                           export_info: Dict[str, Any]) -> Iterator[str]:
+        """stream 完整写出后记录导出检查点（中途失败或断开则不记录）"""
+        yield from stream
+        self.save_checkpoint(repo_full_name, export_info)
+    
+    def save_checkpoint(self, repo_full_name: str, export_info: Dict[str, Any]) -> bool:
+        """记录当前用户对仓库的导出检查点（没有用户名或没有任何数据时不记录）"""
+        if not self.username or not export_info.get('max_updated_at'):
+            return False
+        
+        from utils.storage import get_storage
+        return get_storage().save_export_checkpoint(self.username, repo_full_name, {
+            'export_time': export_info['export_time'],
+            'max_updated_at': export_info['max_updated_at'],
+            'export_mode': export_info['export_mode']
+        })
+    
+    def _track_updated_at(self, export_info: Dict[str, Any], issue: Dict[str, Any]) -> None:
+        """累计导出统计，并记录 Issue 和评论中最大的 updated_at"""
+        export_info['total_issues'] += 1
+        export_info['total_comments'] += len(issue['comments'])
+        
+        # 同一格式的 ISO 8601 字符串可以直接比较
+        for item in [issue] + issue['comments']:
+            updated_at = item.get('updated_at')
+            if updated_at and (not export_info['max_updated_at'] or updated_at > export_info['max_updated_at']):
+                export_info['max_updated_at'] = updated_at
+    
+    def _iter_issues_with_comments(self, repo_full_name: str,
+                                   export_info: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """逐个产出 Issue 及其评论，并累计导出统计
+        
+        评论通过仓库级评论列表一次性分页获取，再按 Issue 编号在本地关联，
+        API 请求数为 评论总数 / 100 页，而不是每个 Issue 一次；
+        代价是产出第一个 Issue 前要把全部评论缓冲在内存中，因此缓冲的评论数
+        超过 COMMENT_MAP_MAX_COMMENTS 时放弃映射，与获取失败时一样退回到按 Issue
+        并发获取（请求更多，但内存只与单批 Issue 的评论数有关）
+        
+        Args:
+            repo_full_name: 仓库全名
+            export_info: 导出信息，累计 total_issues / total_comments
+        
+        Yields:
+            包含 comments 字段的 Issue 字典
+        """
+        try:
+            comment_map = self._load_comment_map(repo_full_name,
+                                                 max_comments=self.COMMENT_MAP_MAX_COMMENTS)
+        except Exception as e:
+            print(f"获取仓库评论列表失败，改为逐个 Issue 获取评论: {e}")
+            yield from self._iter_issues_fetching_comments(repo_full_name, export_info)
+            return
+        
+        issues = self.github_service.iter_issues(repo_full_name, state='all')
+        yield from self.join_comments(issues, comment_map, export_info)
+    
+    def _iter_delta_issues(self, repo_full_name: str, export_info: Dict[str, Any],
+                           delta: Dict[str, List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """逐个产出检查点之后更新过的 Issue（只附带期间新建或更新的评论）
+        
+        所属 Issue 本身未更新的评论放入 delta['comments']（带 issue_number），
+        期间关闭的 Issue 记录到 delta['tombstones']；两者在 Issue 全部产出后才完整
+        
+        Args:
+            repo_full_name: 仓库全名
+            export_info: 导出信息，since 为检查点的 max_updated_at
+            delta: 收集孤立评论和墓碑记录的字典
+        
+        Yields:
+            包含 comments 字段的 Issue 字典
+        """
+        since = export_info['since']
+        comment_map = self._load_comment_map(repo_full_name, since=since)
+        issues = self.github_service.iter_issues(repo_full_name, state='all', since=since)
+        yield from self.join_comments(issues, comment_map, export_info, delta)
+    
+    def join_comments(self, issues: Iterable[Dict[str, Any]], comment_map: Dict[int, List[Dict[str, Any]]],
+                      export_info: Dict[str, Any],
+                      delta: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Iterator[Dict[str, Any]]:
+        """按 Issue 编号从评论映射中取出评论附加到 Issue 上，并累计导出统计
+        
+        增量导出（delta 不为空）时，期间关闭的 Issue 记录为墓碑，
+        Issue 全部产出后映射中剩余的评论作为孤立评论放入 delta['comments']
+        
+        Args:
+            issues: Issue 字典的可迭代对象
+            comment_map: Issue 编号到评论列表的映射（会被逐步清空）
+            export_info: 导出信息
+            delta: 收集孤立评论和墓碑记录的字典
+        
+        Yields:
+            包含 comments 字段的 Issue 字典
+        """
+        for issue in issues:
+            # 取出后即从映射中移除，已写出 Issue 的评论不再占用内存
+            issue['comments'] = comment_map.pop(issue['number'], [])
+            self._track_updated_at(export_info, issue)
             
-            if not issues_result.get('success'):
-                break
-                
-            issues = issues_result.get('data', [])
-            if not issues:
-                break
-            
-            # 为每个 Issue 获取评论
-            for issue in issues:
-                issue_number = issue.get('number')
-                if issue_number:
-                    comments_result = self.github_service.get_issue_comments(
-                        repo_full_name, 
-                        issue_number
-                    )
-                    
-                    if comments_result.get('success'):
-                        issue['comments'] = comments_result.get('data', [])
-                    else:
-                        issue['comments'] = []
-                
-                all_issues.append(issue)
+            if delta is not None and issue.get('state') == 'closed' \
+                    and (issue.get('closed_at') or '') >= export_info['since']:
+                delta['tombstones'].append({
+                    'type': 'issue',
+                    'number': issue['number'],
+                    'state': 'closed',
+                    'closed_at': issue['closed_at']
+                })
             
-            # 如果返回的 Issues 数量少于请求数量，说明已经是最后一页
-            if len(issues) < per_page:
-                break
-                
-            page += 1
+            yield issue
+        
+        if delta is None:
+            return
         
-        return all_issues
+        for issue_number, comments in sorted(comment_map.items()):
+            for comment in comments:
+                delta['comments'].append(dict(comment, issue_number=issue_number))
+                export_info['total_comments'] += 1
+                if comment.get('updated_at', '') > (export_info['max_updated_at'] or ''):
+                    export_info['max_updated_at'] = comment['updated_at']
     
-    def _export_json(self, data: Dict[str, Any], repo_name: str) -> tuple:
-        """导出为 JSON 格式
+    def _load_comment_map(self, repo_full_name: str, since: Optional[str] = None,
+                          max_comments: Optional[int] = None) -> Dict[int, List[Dict[str, Any]]]:
+        """获取仓库的全部评论，按 Issue 编号分组（组内按创建时间升序）
         
         Args:
-            data: 要导出的数据
-            repo_name: 仓库名称
-            
+            repo_full_name: 仓库全名
+            since: 只获取该时间之后更新的评论（ISO 8601）
+            max_comments: 最多缓冲的评论数，为 None 时不限制
+        
         Returns:
-            (content, filename) 元组
+            Issue 编号到评论列表的映射
+        
+        Raises:
+            MemoryError: 缓冲的评论数超过 max_comments
         """
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{repo_name.replace('/', '_')}_export_{timestamp}.json"
+        comment_map = defaultdict(list)
+        buffered = 0
+        for issue_number, comment in self.github_service.iter_repo_comments(repo_full_name, since=since):
+            if self.is_pull_request_comment(comment):
+                continue
+            buffered += 1
+            if max_comments is not None and buffered > max_comments:
+                raise MemoryError(f"仓库评论超过 {max_comments} 条，不再缓冲评论映射")
+            comment_map[issue_number].append(comment)
+        return comment_map
+    
+    @staticmethod
+    def is_pull_request_comment(comment: Dict[str, Any]) -> bool:
+        """仓库级评论列表也包含 Pull Request 的对话评论（html_url 形如 .../pull/123#issuecomment-1），
+        而 Issues 列表跳过了 Pull Request，这些评论不导出，否则会在增量导出中成为孤立评论"""
+        return '/pull/' in (comment.get('html_url') or '')
+    
+    def _iter_issues_fetching_comments(self, repo_full_name: str,
+                                       export_info: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """逐个 Issue 获取评论的方式产出 Issue
         
-        content = json.dumps(data, ensure_ascii=False, indent=2)
+        每批 Issue 的评论由有界线程池并发获取，产出顺序与 Issue 顺序一致；
+        comments_count 为 0 的 Issue 不发起评论请求
+        """
+        local = threading.local()
+        
+        def fetch_comments(issue):
+            # 每个线程使用独立的 GitHub 客户端：PyGithub 的 Requester 共用一个连接对象，不能并发使用
+            service = getattr(local, 'service', None)
+            if service is None:
+                service = local.service = self._new_github_service()
+            result = service.get_issue_comments(repo_full_name, issue['number'])
+            return result.get('data', []) if result.get('success') else []
         
-        return content, filename
+        issues = self.github_service.iter_issues(repo_full_name, state='all')
+        
+        with ThreadPoolExecutor(max_workers=self.COMMENT_WORKERS) as executor:
+            while True:
+                batch = list(islice(issues, self.COMMENT_BATCH_SIZE))
+                if not batch:
+                    break
+                
+                pending = [issue for issue in batch if issue.get('comments_count', 0) > 0]
+                comments = {}
+                
+                # 按剩余速率额度分段提交，额度不足时等待重置
+                while pending:
+                    allowed = self._acquire_rate_budget(len(pending))
+                    chunk, pending = pending[:allowed], pending[allowed:]
+                    for issue, issue_comments in zip(chunk, executor.map(fetch_comments, chunk)):
+                        comments[issue['number']] = issue_comments
+                
+                for issue in batch:
+                    issue['comments'] = comments.get(issue['number'], [])
+                    self._track_updated_at(export_info, issue)
+                    yield issue
+    
+    def _new_github_service(self) -> GitHubService:
+        """创建使用相同 Token 的独立 GitHub 客户端（供并发线程使用）"""
+        return GitHubService(self.github_token)
+    
+    def get_rate_budget(self) -> int:
+        """当前还可以用于导出的 API 请求数（扣除保留额度，可能为负数）"""
+        status = self.github_service.get_rate_limit_status()
+        # 每个请求至少消耗一次额度，保留一部分给其他页面使用
+        return status['remaining'] - self.RATE_LIMIT_RESERVE
     
-    def _export_csv(self, data: Dict[str, Any], repo_name: str) -> tuple:
-        """导出为 CSV 格式
+    def _acquire_rate_budget(self, needed: int) -> int:
+        """检查 API 速率额度，返回本次最多可以发起的请求数
+        
+        额度低于保留值时等待重置；需要等待的时间超过 EXPORT_RATE_LIMIT_MAX_WAIT 秒则放弃导出
         
         Args:
-            data: 要导出的数据
-            repo_name: 仓库名称
-            
+            needed: 希望发起的请求数
+        
         Returns:
-            (content, filename) 元组
+            允许发起的请求数（至少为 1）
         """
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{repo_name.replace('/', '_')}_export_{timestamp}.csv"
+        while True:
+            available = self.get_rate_budget()
+            if available > 0:
+                return min(needed, available)
+            
+            status = self.github_service.get_rate_limit_status()
+            wait = max(status['reset'] - time.time(), 0) + 1
+            if wait > self.RATE_LIMIT_MAX_WAIT:
+                raise RuntimeError(
+                    f"GitHub API 速率额度不足（剩余 {status['remaining']}），"
+                    f"将于 {datetime.fromtimestamp(status['reset']).strftime('%H:%M:%S')} 重置"
+                )
+            print(f"GitHub API 速率额度不足，等待 {wait:.0f} 秒后继续导出")
+            time.sleep(wait)
+    
+    def _stream_json(self, issues: Iterator[Dict[str, Any]], repository: Dict[str, Any],
+                     export_info: Dict[str, Any],
+                     delta: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Iterator[str]:
+        """以增量数组写入的方式产出 JSON
         
-        # 创建 CSV 内容
+        export_info 放在文档末尾，写出时统计数字已经是最终值；
+        增量导出时在 issues 之后写出孤立评论（comments）和墓碑记录（tombstones）
+        """
+        yield '{\n  "repository": ' + self._dump_json(repository, 2) + ',\n  "issues": ['
+        
+        first = True
+        for issue in issues:
+            yield ('\n    ' if first else ',\n    ') + self._dump_json(issue, 4)
+            first = False
+        
+        yield ('' if first else '\n  ') + '],\n'
+        
+        if delta is not None:
+            yield '  "comments": ' + self._dump_json(delta['comments'], 2) + ',\n'
+            yield '  "tombstones": ' + self._dump_json(delta['tombstones'], 2) + ',\n'
+        
+        yield '  "export_info": ' + self._dump_json(export_info, 2) + '\n}\n'
+    
+    def _stream_ndjson(self, issues: Iterator[Dict[str, Any]], repository: Dict[str, Any],
+                       export_info: Dict[str, Any]) -> Iterator[str]:
+        """每行产出一个 Issue（含评论）的 NDJSON"""
+        for issue in issues:
+            yield json.dumps(issue, ensure_ascii=False) + '\n'
+    
+    def _stream_csv(self, issues: Iterator[Dict[str, Any]], repository: Dict[str, Any],
+                    export_info: Dict[str, Any]) -> Iterator[str]:
+        """逐个 Issue 产出 CSV 行，每个评论一行"""
+        # 复用同一个小缓冲区，每写完一个 Issue 就产出并清空
         output = io.StringIO()
         writer = csv.writer(output)
         
         # 写入表头
         headers = [
             'Issue Number', 'Title', 'State', 'Author', 'Created At', 'Updated At',
-            'Labels', 'Body', 'Comments Count', 'Comment ID', 'Comment Author', 
+            'Labels', 'Body', 'Comments Count', 'Comment ID', 'Comment Author',
             'Comment Created At', 'Comment Body'
         ]
         writer.writerow(headers)
         
-        # 写入数据
-        for issue in data.get('issues', []):
+        for issue in issues:
             issue_row = [
                 issue.get('number', ''),
                 issue.get('title', ''),
                 issue.get('state', ''),
-                issue.get('author', ''),
+                self._get_login(issue),
                 issue.get('created_at', ''),
                 issue.get('updated_at', ''),
                 ', '.join([label.get('name', '') for label in issue.get('labels', [])]),
-                issue.get('body', '').replace('\n', ' ').replace('\r', ' ')[:500],  # 限制长度
+                (issue.get('body') or '').replace('\n', ' ').replace('\r', ' ')[:500],  # 限制长度
                 len(issue.get('comments', []))
             ]
             
@@ -211,47 +791,339 @@ class DataExporter:
                 for comment in comments:
                     row = issue_row + [
                         comment.get('id', ''),
-                        comment.get('author', ''),
+                        self._get_login(comment),
                         comment.get('created_at', ''),
-                        comment.get('body', '').replace('\n', ' ').replace('\r', ' ')[:500]
+                        (comment.get('body') or '').replace('\n', ' ').replace('\r', ' ')[:500]
                     ]
                     writer.writerow(row)
             else:
                 # 没有评论的 Issue
                 row = issue_row + ['', '', '', '']
                 writer.writerow(row)
+            
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
         
-        content = output.getvalue()
+        # 表头（以及没有任何 Issue 时）
+        remaining = output.getvalue()
+        if remaining:
+            yield remaining
         output.close()
+    
+    def _stream_zip(self, issues: Iterator[Dict[str, Any]], repository: Dict[str, Any],
+                    export_info: Dict[str, Any]) -> Iterator[bytes]:
+        """产出 Markdown 压缩包：每个 Issue 一个 Markdown 文件（front matter + 正文 + 评论），末尾附索引
+
+        Issue 逐个渲染后交给压缩线程并行 deflate，压缩包边压缩边写出
+        """
+        index_rows = []
+        
+        def iter_files():
+            for issue in issues:
+                path = self._get_issue_path(issue)
+                # 索引只保留摘要字段，不持有正文和评论
+                index_rows.append(({
+                    'number': issue.get('number'),
+                    'title': issue.get('title'),
+                    'state': issue.get('state'),
+                    'author': self._get_login(issue),
+                    'labels': issue.get('labels', []),
+                    'comments': len(issue.get('comments', [])),
+                    'updated_at': issue.get('updated_at')
+                }, path))
+                yield path, self._render_issue_markdown(issue)
+            
+            yield 'README.md', self._render_index_markdown(index_rows, repository, export_info)
+            yield 'export_info.json', json.dumps(export_info, ensure_ascii=False, indent=2)
+        
+        return stream_zip_files(iter_files(), workers=self.ARCHIVE_WORKERS)
+    
+    def _get_issue_path(self, issue: Dict[str, Any]) -> str:
+        """Issue 在压缩包中的路径，如 issues/0042-标题.md"""
+        slug = re.sub(r'[\\/:*?"<>|#%\s]+', '-', issue.get('title') or '').strip('-.')[:60]
+        name = f"{issue.get('number', 0):04d}-{slug}" if slug else f"{issue.get('number', 0):04d}"
+        return f'issues/{name}.md'
+    
+    def _render_issue_markdown(self, issue: Dict[str, Any]) -> str:
+        """将 Issue 渲染为带 YAML front matter 的 Markdown，评论按时间顺序附在正文之后"""
+        # JSON 字符串同时也是合法的 YAML 标量，可以安全地写入任意标题和用户名
+        front_matter = {
+            'number': issue.get('number'),
+            'title': issue.get('title', ''),
+            'state': issue.get('state', ''),
+            'author': self._get_login(issue),
+            'labels': [label.get('name', '') for label in issue.get('labels', [])],
+            'created_at': issue.get('created_at'),
+            'updated_at': issue.get('updated_at'),
+            'closed_at': issue.get('closed_at'),
+            'comments': len(issue.get('comments', [])),
+            'url': issue.get('html_url', '')
+        }
+        lines = ['---']
+        lines += [f'{key}: {json.dumps(value, ensure_ascii=False)}' for key, value in front_matter.items()]
+        lines += ['---', '', f"# {issue.get('title', '')}", '', (issue.get('body') or '').strip(), '']
+        
+        comments = issue.get('comments', [])
+        if comments:
+            lines += ['## 评论', '']
+            for comment in comments:
+                lines += [
+                    f"### {self._get_login(comment)} · {comment.get('created_at', '')}",
+                    '',
+                    (comment.get('body') or '').strip(),
+                    ''
+                ]
+        
+        return '\n'.join(lines)
+    
+    def _render_index_markdown(self, rows: List[Tuple[Dict[str, Any], str]], repository: Dict[str, Any],
+                               export_info: Dict[str, Any]) -> str:
+        """生成压缩包的索引文件，列出所有 Issue 及其文件链接"""
+        def cell(text):
+            return str(text or '').replace('|', '\\|').replace('\n', ' ')
+        
+        lines = [
+            f"# {repository.get('full_name', '')}",
+            '',
+            repository.get('description') or '',
+            '',
+            f"导出时间：{export_info.get('export_time', '')}，"
+            f"共 {export_info.get('total_issues', 0)} 个 Issue、{export_info.get('total_comments', 0)} 条评论",
+            '',
+            '| # | 标题 | 状态 | 作者 | 标签 | 评论 | 更新时间 |',
+            '| --- | --- | --- | --- | --- | --- | --- |'
+        ]
+        for issue, path in rows:
+            lines.append('| {} | [{}]({}) | {} | {} | {} | {} | {} |'.format(
+                issue.get('number', ''),
+                cell(issue.get('title')),
+                path,
+                issue.get('state', ''),
+                cell(self._get_login(issue)),
+                cell(', '.join(label.get('name', '') for label in issue.get('labels', []))),
+                issue.get('comments', 0),
+                issue.get('updated_at', '')
+            ))
+        
+        return '\n'.join(lines) + '\n'
+    
+    def _stream_sqlite(self, issues: Iterator[Dict[str, Any]], repository: Dict[str, Any],
+                       export_info: Dict[str, Any]) -> Iterator[bytes]:
+        """产出规范化的 SQLite 数据库文件
+
+        数据库先写入临时文件：所有数据在同一个事务中按批 executemany 写入，
+        提交前统一建立索引和全文检索表，完成后分块读出并删除临时文件
+        """
+        fd, path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(path, isolation_level=None)
+            try:
+                # 临时文件写完即丢弃，不需要回滚日志和逐次刷盘
+                conn.execute('PRAGMA journal_mode = OFF')
+                conn.execute('PRAGMA synchronous = OFF')
+                conn.execute('BEGIN')
+                self._create_sqlite_tables(conn)
+                
+                label_ids: Dict[str, int] = {}
+                while True:
+                    batch = list(islice(issues, self.SQLITE_BATCH_SIZE))
+                    if not batch:
+                        break
+                    self._insert_sqlite_batch(conn, batch, label_ids)
+                
+                self._finish_sqlite(conn, repository, export_info)
+                conn.execute('COMMIT')
+            finally:
+                conn.close()
+            
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(self.SQLITE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
+    
+    def _create_sqlite_tables(self, conn: sqlite3.Connection) -> None:
+        """创建 SQLite 导出的表结构（索引在数据写入后再建立）"""
+        self._execute_sql_script(conn, '''
+            CREATE TABLE users (
+                login TEXT PRIMARY KEY,
+                avatar_url TEXT
+            );
+            CREATE TABLE issues (
+                number INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                body TEXT,
+                state TEXT,
+                author TEXT REFERENCES users(login),
+                created_at TEXT,
+                updated_at TEXT,
+                closed_at TEXT,
+                comments_count INTEGER,
+                html_url TEXT
+            );
+            CREATE TABLE comments (
+                id INTEGER PRIMARY KEY,
+                issue_number INTEGER NOT NULL REFERENCES issues(number),
+                author TEXT REFERENCES users(login),
+                body TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                html_url TEXT
+            );
+            CREATE TABLE labels (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                color TEXT
+            );
+            CREATE TABLE issue_labels (
+                issue_number INTEGER NOT NULL REFERENCES issues(number),
+                label_id INTEGER NOT NULL REFERENCES labels(id),
+                PRIMARY KEY (issue_number, label_id)
+            );
+            CREATE TABLE export_info (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        ''')
+    
+    def _insert_sqlite_batch(self, conn: sqlite3.Connection, issues: List[Dict[str, Any]],
+                             label_ids: Dict[str, int]) -> None:
+        """批量写入一批 Issue 及其评论、标签和用户"""
+        users = {}
+        issue_rows = []
+        comment_rows = []
+        issue_label_rows = []
+        new_labels = []
+        
+        for issue in issues:
+            for item in [issue] + issue.get('comments', []):
+                login = self._get_login(item)
+                if login:
+                    users[login] = (item.get('user') or {}).get('avatar_url') or users.get(login)
+            
+            issue_rows.append((
+                issue.get('number'), issue.get('title', ''), issue.get('body'), issue.get('state'),
+                self._get_login(issue) or None, issue.get('created_at'), issue.get('updated_at'),
+                issue.get('closed_at'), len(issue.get('comments', [])), issue.get('html_url')
+            ))
+            comment_rows += [(
+                comment.get('id'), issue.get('number'), self._get_login(comment) or None, comment.get('body'),
+                comment.get('created_at'), comment.get('updated_at'), comment.get('html_url')
+            ) for comment in issue.get('comments', [])]
+            
+            for label in issue.get('labels', []):
+                name = label.get('name', '')
+                if name not in label_ids:
+                    label_ids[name] = len(label_ids) + 1
+                    new_labels.append((label_ids[name], name, label.get('color')))
+                issue_label_rows.append((issue.get('number'), label_ids[name]))
         
-        return content, filename
+        # 同一用户可能出现在多个批次中，保留已有的头像
+        conn.executemany(
+            'INSERT INTO users (login, avatar_url) VALUES (?, ?) '
+            'ON CONFLICT(login) DO UPDATE SET avatar_url = COALESCE(users.avatar_url, excluded.avatar_url)',
+            users.items())
+        conn.executemany('INSERT INTO labels (id, name, color) VALUES (?, ?, ?)', new_labels)
+        conn.executemany('INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', issue_rows)
+        conn.executemany('INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?, ?, ?, ?)', comment_rows)
+        conn.executemany('INSERT OR IGNORE INTO issue_labels VALUES (?, ?)', issue_label_rows)
     
-    def _get_content_type(self, export_format: str) -> str:
+    def _finish_sqlite(self, conn: sqlite3.Connection, repository: Dict[str, Any],
+                       export_info: Dict[str, Any]) -> None:
+        """写入导出信息，建立索引和全文检索表"""
+        conn.executemany('INSERT INTO export_info (key, value) VALUES (?, ?)', [
+            (key, json.dumps(value, ensure_ascii=False))
+            for key, value in list(export_info.items()) + [('repository', repository)]
+        ])
+        self._execute_sql_script(conn, '''
+            CREATE INDEX idx_issues_state ON issues(state);
+            CREATE INDEX idx_issues_author ON issues(author);
+            CREATE INDEX idx_issues_updated_at ON issues(updated_at);
+            CREATE INDEX idx_comments_issue_number ON comments(issue_number, created_at);
+            CREATE INDEX idx_comments_author ON comments(author);
+            CREATE INDEX idx_issue_labels_label_id ON issue_labels(label_id);
+        ''')
+        
+        # 外部内容的 FTS5 表只保存索引，通过 rebuild 一次性从源表构建
+        try:
+            self._execute_sql_script(conn, '''
+                CREATE VIRTUAL TABLE issues_fts USING fts5(title, body, content='issues', content_rowid='number');
+                INSERT INTO issues_fts(issues_fts) VALUES ('rebuild');
+                CREATE VIRTUAL TABLE comments_fts USING fts5(body, content='comments', content_rowid='id');
+                INSERT INTO comments_fts(comments_fts) VALUES ('rebuild');
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"当前 SQLite 不支持 FTS5，跳过全文检索表: {e}")
+    
+    def _execute_sql_script(self, conn: sqlite3.Connection, script: str) -> None:
+        """逐条执行 SQL 脚本（executescript 会先提交当前事务，不能在单一事务中使用）"""
+        for statement in script.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+    
+    def _dump_json(self, data: Any, indent_level: int) -> str:
+        """序列化为缩进 JSON，并整体右移到指定缩进层级"""
+        return json.dumps(data, ensure_ascii=False, indent=2).replace('\n', '\n' + ' ' * indent_level)
+    
+    def _get_login(self, item: Dict[str, Any]) -> str:
+        """获取 Issue / 评论作者的用户名"""
+        return item.get('author') or (item.get('user') or {}).get('login', '')
+    
+    def get_filename(self, repo_name: str, export_format: str, mode: str = 'full') -> str:
+        """生成导出文件名
+        
+        Args:
+            repo_name: 仓库名称
+            export_format: 导出格式
+            mode: 导出模式
+        
+        Returns:
+            文件名
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        kind = 'delta' if mode == 'delta' else 'export'
+        return f"{repo_name.replace('/', '_')}_{kind}_{timestamp}.{export_format}"
+    
+    def get_content_type(self, export_format: str) -> str:
         """获取内容类型
         
         Args:
             export_format: 导出格式
-            
+        
         Returns:
             MIME 类型字符串
         """
         content_types = {
             'json': 'application/json',
-            'csv': 'text/csv'
+            'ndjson': 'application/x-ndjson',
+            'csv': 'text/csv',
+            'zip': 'application/zip',
+            'sqlite': 'application/vnd.sqlite3'
         }
         
         return content_types.get(export_format.lower(), 'application/octet-stream')
     
-    def get_available_repos(self) -> List[Dict[str, str]]:
-        """获取可用的仓库列表
+    def get_available_repos(self, is_admin: bool = False) -> List[Dict[str, str]]:
+        """获取可用的仓库列表（指定了用户名时只返回该用户可见的仓库）
+        
+        Args:
+            is_admin: 当前用户是否为管理员
         
         Returns:
             仓库列表，每个仓库包含 name、full_name、description 和 open_issues
         """
         try:
-            from utils.storage import StorageManager
-            storage = StorageManager()
-            repos_data = storage.get_repos()
+            from utils.storage import get_storage
+            storage = get_storage()
+            if self.username:
+                repos_data = storage.get_user_repos(self.username, is_admin)
+            else:
+                repos_data = storage.get_repos()
             repositories = repos_data.get('repositories', [])
             
             return [{
@@ -260,7 +1132,70 @@ class DataExporter:
                 'description': repo.get('description', '')[:100] if repo.get('description') else '暂无描述',
                 'open_issues': repo.get('open_issues', 0)
             } for repo in repositories]
-            
+        
         except Exception as e:
             print(f"获取仓库列表时发生错误: {e}")
-            return []
\ No newline at end of file
+            return []
+
+
+def merge_export_delta(base: Dict[str, Any], delta: Dict[str, Any], drop_closed: bool = False) -> Dict[str, Any]:
+    """将增量导出合并到上一次的完整导出（JSON 格式）中
+    
+    Issue 按编号覆盖，评论按 ID 覆盖并按创建时间排序；墓碑记录将对应 Issue 标记为关闭，
+    drop_closed 为 True 时直接移除已关闭的 Issue。合并结果可以作为下一次合并的基础。
+    
+    Args:
+        base: 完整导出（或上一次合并结果）
+        delta: 增量导出
+        drop_closed: 是否移除墓碑记录对应的 Issue
+    
+    Returns:
+        合并后的完整导出
+    """
+    issues = {issue['number']: issue for issue in base.get('issues', [])}
+    
+    def merge_comments(existing: List[Dict[str, Any]], changed: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        comments = {comment['id']: comment for comment in existing}
+        for comment in changed:
+            comments[comment['id']] = comment
+        return sorted(comments.values(), key=lambda c: (c.get('created_at') or '', c['id']))
+    
+    for issue in delta.get('issues', []):
+        previous = issues.get(issue['number'])
+        merged = dict(issue)
+        if previous:
+            merged['comments'] = merge_comments(previous.get('comments', []), issue.get('comments', []))
+        issues[issue['number']] = merged
+    
+    for comment in delta.get('comments', []):
+        comment = dict(comment)
+        issue = issues.get(comment.pop('issue_number', None))
+        if issue is not None:
+            issue['comments'] = merge_comments(issue.get('comments', []), [comment])
+    
+    for tombstone in delta.get('tombstones', []):
+        if tombstone.get('type') != 'issue' or tombstone.get('number') not in issues:
+            continue
+        if drop_closed:
+            issues.pop(tombstone['number'])
+        else:
+            issues[tombstone['number']]['state'] = 'closed'
+            issues[tombstone['number']]['closed_at'] = tombstone.get('closed_at')
+    
+    merged_issues = [issues[number] for number in sorted(issues)]
+    export_info = dict(base.get('export_info', {}))
+    delta_info = delta.get('export_info', {})
+    export_info.update({
+        'export_time': delta_info.get('export_time', export_info.get('export_time')),
+        'export_mode': 'merged',
+        'max_updated_at': max(filter(None, [export_info.get('max_updated_at'), delta_info.get('max_updated_at')]), default=None),
+        'total_issues': len(merged_issues),
+        'total_comments': sum(len(issue.get('comments', [])) for issue in merged_issues)
+    })
+    export_info.pop('since', None)
+    
+    return {
+        'repository': delta.get('repository', base.get('repository', {})),
+        'issues': merged_issues,
+        'export_info': export_info
+    }
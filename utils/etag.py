@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 接口的 ETag / 304 支持
+ETag 由廉价的版本戳（如最大 updated_at）计算，而不是对整个响应体求哈希；
+最近下发过的 ETag 会被记住，客户端带 If-None-Match 重新验证时可在访问 GitHub 或存储之前直接返回 304
+"""
+
+import hashlib
+import threading
+import time
+from functools import wraps
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+from flask import request, session, jsonify, make_response
+
+
+class ETagRegistry:
+    """记录最近下发的 ETag，并按作用域（如仓库名）维护失效代数"""
+
+    def __init__(self, ttl: int = 30, max_entries: int = 4096):
+        """初始化 ETag 注册表
+
+        Args:
+            ttl: 记录的有效期（秒）。超过有效期后需要重新计算版本戳；
+                 多实例部署时，其他实例上的写操作最多延迟这么久被感知
+            max_entries: 最大记录条数
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[str, float, str, int]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        """注册写操作后的自动失效钩子"""
+        app.after_request(self._invalidate_after_write)
+
+    def generation(self, scope: str) -> int:
+        """获取作用域当前的失效代数"""
+        return self._generations.get(scope, 0)
+
+    def invalidate(self, scope: str) -> None:
+        """使作用域下已记录的 ETag 全部失效（写操作后调用）"""
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    def lookup(self, key: str) -> Optional[str]:
+        """获取仍然有效的 ETag，过期或已失效时返回 None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        etag, expires_at, scope, generation = entry
+        if expires_at < time.time() or generation != self.generation(scope):
+            return None
+        return etag
+
+    def remember(self, key: str, etag: str, scope: str) -> None:
+        """记录下发的 ETag"""
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.time()
+                self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (etag, time.time() + self.ttl, scope, self.generation(scope))
+
+    def _invalidate_after_write(self, response):
+        """仓库相关的写请求成功后，使该仓库下记录的 ETag 失效"""
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            repo_full_name = (request.view_args or {}).get('repo_full_name')
+            if repo_full_name:
+                self.invalidate(repo_full_name)
+        return response
+
+
+# 进程内共享的 ETag 注册表
+etag_registry = ETagRegistry()
+
+
+def version_stamp(items: Iterable[Dict[str, Any]], id_field: str = 'id') -> str:
+    """根据条目的 id 和 updated_at 计算列表的版本戳
+
+    Args:
+        items: 条目列表
+        id_field: 条目的唯一标识字段
+
+    Returns:
+        版本戳字符串（条目数、最大 updated_at、id 之和）
+    """
+    count = 0
+    id_sum = 0
+    max_updated = ''
+    for item in items or []:
+        count += 1
+        item_id = item.get(id_field)
+        if isinstance(item_id, int):
+            id_sum += item_id
+        updated_at = item.get('updated_at') or ''
+        if updated_at > max_updated:
+            max_updated = updated_at
+    return f'{count}:{max_updated}:{id_sum}'
+
+
+def _request_key() -> str:
+    """当前请求的缓存键：用户 + 完整路径（含查询参数）"""
+    user = session.get('username') or hashlib.sha1(
+        (session.get('github_token') or '').encode('utf-8')
+    ).hexdigest()[:12]
+    return f'{user}:{request.full_path}'
+
+
+def _client_has(etag: str) -> bool:
+    """客户端是否持有该 ETag（压缩中间件会为压缩变体追加 -gzip / -br 后缀）"""
+    return any(request.if_none_match.contains(tag) for tag in (etag, f'{etag}-gzip', f'{etag}-br'))
+
+
+def _not_modified(etag: str):
+    """构造 304 响应"""
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional_json(scope: Callable[..., str], version: Callable[[Dict[str, Any]], str]):
+    """为返回 dict 的 JSON 视图添加 ETag / 304 支持
+
+    视图返回 dict 时按 version(result) 计算 ETag；返回其他响应（如错误元组）时原样透传。
+
+    Args:
+        scope: 根据视图参数返回失效作用域，如仓库全名
+        version: 根据视图返回的 dict 计算版本戳
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = _request_key()
+            resource_scope = scope(**kwargs)
+
+            # 客户端持有的 ETag 仍然有效：不访问 GitHub 或存储，直接返回 304
+            known_etag = etag_registry.lookup(key)
+            if known_etag and _client_has(known_etag):
+                return _not_modified(known_etag)
+
+            result = f(*args, **kwargs)
+            if not isinstance(result, dict) or not result.get('success', True):
+                return jsonify(result) if isinstance(result, dict) else result
+
+            stamp = f'{key}|{version(result)}'
+            etag = hashlib.sha1(stamp.encode('utf-8')).hexdigest()
+            etag_registry.remember(key, etag, resource_scope)
+
+            if _client_has(etag):
+                return _not_modified(etag)
+
+            response = jsonify(result)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        return decorated_function
+    return decorator
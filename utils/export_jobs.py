@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台导出任务
+导出拆分为按页执行、可断点续传的步骤，任务状态和已获取的分页数据通过 StorageManager 持久化，
+每次调用只在时间预算内执行若干步，适合 Vercel 等有执行时长限制的环境。
+一个任务可以包含多个仓库（批量导出），多个仓库的步骤在共享的 API 速率额度内并发执行
+"""
+
+import json
+import os
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from utils.data_exporter import DataExporter
+from utils.storage import get_storage
+from utils.zip_stream import stream_zip
+
+
+class ExportJobManager:
+    """后台导出任务管理器"""
+
+    # 单次调用执行步骤的时间预算（秒），需小于函数执行时长限制
+    STEP_TIME_BUDGET = float(os.getenv('EXPORT_JOB_STEP_BUDGET', 5))
+    # 同一任务的执行租约（秒），避免并发轮询重复执行同一页
+    LEASE_SECONDS = 30
+    # 同一页连续失败达到该次数后该仓库标记为失败
+    MAX_FAILURES = 3
+    # 批量导出时并发执行的仓库数
+    BATCH_WORKERS = int(os.getenv('EXPORT_BATCH_WORKERS', 4))
+    # 每个保存的分页数据块的最大字节数（JSON），一页超过时拆分为多个块，避免超出 KV 单个值的大小限制
+    CHUNK_MAX_BYTES = int(os.getenv('EXPORT_JOB_CHUNK_MAX_BYTES', 512 * 1024))
+
+    def __init__(self):
+        self.storage = get_storage()
+
+    def create_job(self, github_token: Optional[str], username: str, repos: List[str],
+                   export_format: str = 'json', mode: str = 'full') -> Dict[str, Any]:
+        """创建导出任务（只获取仓库信息，不获取 Issue）
+
+        Args:
+            github_token: GitHub API Token
+            username: 任务所属用户
+            repos: 仓库全名列表，多于一个时为批量导出，结果打包为 ZIP
+            export_format: 导出格式
+            mode: 导出模式 ('full', 'delta')
+
+        Returns:
+            包含任务进度信息的字典
+        """
+        if not self.storage.supports_export_jobs():
+            return {
+                'success': False,
+                'error': '当前存储后端（Vercel Blob）不支持后台导出任务，请配置 Vercel KV 或使用直接导出'
+            }
+
+        # 顺带清理被放弃的过期任务
+        self.storage.sweep_export_jobs()
+
+        repos = list(dict.fromkeys(repos))
+        if not repos:
+            return {
+                'success': False,
+                'error': '没有可导出的仓库'
+            }
+
+        def prepare(repo_full_name):
+            exporter = DataExporter(github_token, username)
+            # 仓库未变化时直接使用缓存的导出结果，不再逐页获取
+            cached, probe = exporter.lookup_cache(repo_full_name, export_format, mode)
+            if cached:
+                exporter.save_checkpoint(repo_full_name, cached['export_info'])
+                return {'success': True, 'cached': cached}
+            prepared = exporter.prepare_export(repo_full_name, export_format, mode)
+            prepared['probe'] = probe
+            return prepared
+
+        with ThreadPoolExecutor(max_workers=min(self.BATCH_WORKERS, len(repos))) as executor:
+            prepared_list = list(executor.map(prepare, repos))
+
+        # 单仓库导出直接返回错误；批量导出只将失败的仓库标记为失败
+        if len(repos) == 1 and not prepared_list[0].get('success'):
+            return prepared_list[0]
+        if not any(prepared.get('success') for prepared in prepared_list):
+            return {
+                'success': False,
+                'error': prepared_list[0].get('error', '获取仓库信息失败')
+            }
+
+        now = datetime.now().isoformat()
+        job = {
+            'id': uuid.uuid4().hex,
+            'username': username,
+            'kind': 'batch' if len(repos) > 1 else 'single',
+            'format': export_format.lower(),
+            'mode': mode,
+            'status': 'pending',
+            'targets': [self._new_target(repo, prepared) for repo, prepared in zip(repos, prepared_list)],
+            'lease_until': 0,
+            'waiting_until': 0,
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        }
+        # 所有仓库都命中缓存时任务直接完成
+        if all(target['status'] in ('completed', 'failed') for target in job['targets']):
+            job['status'] = 'completed'
+
+        if not self.storage.save_export_job(job['id'], job):
+            return {
+                'success': False,
+                'error': '保存导出任务失败'
+            }
+
+        return {
+            'success': True,
+            'job': self.get_progress(job)
+        }
+
+    def _new_target(self, repo_full_name: str, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """生成单个仓库的导出进度"""
+        if not prepared.get('success'):
+            return {
+                'repo_full_name': repo_full_name,
+                'status': 'failed',
+                'phase': 'done',
+                'comment_pages': 0,
+                'issue_pages': 0,
+                'comments_done': 0,
+                'issues_done': 0,
+                'error': prepared.get('error')
+            }
+
+        if prepared.get('cached'):
+            export_info = prepared['cached']['export_info']
+            return {
+                'repo_full_name': repo_full_name,
+                'status': 'completed',
+                'phase': 'done',
+                'cached': True,
+                'comment_pages': 0,
+                'issue_pages': 0,
+                'comments_done': export_info.get('total_comments', 0),
+                'issues_done': export_info.get('total_issues', 0),
+                'export_info': export_info,
+                'error': None
+            }
+
+        return {
+            'repo_full_name': repo_full_name,
+            'since': prepared['export_info'].get('since'),
+            'status': 'pending',
+            # 先获取仓库级评论列表，再获取 Issues
+            'phase': 'comments',
+            'page': 0,
+            'comment_pages': 0,
+            'issue_pages': 0,
+            'comments_done': 0,
+            'issues_done': 0,
+            'max_updated_at': prepared['export_info'].get('max_updated_at'),
+            'repository': prepared['repository'],
+            'export_info': prepared['export_info'],
+            'probe': prepared.get('probe'),
+            'failures': 0,
+            'error': None
+        }
+
+    def get_job(self, job_id: str, username: str) -> Optional[Dict[str, Any]]:
+        """获取任务状态（只能访问自己的任务）"""
+        job = self.storage.get_export_job(job_id)
+        if not job or job.get('username') != username:
+            return None
+        return job
+
+    def get_progress(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """生成前端使用的任务进度信息"""
+        targets = job['targets']
+        active = [target for target in targets if target['status'] not in ('completed', 'failed')]
+        errors = [f"{target['repo_full_name']}: {target['error']}" for target in targets if target.get('error')]
+
+        return {
+            'id': job['id'],
+            'kind': job['kind'],
+            'format': job['format'],
+            'mode': job['mode'],
+            'status': job['status'],
+            'phase': active[0]['phase'] if active else 'done',
+            'repos_done': len(targets) - len(active),
+            'repos_total': len(targets),
+            'issues_done': sum(target['issues_done'] for target in targets),
+            'comments_done': sum(target['comments_done'] for target in targets),
+            'targets': [{
+                'repo_full_name': target['repo_full_name'],
+                'status': target['status'],
+                'phase': target['phase'],
+                'issues_done': target['issues_done'],
+                'comments_done': target['comments_done'],
+                'error': target.get('error')
+            } for target in targets],
+            'error': job['error'] or ('; '.join(errors) if errors else None),
+            'waiting_until': job.get('waiting_until', 0),
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at'],
+            'download_url': f"/api/export/jobs/{job['id']}/download" if job['status'] == 'completed' else None
+        }
+
+    def run_steps(self, job: Dict[str, Any], github_token: Optional[str]) -> Dict[str, Any]:
+        """在时间预算内执行任务的若干步骤，每轮完成后保存进度
+
+        每轮为最多 BATCH_WORKERS 个未完成的仓库各执行一步；并发数受剩余 API 速率额度限制，
+        额度不足时不等待，记录 waiting_until 后直接返回，由下一次调用继续
+
+        Args:
+            job: 任务状态
+            github_token: GitHub API Token（不随任务保存）
+
+        Returns:
+            最新的任务状态
+        """
+        if job['status'] in ('completed', 'failed') or job.get('lease_until', 0) > time.time():
+            return job
+
+        # 租约通过条件写入获取：并发的调用中只有一个能写入自己的 lease_id
+        lease_id = uuid.uuid4().hex
+
+        def claim(current):
+            if current['status'] in ('completed', 'failed') or current.get('lease_until', 0) > time.time():
+                return None
+            current['status'] = 'running'
+            current['lease_until'] = time.time() + self.LEASE_SECONDS
+            current['lease_id'] = lease_id
+            return current
+
+        claimed = self.storage.update_export_job(job['id'], claim)
+        if not claimed or claimed.get('lease_id') != lease_id:
+            return claimed or job
+        job = claimed
+
+        budget_checker = DataExporter(github_token, job['username'])
+        deadline = time.time() + self.STEP_TIME_BUDGET
+
+        try:
+            # 每次调用至少执行一轮，保证任务总能推进
+            while True:
+                active = [target for target in job['targets'] if target['status'] not in ('completed', 'failed')]
+                if not active:
+                    break
+
+                available = budget_checker.get_rate_budget()
+                if available <= 0:
+                    job['waiting_until'] = budget_checker.github_service.get_rate_limit_status()['reset']
+                    break
+                job['waiting_until'] = 0
+
+                self._run_round(job, active[:min(self.BATCH_WORKERS, available)], github_token)
+
+                job['updated_at'] = datetime.now().isoformat()
+                self.storage.save_export_job(job['id'], job)
+                if time.time() >= deadline:
+                    break
+        except Exception as e:
+            print(f"导出任务 {job['id']} 执行失败: {e}")
+            job['error'] = str(e)
+
+        if all(target['status'] in ('completed', 'failed') for target in job['targets']):
+            failed = all(target['status'] == 'failed' for target in job['targets'])
+            job['status'] = 'failed' if failed else 'completed'
+
+        job['lease_until'] = 0
+        self.storage.save_export_job(job['id'], job)
+        return job
+
+    def _run_round(self, job: Dict[str, Any], targets: List[Dict[str, Any]], github_token: Optional[str]) -> None:
+        """并发为每个仓库执行一步；单个仓库失败不影响其他仓库"""
+        def run(target):
+            # 每个线程使用独立的 GitHub 客户端
+            exporter = DataExporter(github_token, job['username'])
+            try:
+                self._run_step(job, target, exporter)
+            except Exception as e:
+                # 保留已完成的步骤，下一轮从失败的页重试
+                print(f"导出仓库 {target['repo_full_name']} 失败: {e}")
+                target['error'] = str(e)
+                target['failures'] = target.get('failures', 0) + 1
+                if target['failures'] >= self.MAX_FAILURES:
+                    target['status'] = 'failed'
+
+        if len(targets) == 1:
+            run(targets[0])
+            return
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            list(executor.map(run, targets))
+
+    def _run_step(self, job: Dict[str, Any], target: Dict[str, Any], exporter: DataExporter) -> None:
+        """执行一步：获取并保存某个仓库的一页评论或 Issues"""
+        service = exporter.github_service
+        index = job['targets'].index(target)
+        target['status'] = 'running'
+
+        if target['phase'] == 'comments':
+            result = service.get_repo_comments_page(target['repo_full_name'], target['page'], since=target['since'])
+        else:
+            result = service.get_issues_page(target['repo_full_name'], target['page'], since=target['since'])
+
+        if not result.get('success'):
+            raise RuntimeError(result.get('error', '获取数据失败'))
+
+        items = result.get('data', [])
+        if target['phase'] == 'comments':
+            target['comment_pages'] += self._save_chunks(job, f'{index}_comments', target['comment_pages'], items)
+            target['comments_done'] += len(items)
+            self._track_updated_at(target, [comment for _, comment in items])
+        else:
+            target['issue_pages'] += self._save_chunks(job, f'{index}_issues', target['issue_pages'], items)
+            target['issues_done'] += len(items)
+            self._track_updated_at(target, items)
+
+        target['error'] = None
+        target['failures'] = 0
+        target['page'] += 1
+
+        if result.get('has_more'):
+            return
+
+        if target['phase'] == 'comments':
+            target['phase'] = 'issues'
+            target['page'] = 0
+        else:
+            target['phase'] = 'done'
+            target['status'] = 'completed'
+            exporter.save_checkpoint(target['repo_full_name'], {
+                'export_time': target['export_info']['export_time'],
+                'max_updated_at': target['max_updated_at'],
+                'export_mode': job['mode']
+            })
+
+    def _save_chunks(self, job: Dict[str, Any], prefix: str, start: int, items: List[Any]) -> int:
+        """保存一页数据，按 CHUNK_MAX_BYTES 拆分为编号从 start 开始的若干块
+
+        失败时抛出异常以便下次重试该页（重试时覆盖相同编号的块）
+
+        Returns:
+            保存的块数
+        """
+        chunks, current, size = [], [], 0
+        for item in items:
+            item_size = len(json.dumps(item, ensure_ascii=False).encode('utf-8'))
+            # 单个条目超过上限时单独成块
+            if current and size + item_size > self.CHUNK_MAX_BYTES:
+                chunks.append(current)
+                current, size = [], 0
+            current.append(item)
+            size += item_size
+        chunks.append(current)
+
+        for offset, chunk in enumerate(chunks):
+            name = f'{prefix}_{start + offset}'
+            if not self.storage.save_export_job_chunk(job['id'], name, {'items': chunk}):
+                raise RuntimeError(f'保存导出数据失败: {name}')
+        return len(chunks)
+
+    def _track_updated_at(self, target: Dict[str, Any], items: List[Dict[str, Any]]) -> None:
+        """记录已获取数据中最大的 updated_at，完成后作为检查点"""
+        for item in items:
+            updated_at = item.get('updated_at')
+            if updated_at and (not target['max_updated_at'] or updated_at > target['max_updated_at']):
+                target['max_updated_at'] = updated_at
+
+    def stream_artifact(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """从已保存的分页数据生成导出文件流，完整写出后删除任务及其分页数据
+
+        单仓库任务直接产出导出文件；批量任务产出 ZIP，每个仓库一个文件，另附 manifest.json
+
+        Returns:
+            包含 stream、文件名和内容类型的字典
+        """
+        exporter = DataExporter(username=job['username'])
+
+        if job['kind'] == 'single':
+            target = job['targets'][0]
+            return {
+                'stream': self._delete_after(job, self._render_target(job, 0, exporter, dict(target['export_info']))),
+                'filename': exporter.get_filename(target['repo_full_name'], job['format'], job['mode']),
+                'content_type': exporter.get_content_type(job['format'])
+            }
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        kind = 'delta' if job['mode'] == 'delta' else 'export'
+        return {
+            'stream': self._delete_after(job, stream_zip(self._iter_archive_entries(job, exporter))),
+            'filename': f'hubnote_batch_{kind}_{timestamp}.zip',
+            'content_type': 'application/zip'
+        }
+
+    def _delete_after(self, job: Dict[str, Any], stream: Iterator[Any]) -> Iterator[Any]:
+        """产出导出文件流，全部写出后删除任务（下载中断时保留，可以重新下载）"""
+        yield from stream
+        self.delete_job(job)
+
+    def _iter_archive_entries(self, job: Dict[str, Any],
+                              exporter: DataExporter) -> Iterator[Tuple[str, Iterator[str]]]:
+        """产出批量导出压缩包的条目，清单在所有仓库写出后生成"""
+        manifest = {
+            'export_time': datetime.now().isoformat(),
+            'export_format': job['format'],
+            'export_mode': job['mode'],
+            'repositories': []
+        }
+
+        for index, target in enumerate(job['targets']):
+            entry = {
+                'repo_full_name': target['repo_full_name'],
+                'status': target['status'],
+                'file': None,
+                'error': target.get('error')
+            }
+            manifest['repositories'].append(entry)
+            if target['status'] != 'completed':
+                continue
+
+            # export_info 中的统计在该仓库文件写出完毕后才是最终值
+            export_info = dict(target['export_info'])
+            entry['file'] = f"{target['repo_full_name'].replace('/', '_')}.{job['format']}"
+            entry['export_info'] = export_info
+            yield entry['file'], self._render_target(job, index, exporter, export_info)
+
+        manifest['total_issues'] = sum(
+            entry.get('export_info', {}).get('total_issues', 0) for entry in manifest['repositories'])
+        manifest['total_comments'] = sum(
+            entry.get('export_info', {}).get('total_comments', 0) for entry in manifest['repositories'])
+        yield 'manifest.json', [json.dumps(manifest, ensure_ascii=False, indent=2)]
+
+    def _render_target(self, job: Dict[str, Any], index: int, exporter: DataExporter,
+                       export_info: Dict[str, Any]) -> Iterator[str]:
+        """将某个仓库已保存的分页数据写出为导出文件流"""
+        target = job['targets'][index]
+
+        if target.get('cached'):
+            content = exporter.get_cached_content(target['repo_full_name'], job['format'], job['mode'])
+            if content is None:
+                raise RuntimeError(f"{target['repo_full_name']} 的缓存导出结果已失效，请重新导出")
+            return iter([content])
+
+        comment_map = defaultdict(list)
+        for page in range(target['comment_pages']):
+            chunk = self.storage.get_export_job_chunk(job['id'], f'{index}_comments_{page}') or {}
+            for issue_number, comment in chunk.get('items', []):
+                if not exporter.is_pull_request_comment(comment):
+                    comment_map[issue_number].append(comment)
+
+        delta = {'comments': [], 'tombstones': []} if job['mode'] == 'delta' else None
+        issues = exporter.join_comments(self._iter_issue_chunks(job, index), comment_map, export_info, delta)
+        stream = exporter.render_stream(issues, target['repository'], export_info, delta)
+        if target.get('probe'):
+            stream = exporter.cache_stream(stream, target['repo_full_name'], job['format'], job['mode'],
+                                           target['probe'], export_info)
+        return stream
+
+    def _iter_issue_chunks(self, job: Dict[str, Any], index: int) -> Iterator[Dict[str, Any]]:
+        """逐页读取某个仓库已保存的 Issues"""
+        for page in range(job['targets'][index]['issue_pages']):
+            chunk = self.storage.get_export_job_chunk(job['id'], f'{index}_issues_{page}') or {}
+            yield from chunk.get('items', [])
+
+    def delete_job(self, job: Dict[str, Any]) -> bool:
+        """删除任务及其分页数据"""
+        chunk_names = []
+        for index, target in enumerate(job['targets']):
+            chunk_names += [f'{index}_comments_{page}' for page in range(target['comment_pages'])]
+            chunk_names += [f'{index}_issues_{page}' for page in range(target['issue_pages'])]
+        return self.storage.delete_export_job(job['id'], chunk_names)
+
+
+# 应用共享的导出任务管理器
+export_jobs = ExportJobManager()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模板片段缓存
+按 (模板版本, 片段键) 缓存渲染好的 HTML 片段，页面只重新渲染发生变化的片段
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+from flask import g, render_template, current_app
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """模板片段缓存（进程内 LRU）"""
+
+    def __init__(self, max_entries: int = 2048, ttl: int = 60):
+        """初始化片段缓存
+
+        Args:
+            max_entries: 最大缓存条目数（LRU 淘汰）
+            ttl: 片段有效期（秒）。片段中含有“x分钟前”这类相对时间，需要定期刷新
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._cache: 'OrderedDict[Tuple, Tuple[float, Markup]]' = OrderedDict()
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app) -> None:
+        """注册模板全局函数和每页命中率响应头"""
+        app.add_template_global(self.render, 'cached_fragment')
+        app.after_request(self._add_stats_header)
+        if app.debug:
+            # 开发时修改的片段模板需要立即生效：每个请求重新计算模板版本
+            app.before_request(self._versions.clear)
+
+    def template_version(self, template_name: str) -> str:
+        """获取片段模板的版本（模板源码哈希），模板修改后旧片段自动失效"""
+        version = self._versions.get(template_name)
+        if version is None:
+            env = current_app.jinja_env
+            source, _, _ = env.loader.get_source(env, template_name)
+            version = hashlib.md5(source.encode('utf-8')).hexdigest()[:12]
+            self._versions[template_name] = version
+        return version
+
+    def render(self, template_name: str, key: Tuple, **context) -> Markup:
+        """渲染片段，命中缓存时直接返回缓存的 HTML
+
+        Args:
+            template_name: 片段模板名
+            key: 片段键，如 (id, updated_at)
+            **context: 渲染片段所需的模板变量
+
+        Returns:
+            片段 HTML
+        """
+        cache_key = (template_name, self.template_version(template_name)) + tuple(key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+                self._record_page_stat('hits')
+                return entry[1]
+
+        html = Markup(render_template(template_name, **context))
+
+        with self._lock:
+            self._cache[cache_key] = (now + self.ttl, html)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            self.misses += 1
+            self._record_page_stat('misses')
+
+        return html
+
+    def page_stats(self) -> Dict[str, Any]:
+        """获取当前请求（页面）的片段命中统计"""
+        stats = g.get('fragment_stats', {'hits': 0, 'misses': 0})
+        total = stats['hits'] + stats['misses']
+        return {
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'hit_rate': round(stats['hits'] / total, 2) if total else 0.0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """获取进程累计的片段命中统计"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 2) if total else 0.0
+        }
+
+    def clear(self) -> None:
+        """清空片段缓存"""
+        with self._lock:
+            self._cache.clear()
+            self._versions.clear()
+
+    def _record_page_stat(self, field: str) -> None:
+        """累计当前请求的命中统计"""
+        if 'fragment_stats' not in g:
+            g.fragment_stats = {'hits': 0, 'misses': 0}
+        g.fragment_stats[field] += 1
+
+    def _add_stats_header(self, response):
+        """在响应头中报告本页的片段命中率"""
+        if 'fragment_stats' in g:
+            stats = self.page_stats()
+            response.headers['X-Fragment-Cache'] = (
+                f"hits={stats['hits']}; misses={stats['misses']}; hit-rate={stats['hit_rate']}"
+            )
+        return response
+
+
+# 进程内共享的片段缓存
+fragment_cache = FragmentCache()
@@ -1,5 +1,7 @@
 import json
 import os
+import re
+import threading
 from datetime import datetime
 import markdown
 
@@ -68,22 +70,23 @@ def format_datetime(iso_string):
     except:
         return iso_string
 
-def render_markdown(text):
-    """渲染 Markdown 文本"""
-    if not text:
-        return ''
-    
-    md = markdown.Markdown(extensions=[
-        'codehilite',
-        'fenced_code',
-        'tables',
-        'toc'
-    ])
-    html_content = md.convert(text)
-    
-    # 修复链接问题
-    import re
-    
+_markdown_local = threading.local()
+
+def _get_markdown_converter():
+    """获取当前线程复用的 Markdown 转换器（避免每次渲染都重新加载扩展）"""
+    md = getattr(_markdown_local, 'md', None)
+    if md is None:
+        md = markdown.Markdown(extensions=[
+            'codehilite',
+            'fenced_code',
+            'tables',
+            'toc'
+        ])
+        _markdown_local.md = md
+    return md
+
+def fix_rendered_links(html_content):
+    """修复渲染结果中的链接问题"""
     # 1. 移除错误的本地路径前缀
     pattern = r'href="http://127\.0\.0\.1:5000/repo/[^/]+/[^/]+/issue/([^"]+)"'
     html_content = re.sub(pattern, r'href="\1"', html_content)
@@ -99,9 +102,18 @@ def render_markdown(text):
         # 添加https://前缀
         return f'href="https://{url}"'
     
-    html_content = re.sub(domain_pattern, add_https_protocol, html_content)
+    return re.sub(domain_pattern, add_https_protocol, html_content)
+
+def render_markdown(text):
+    """渲染 Markdown 文本"""
+    if not text:
+        return ''
+    
+    md = _get_markdown_converter()
+    md.reset()
+    html_content = md.convert(text)
     
-    return html_content
+    return fix_rendered_links(html_content)
 
 def truncate_text(text, max_length=100):
     """截断文本"""
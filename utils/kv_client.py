@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vercel KV（Upstash Redis REST API）客户端
+复用连接池中的 HTTPS 连接，所有请求都有超时；多个命令可以通过 /pipeline 在一次往返中执行
+"""
+
+import os
+from typing import Any, Dict, Iterable, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class KVError(Exception):
+    """KV 请求失败或命令返回错误"""
+
+
+class KVClient:
+    """Upstash Redis REST API 客户端"""
+
+    # 单个请求的超时（秒）
+    TIMEOUT = float(os.getenv('KV_TIMEOUT', 3))
+    # 连接池大小（与同时处理请求的线程数相当即可）
+    POOL_SIZE = int(os.getenv('KV_POOL_SIZE', 10))
+
+    def __init__(self, url: str, token: str):
+        self.url = url.rstrip('/')
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json'
+        })
+        # 只在建立连接失败时重试：请求已发出后重试可能重复执行 INCR 等非幂等命令
+        retry = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.1)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def execute(self, *command: Any) -> Any:
+        """执行单个命令，如 execute('SET', 'key', 'value')"""
+        response = self.session.post(self.url, json=[str(part) for part in command], timeout=self.TIMEOUT)
+        return self._parse_result(response.status_code, self._json(response))
+
+    def pipeline(self, commands: Iterable[Iterable[Any]]) -> List[Any]:
+        """在一次往返中按顺序执行多个命令（非事务），返回每个命令的结果
+
+        任一命令返回错误时抛出 KVError
+        """
+        commands = [[str(part) for part in command] for command in commands]
+        if not commands:
+            return []
+
+        response = self.session.post(f'{self.url}/pipeline', json=commands, timeout=self.TIMEOUT)
+        results = self._json(response)
+        if response.status_code != 200 or not isinstance(results, list):
+            raise KVError(f'KV pipeline 失败: HTTP {response.status_code}')
+        return [self._parse_result(200, result) for result in results]
+
+    def get(self, key: str) -> Optional[str]:
+        """读取一个字符串值，不存在时返回 None"""
+        return self.execute('GET', key)
+
+    def set(self, key: str, value: str) -> bool:
+        """写入一个字符串值"""
+        return self.execute('SET', key, value) == 'OK'
+
+    def delete(self, *keys: str) -> int:
+        """删除若干个键，返回实际删除的数量"""
+        return self.execute('DEL', *keys) if keys else 0
+
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """一次读取多个值，顺序与 keys 一致，不存在的为 None"""
+        return self.execute('MGET', *keys) if keys else []
+
+    def mset(self, mapping: Dict[str, str]) -> bool:
+        """一次写入多个值"""
+        if not mapping:
+            return True
+        args = []
+        for key, value in mapping.items():
+            args += [key, value]
+        return self.execute('MSET', *args) == 'OK'
+
+    def eval(self, script: str, keys: List[str], args: Iterable[Any] = ()) -> Any:
+        """在服务端原子执行 Lua 脚本（用于比较并写入等需要原子性的操作）"""
+        return self.execute('EVAL', script, len(keys), *keys, *args)
+
+    def _json(self, response: requests.Response) -> Any:
+        try:
+            return response.json()
+        except ValueError:
+            raise KVError(f'KV 响应无法解析: HTTP {response.status_code}')
+
+    def _parse_result(self, status_code: int, body: Any) -> Any:
+        """Upstash 的响应格式为 {"result": ...} 或 {"error": "..."}"""
+        if isinstance(body, dict) and body.get('error'):
+            raise KVError(f"KV 命令失败: {body['error']}")
+        if status_code != 200 or not isinstance(body, dict):
+            raise KVError(f'KV 请求失败: HTTP {status_code}')
+        return body.get('result')
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown 实时预览服务
+将文档拆分为顶层块，按内容哈希缓存渲染结果，只重新渲染发生变化的块
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple
+from utils.helpers import render_markdown
+
+
+# 围栏代码块的起止标记（``` 或 ~~~）
+_FENCE_RE = re.compile(r'^\s{0,3}(`{3,}|~{3,})')
+# 列表项（无序或有序）
+_LIST_ITEM_RE = re.compile(r'^\s{0,3}(?:[*+-]|\d+[.)])\s+')
+# 需要整篇文档上下文才能正确渲染的语法：引用式链接定义、[TOC] 标记
+_DOCUMENT_SCOPE_RE = re.compile(r'^\s{0,3}\[[^\]]+\]:\s*\S|^\s*\[TOC\]\s*$', re.MULTILINE)
+
+
+def split_markdown_blocks(text: str) -> List[str]:
+    """将 Markdown 文本拆分为可独立渲染的顶层块
+
+    Args:
+        text: Markdown 文本
+
+    Returns:
+        顶层块列表，按原文顺序排列
+    """
+    blocks: List[List[str]] = []
+    current: List[str] = []
+    pending_blank = 0
+    fence = None
+    current_is_list = False
+
+    for line in text.replace('\r\n', '\n').split('\n'):
+        # 围栏代码块内部的所有行（包括空行）都属于同一个块
+        if fence:
+            current.append(line)
+            match = _FENCE_RE.match(line)
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence):
+                fence = None
+            continue
+
+        if not line.strip():
+            if current:
+                pending_blank += 1
+            continue
+
+        if pending_blank:
+            # 缩进行或列表中的下一个列表项是上一个块的延续
+            is_continuation = line[:1] in (' ', '\t') or (
+                current_is_list and _LIST_ITEM_RE.match(line)
+            )
+            if is_continuation:
+                current.extend([''] * pending_blank)
+            else:
+                blocks.append(current)
+                current = []
+            pending_blank = 0
+
+        if not current:
+            current_is_list = bool(_LIST_ITEM_RE.match(line))
+        current.append(line)
+
+        match = _FENCE_RE.match(line)
+        if match:
+            fence = match.group(1)
+
+    if current:
+        blocks.append(current)
+
+    return ['\n'.join(block) for block in blocks]
+
+
+class MarkdownPreviewRenderer:
+    """按块增量渲染 Markdown 的预览渲染器"""
+
+    def __init__(self, max_entries: int = 4096):
+        """初始化预览渲染器
+
+        Args:
+            max_entries: 块缓存的最大条目数（LRU 淘汰）
+        """
+        self.max_entries = max_entries
+        self._cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, text: str) -> Dict[str, Any]:
+        """增量渲染 Markdown 文本
+
+        Args:
+            text: Markdown 文本
+
+        Returns:
+            包含 html 和渲染统计信息的字典
+        """
+        if not text or not text.strip():
+            return {'html': '', 'blocks': 0, 'rendered': 0, 'cached': 0}
+
+        # 含有引用式链接定义等全文语法时，拆块会改变渲染结果，整篇作为一个块处理
+        if _DOCUMENT_SCOPE_RE.search(text):
+            blocks = [text]
+        else:
+            blocks = split_markdown_blocks(text)
+
+        parts = []
+        rendered = 0
+        for block in blocks:
+            html, hit = self._render_block(block)
+            parts.append(html)
+            if not hit:
+                rendered += 1
+
+        return {
+            'html': '\n'.join(parts),
+            'blocks': len(blocks),
+            'rendered': rendered,
+            'cached': len(blocks) - rendered
+        }
+
+    def _render_block(self, block: str) -> Tuple[str, bool]:
+        """渲染单个块，命中缓存时直接返回
+
+        Returns:
+            (html, 是否命中缓存) 元组
+        """
+        key = hashlib.sha1(block.encode('utf-8')).hexdigest()
+
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                return html, True
+
+        html = render_markdown(block)
+
+        with self._lock:
+            self._cache[key] = html
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        return html, False
+
+    def clear(self) -> None:
+        """清空块缓存"""
+        with self._lock:
+            self._cache.clear()
+
+
+# 进程内共享的预览渲染器
+preview_renderer = MarkdownPreviewRenderer()
@@ -1,12 +1,182 @@
 import os
+import copy
 import json
-from typing import Dict, Any, Optional
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable, Tuple
 import requests
+from config import Config
+from utils.cache import CacheTier, KVCache, MemoryCache, SQLiteCache
+from utils.kv_client import KVClient
+
+try:
+    import fcntl
+except ImportError:  # Windows 下只有进程内的锁
+    fcntl = None
+
+
+class StorageConflictError(Exception):
+    """条件写入在重试次数内一直冲突（其他实例同时在修改同一个键）"""
 # 不再依赖 vercel_blob SDK，直接使用 REST API
 VERCEL_BLOB_AVAILABLE = True
 
 class StorageManager:
-    """存储管理器，支持 Vercel KV 和降级存储方案"""
+    """存储管理器，支持 Vercel KV 和降级存储方案
+    
+    应用内通过 get_storage() 共享同一个实例；热点数据（仓库列表、白名单、用户统计）
+    在进程内缓存 READ_CACHE_TTL 秒，本进程的写入会立即更新缓存
+    """
+    
+    # 进程内缓存读取结果的存储键
+    READ_CACHE_KEYS = ('repos', 'user_whitelist', 'user_stats')
+    # 读取缓存的有效期（秒），其他实例的写入最多延迟这么久可见；为 0 时关闭缓存
+    READ_CACHE_TTL = float(os.getenv('STORAGE_READ_CACHE_TTL', 30))
+    
+    # 仓库存储：每个仓库一个键，另有按添加顺序排列的仓库名索引和每个用户的仓库名集合
+    REPO_INDEX_KEY = 'repos_index'
+    REPO_META_KEY = 'repos_meta'
+    # 默认（所有人可见）仓库名集合（KV）；索引结构版本，低于此版本的索引会重建
+    REPO_DEFAULTS_KEY = 'repos_default'
+    REPO_INDEX_VERSION = 2
+    # 添加一个仓库：SET NX 写入仓库键（已存在时返回 0），并在同一脚本中更新索引、用户集合和元数据
+    # KEYS: 仓库键、索引、用户集合、元数据、默认仓库集合；ARGV: 仓库 JSON、索引分数、仓库名、元数据、是否默认仓库
+    REPO_ADD_SCRIPT = (
+        "if not redis.call('SET', KEYS[1], ARGV[1], 'NX') then return 0 end "
+        "redis.call('ZADD', KEYS[2], 'NX', ARGV[2], ARGV[3]) "
+        "redis.call('SADD', KEYS[3], ARGV[3]) "
+        "redis.call('SET', KEYS[4], ARGV[4]) "
+        "if ARGV[5] == '1' then redis.call('SADD', KEYS[5], ARGV[3]) end "
+        "return 1"
+    )
+    # 整体替换仓库：元数据仍为读取时的值（期间没有其他写入）时，删除旧的键并写入新的仓库，否则返回 0
+    # KEYS: 索引、默认仓库集合、元数据、ARGV[2] 个待删除的键，之后每个仓库依次为仓库键、用户集合；
+    # ARGV: 读取时的元数据（不存在为空串）、待删除的键数、新的元数据，之后每个仓库依次为仓库名、仓库 JSON、是否默认仓库
+    REPO_REPLACE_SCRIPT = (
+        "if (redis.call('GET', KEYS[3]) or '') ~= ARGV[1] then return 0 end "
+        "local deleted = tonumber(ARGV[2]) "
+        "redis.call('DEL', KEYS[1], KEYS[2]) "
+        "for i = 4, 3 + deleted do redis.call('DEL', KEYS[i]) end "
+        "for i = 0, (#ARGV - 3) / 3 - 1 do "
+        "local name = ARGV[4 + i * 3] "
+        "redis.call('SET', KEYS[4 + deleted + i * 2], ARGV[5 + i * 3]) "
+        # 保持原有顺序；之后添加的仓库以时间戳为分数，排在后面
+        "redis.call('ZADD', KEYS[1], i, name) "
+        "redis.call('SADD', KEYS[5 + deleted + i * 2], name) "
+        "if ARGV[6 + i * 3] == '1' then redis.call('SADD', KEYS[2], name) end "
+        "end "
+        "redis.call('SET', KEYS[3], ARGV[3]) "
+        "return 1"
+    )
+    # 内存 / 文件存储下仓库索引的读写锁；KV 中的仓库是否已从旧的整体列表迁移
+    _repos_lock = threading.RLock()
+    _repo_layout_ready = False
+    # 仓库变更的代数（用于用户可见仓库的缓存键）
+    _repos_generation = 0
+    # 数据变更回调：参数为失效作用域（仓库或白名单变更时为 'repos'），由应用注册（如使 ETag 失效）
+    _invalidation_listeners: List[Callable[[str], None]] = []
+    
+    # KV 中的登录计数：总次数、已登录用户集合、按日 / 周 / 月汇总的次数（哈希），每个用户一个哈希 login_user:<用户名>
+    LOGIN_TOTAL_KEY = 'login_total'
+    LOGIN_USERS_KEY = 'login_users'
+    LOGIN_ROLLUP_KEYS = {'daily': 'login_daily', 'weekly': 'login_weekly', 'monthly': 'login_monthly'}
+    LOGIN_MIGRATED_KEY = 'login_stats_migrated'
+    # 在一个脚本中检查并设置迁移标记、并入旧的统计，多个实例同时迁移或中途失败都不会重复计数
+    # KEYS[1] 为迁移标记，之后每个键对应一条命令；ARGV 中每条命令依次为命令名、参数个数、参数
+    LOGIN_MIGRATE_SCRIPT = (
+        "if redis.call('SET', KEYS[1], '1', 'NX') == false then return 0 end "
+        "local pos = 1 "
+        "for i = 2, #KEYS do "
+        "local argc = tonumber(ARGV[pos + 1]) "
+        "redis.call(ARGV[pos], KEYS[i], unpack(ARGV, pos + 2, pos + 1 + argc)) "
+        "pos = pos + 2 + argc "
+        "end "
+        "return 1"
+    )
+    _login_counters_ready = False
+    # 按日 / 按周汇总的保留期限，更早的只保留按月汇总（按月汇总在记录登录时已同步累加）
+    LOGIN_DAILY_RETENTION_DAYS = int(os.getenv('LOGIN_DAILY_RETENTION_DAYS', 90))
+    LOGIN_WEEKLY_RETENTION_WEEKS = int(os.getenv('LOGIN_WEEKLY_RETENTION_WEEKS', 52))
+    # 本进程最近一次清理过期汇总的日期（每天最多清理一次）
+    _login_compacted_on: Optional[str] = None
+    
+    # KV 中的白名单：用户（有序集合，分数均为 0，按小写用户名字典序排列）、
+    # 小写用户名 -> 原用户名（哈希）、管理员（集合）
+    WHITELIST_USERS_KEY = 'whitelist_users'
+    WHITELIST_NAMES_KEY = 'whitelist_names'
+    WHITELIST_ADMINS_KEY = 'whitelist_admins'
+    WHITELIST_MIGRATED_KEY = 'whitelist_migrated'
+    # 批量添加 / 移除时每次请求处理的用户数
+    WHITELIST_BATCH_SIZE = 500
+    # 整体替换白名单时临时键的有效期（秒），替换中断时自动清理
+    WHITELIST_TEMP_TTL = 300
+    # 用临时键原子替换白名单的三个键并设置迁移标记
+    # KEYS: 用户、名称、管理员三个正式键，对应的三个临时键，迁移标记；ARGV[1] 为 '1' 时只在尚未迁移时替换
+    WHITELIST_REPLACE_SCRIPT = (
+        "if ARGV[1] == '1' and redis.call('EXISTS', KEYS[7]) == 1 then "
+        "redis.call('DEL', KEYS[4], KEYS[5], KEYS[6]) return 0 end "
+        "for i = 1, 3 do "
+        "if redis.call('EXISTS', KEYS[i + 3]) == 1 then "
+        "redis.call('RENAME', KEYS[i + 3], KEYS[i]) redis.call('PERSIST', KEYS[i]) "
+        "else redis.call('DEL', KEYS[i]) end "
+        "end "
+        "redis.call('SET', KEYS[7], '1') "
+        "return 1"
+    )
+    _whitelist_ready = False
+    
+    # 内存存储在进程内共享（所有实例共用，避免每次新建实例时丢失数据）
+    _memory_storage: Dict[str, Any] = {}
+    _memory_versions: Dict[str, int] = {}
+    # 内存存储中带有效期的键 -> 过期时间
+    _memory_expiry: Dict[str, float] = {}
+    _memory_lock = threading.RLock()
+    
+    # 读取-修改-写入冲突时的最大重试次数；文件存储条件写入的进程内锁
+    CAS_MAX_RETRIES = int(os.getenv('STORAGE_CAS_RETRIES', 5))
+    _file_lock = threading.RLock()
+    # 条件写入的统计：尝试次数、冲突次数、重试耗尽次数（进程内共享）
+    _cas_stats: Dict[str, int] = {'attempts': 0, 'conflicts': 0, 'exhausted': 0}
+    _cas_stats_lock = threading.Lock()
+    
+    # KV 中每个键的版本号保存在 <key>:version，读取值和版本号、比较并写入都在一个脚本中原子执行
+    KV_GET_VERSIONED_SCRIPT = (
+        "return {redis.call('GET', KEYS[1]) or false, redis.call('GET', KEYS[2]) or '0'}"
+    )
+    # ARGV[3] 为有效期（秒，可选），值和版本号一起过期
+    KV_COMPARE_AND_SET_SCRIPT = (
+        "if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then return 0 end "
+        "if ARGV[3] then redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3]) "
+        "else redis.call('SET', KEYS[1], ARGV[2]) end "
+        "local version = redis.call('INCR', KEYS[2]) "
+        "if ARGV[3] then redis.call('EXPIRE', KEYS[2], ARGV[3]) end "
+        "return version"
+    )
+    
+    # 数据缓存（get_cache / set_cache）：默认有效期（秒）、内存缓存的字节限额、文件存储下的 SQLite 路径
+    CACHE_DEFAULT_TTL = Config.CACHE_TIMEOUT
+    CACHE_MEMORY_MAX_BYTES = int(os.getenv('CACHE_MEMORY_MAX_BYTES', 32 * 1024 * 1024))
+    CACHE_SQLITE_PATH = os.path.join('data', 'cache.sqlite3')
+    
+    # 后台导出任务及其分页数据的有效期（秒），过期的任务数据自动删除（KV）或由 sweep_export_jobs 清理
+    EXPORT_JOB_TTL = int(os.getenv('EXPORT_JOB_TTL', 24 * 3600))
+    # 本进程两次清理过期导出任务之间的最短间隔（秒）
+    EXPORT_JOB_SWEEP_INTERVAL = 3600
+    _export_jobs_swept_at = 0.0
+    
+    # Blob 读取的总时限和单个请求的超时（秒）
+    BLOB_READ_DEADLINE = float(os.getenv('BLOB_READ_DEADLINE', 5))
+    BLOB_REQUEST_TIMEOUT = float(os.getenv('BLOB_REQUEST_TIMEOUT', 3))
+    
+    # 缓存的 Blob URL 的有效期（秒）：其他实例上传新版本后 URL 会变化，过期后重新列出查找
+    BLOB_URL_TTL = float(os.getenv('BLOB_URL_TTL', 30))
+    
+    # Blob 的 pathname -> (URL, 过期时间) 映射和每个 key 最近一次成功读写的数据（进程内共享）
+    _blob_urls: Dict[str, Tuple[str, float]] = {}
+    _blob_last_good: Dict[str, Any] = {}
+    _blob_session = requests.Session()
     
     def __init__(self):
         # 获取存储类型
@@ -19,6 +189,8 @@ class StorageManager:
         self.kv_url = os.getenv('KV_REST_API_URL')
         self.kv_token = os.getenv('KV_REST_API_TOKEN')
         self.blob_token = os.getenv('BLOB_READ_WRITE_TOKEN')
+        # KV 客户端（复用连接池）
+        self.kv = KVClient(self.kv_url, self.kv_token) if self.kv_url and self.kv_token else None
         
         # 检测 Vercel 环境
         self.is_vercel = os.getenv('VERCEL') == '1' or os.getenv('VERCEL_ENV') is not None
@@ -27,181 +199,529 @@ class StorageManager:
         if self.is_vercel:
             if self.kv_url and self.kv_token:
                 self.storage_type = 'vercel_kv'
-                print("🔧 检测到 Vercel 环境，自动切换到 Vercel KV 存储")
             elif self.blob_token:
                 self.storage_type = 'vercel_blob'
-                print("🔧 检测到 Vercel 环境，自动切换到 Vercel Blob 存储")
             else:
                 self.storage_type = 'memory'
+        
+        # 读取缓存: key -> (过期时间, 数据)，以及每个 key 的写入版本号
+        self._read_cache: Dict[str, Any] = {}
+        self._cache_versions: Dict[str, int] = {}
+        self._cache_lock = threading.Lock()
+        # 每种存储类型的数据缓存（首次使用时创建）
+        self._cache_tiers: Dict[str, CacheTier] = {}
+        
+        # 降级存储的默认数据
+        self._fallback_data = {
+            'repositories': [],
+            'user_preferences': {},
+            'cache': {}
+        }
+    
+    def log_config(self) -> None:
+        """打印存储配置（共享实例创建时打印一次）"""
+        if self.is_vercel:
+            if self.storage_type == 'vercel_kv':
+                print("🔧 检测到 Vercel 环境，自动切换到 Vercel KV 存储")
+            elif self.storage_type == 'vercel_blob':
+                print("🔧 检测到 Vercel 环境，自动切换到 Vercel Blob 存储")
+            else:
                 print("⚠️ 检测到 Vercel 环境，但未配置 KV 或 Blob，使用内存存储（数据不持久化）")
         
-        # 调试信息
         print(f"StorageManager 初始化:")
         print(f"  - 运行环境: {'Vercel' if self.is_vercel else '本地/其他'}")
         print(f"  - 存储类型: {self.storage_type}")
         print(f"  - KV URL: {self.kv_url or '未设置'}")
         print(f"  - KV Token: {'已设置' if self.kv_token else '未设置'}")
         print(f"  - Blob Token: {'已设置' if self.blob_token else '未设置'}")
+        print(f"  - 读取缓存: {f'{self.READ_CACHE_TTL:g} 秒' if self.READ_CACHE_TTL > 0 else '关闭'}")
+    
+    def _cached_read(self, key: str, loader: Callable[[], Any], force_refresh: bool = False) -> Any:
+        """带进程内缓存的读取，返回数据的副本（调用方可以放心修改）
         
-        # 内存存储（Vercel 环境下的临时方案）
-        self._memory_storage = {}
+        读取期间如果本进程写入了该 key（版本号变化），读到的旧数据不会写入缓存
+        """
+        if self.READ_CACHE_TTL <= 0:
+            return loader()
         
-        # 降级存储的默认数据
-        self._fallback_data = {
-            'repositories': [],
-            'user_preferences': {},
-            'cache': {}
-        }
+        with self._cache_lock:
+            entry = self._read_cache.get(key)
+            version = self._cache_versions.get(key, 0)
+        if entry and not force_refresh and entry[0] > time.time():
+            return copy.deepcopy(entry[1])
+        
+        data = loader()
+        with self._cache_lock:
+            if self._cache_versions.get(key, 0) == version:
+                self._read_cache[key] = (time.time() + self.READ_CACHE_TTL, copy.deepcopy(data))
+        return data
     
-    def get_repos(self, force_refresh: bool = False) -> Dict[str, Any]:
-        """获取仓库列表"""
-        try:
-            print(f"📥 获取仓库数据: 存储类型={self.storage_type}, 强制刷新={force_refresh}")
+    def _cached_write(self, key: str, data: Any, saver: Callable[[], bool]) -> bool:
+        """写入存储，成功后用写入的数据更新缓存，失败时丢弃缓存"""
+        with self._cache_lock:
+            self._cache_versions[key] = self._cache_versions.get(key, 0) + 1
+            self._read_cache.pop(key, None)
+        
+        success = saver()
+        if success and self.READ_CACHE_TTL > 0:
+            with self._cache_lock:
+                self._read_cache[key] = (time.time() + self.READ_CACHE_TTL, copy.deepcopy(data))
+        return success
+    
+    def add_invalidation_listener(self, callback: Callable[[str], None]) -> None:
+        """注册数据变更回调（同一个回调只注册一次）"""
+        if callback not in self._invalidation_listeners:
+            self._invalidation_listeners.append(callback)
+    
+    def _notify_invalidation(self, scope: str) -> None:
+        """通知数据变更回调，回调出错不影响写入"""
+        for callback in list(self._invalidation_listeners):
+            try:
+                callback(scope)
+            except Exception as e:
+                print(f"⚠️ 数据变更回调失败: {e}")
+    
+    def invalidate_read_cache(self, key: Optional[str] = None) -> None:
+        """丢弃进程内的读取缓存（不指定 key 时全部丢弃），进行中的读取结果也不会写入缓存"""
+        with self._cache_lock:
+            for cached_key in ([key] if key else list(self._read_cache)):
+                self._cache_versions[cached_key] = self._cache_versions.get(cached_key, 0) + 1
+                self._read_cache.pop(cached_key, None)
+    
+    def _update_data(self, key: str, mutate: Callable[[Any], Any], default: Any = None,
+                     ttl: Optional[int] = None) -> Any:
+        """带版本检查的读取-修改-写入
+        
+        读取最新的值和版本号，mutate 返回新值（返回 None 表示无需写入），
+        只有在这期间没有其他写入时才写入；冲突时重新读取并重试，最多 CAS_MAX_RETRIES 次。
+        ttl 为有效期（秒），与 _save_data 相同
+        
+        Returns:
+            写入（或无需写入时读取到）的值
+        
+        Raises:
+            StorageConflictError: 重试耗尽
+        """
+        for attempt in range(self.CAS_MAX_RETRIES + 1):
+            current, version = self._get_versioned(key)
+            if current is None:
+                current = copy.deepcopy(default)
+            data = mutate(copy.deepcopy(current))
+            if data is None:
+                return current
             
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
-                print("📥 使用 Vercel KV 存储读取数据")
-                result = self._get_from_kv('repos')
-                return result if result is not None else self._fallback_data
-            elif self.storage_type == 'vercel_blob' and self.blob_token:
-                print("📥 使用 Vercel Blob 存储读取数据")
-                if force_refresh:
-                    print("🔄 强制刷新：清除内存缓存并重新从 Blob 读取")
-                    # 清除可能的内存缓存
-                    if hasattr(self, '_memory_storage'):
-                        self._memory_storage.pop('repos', None)
-                return self._get_from_blob('repos')
-            elif self.storage_type == 'memory':
-                print("📥 使用内存存储读取数据")
-                return self._get_from_memory('repos')
-            elif self.is_vercel:
-                # Vercel 环境下不能使用文件存储
-                print(f"⚠️ Vercel 环境不支持文件存储，使用内存存储")
-                return self._get_from_memory('repos')
+            self._count_cas('attempts')
+            if key in self.READ_CACHE_KEYS:
+                written = self._cached_write(key, data, lambda: self._compare_and_set(key, data, version, ttl))
             else:
-                print("📥 使用文件存储读取数据")
-                return self._get_from_file('repos')
+                written = self._compare_and_set(key, data, version, ttl)
+            if written:
+                return data
+            
+            self._count_cas('conflicts')
+            print(f"⚠️ 写入 {key} 时发生冲突，重新读取后重试 ({attempt + 1}/{self.CAS_MAX_RETRIES})")
+            # 随机退避，避免多个实例同时重试再次冲突
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        
+        self._count_cas('exhausted')
+        raise StorageConflictError(f'写入 {key} 冲突，已重试 {self.CAS_MAX_RETRIES} 次')
+    
+    def _count_cas(self, name: str) -> None:
+        with self._cas_stats_lock:
+            self._cas_stats[name] += 1
+    
+    def get_contention_stats(self) -> Dict[str, int]:
+        """条件写入的统计（本进程）：attempts 尝试次数，conflicts 冲突次数，exhausted 重试耗尽次数"""
+        with self._cas_stats_lock:
+            return dict(self._cas_stats)
+    
+    def get_repos(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """获取仓库列表（force_refresh 时跳过进程内缓存）"""
+        try:
+            return self._cached_read('repos', lambda: self._load_repos(force_refresh), force_refresh)
         except Exception as e:
+            # 读取失败时返回默认数据，但不写入缓存
             print(f"❌ 获取仓库数据失败: {e}")
             import traceback
             traceback.print_exc()
             return self._fallback_data
     
+    def _load_repos(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """从存储后端读取仓库列表"""
+        print(f"📥 获取仓库数据: 存储类型={self.storage_type}, 强制刷新={force_refresh}")
+        
+        if self.storage_type == 'vercel_kv' and self.kv:
+            print("📥 使用 Vercel KV 存储读取数据")
+            return self._load_repos_from_kv()
+        elif self.storage_type == 'vercel_blob' and self.blob_token:
+            print("📥 使用 Vercel Blob 存储读取数据")
+            return self._get_from_blob('repos')
+        else:
+            print(f"📥 使用{'内存' if self.storage_type == 'memory' else '文件'}存储读取数据")
+            with self._repos_lock:
+                index = self._load_repo_index()
+                docs = [self._get_data(self._repo_key(name)) for name in index['names']]
+            return self._build_repos_data([doc for doc in docs if doc], index.get('last_updated'))
+    
     def get_user_repos(self, username: str, is_admin: bool = False) -> Dict[str, Any]:
-        """根据用户权限获取仓库列表"""
+        """根据用户权限获取仓库列表
+        
+        管理员返回所有仓库；普通用户通过可见性索引（用户添加的仓库 + 默认仓库）查找，
+        只读取可见的仓库，不扫描整个仓库列表
+        """
         try:
-            print(f"获取用户仓库: username={username}, is_admin={is_admin}")
-            
-            # 非管理员用户强制刷新，解决 Blob 最终一致性问题
-            force_refresh = not is_admin
-            all_repos = self.get_repos(force_refresh=force_refresh)
-            print(f"所有仓库数量: {len(all_repos.get('repositories', []))}")
-            
-            # 如果是管理员，返回所有仓库
-            if is_admin:
-                print("用户是管理员，返回所有仓库")
-                return all_repos
-            
-            # 如果是普通用户，处理仓库权限
-            user_repos = {
-                'repositories': [],
-                'total_count': 0,
-                'last_updated': all_repos.get('last_updated', '')
-            }
-            
-            repositories = all_repos.get('repositories', [])
-            print(f"所有仓库列表: {[repo.get('full_name') for repo in repositories]}")
-            
-            # 混合权限控制：优先使用added_by字段，回退到owner字段
-            print("使用混合权限控制策略")
-            
-            # 获取当前用户的白名单状态
-            whitelist = self.get_user_whitelist()
-            is_global_admin = username in whitelist.get('admin_users', [])
-            
-            # 检查是否是默认管理员（环境变量）
+            # 默认管理员（环境变量）拥有所有权限
             default_admin = os.getenv('DEFAULT_ADMIN_USER', '')
-            if default_admin and default_admin.lower() == username.lower():
-                print(f"👑 用户 {username} 是默认管理员，拥有所有权限")
-                is_global_admin = True
-            
-            # 如果是全局管理员，直接返回所有仓库
-            if is_global_admin:
-                print(f"👑 管理员 {username} 查看所有仓库")
-                return all_repos
-
-            for repo in repositories:
-                repo_added_by = repo.get('added_by', '')
-                repo_owner = repo.get('owner', '')
-                
-                # 调试信息
-                # print(f"仓库 {repo.get('full_name')}: added_by='{repo_added_by}', owner='{repo_owner}', 当前用户='{username}'")
-                
-                # 统一转换为小写进行比较
-                username_lower = username.lower()
-                added_by_lower = repo_added_by.lower() if repo_added_by else ''
-                owner_lower = repo_owner.lower() if repo_owner else ''
-                
-                # 策略1：如果仓库有added_by字段，按added_by过滤 (忽略大小写)
-                if added_by_lower and added_by_lower == username_lower:
-                    user_repos['repositories'].append(repo)
-                    continue
-                
-                # 策略2：如果仓库没有added_by字段，按owner过滤 (忽略大小写)
-                if not added_by_lower and owner_lower == username_lower:
-                    user_repos['repositories'].append(repo)
-                    continue
-                
-                # 策略3：如果是默认演示仓库，所有人可见
-                if repo.get('is_default') is True:
-                    user_repos['repositories'].append(repo)
-                    continue
-                
-                # print(f"❌ 用户 {username} 无权访问仓库: {repo.get('full_name')}")
-            
-            user_repos['total_count'] = len(user_repos['repositories'])
-            print(f"用户 {username} 可见仓库数量: {user_repos['total_count']}")
-            print(f"可见仓库列表: {[repo.get('full_name') for repo in user_repos['repositories']]}")
-            
-            return user_repos
+            if is_admin or (default_admin and default_admin.lower() == username.lower()):
+                return self.get_repos()
             
+            user = username.lower()
+            return self._cached_read(f'repos:{self._repos_generation}:{user}',
+                                     lambda: self._load_user_repos(user))
         except Exception as e:
             print(f"获取用户仓库失败: {e}")
             import traceback
             traceback.print_exc()
             return self._fallback_data
     
+    def _load_user_repos(self, user: str) -> Dict[str, Any]:
+        """从存储后端读取用户可见的仓库（user 为小写用户名）"""
+        if self.storage_type == 'vercel_kv' and self.kv:
+            self._ensure_repo_layout_in_kv()
+            owned, defaults, meta = self.kv.pipeline([
+                ['SMEMBERS', self._repo_user_key(user)],
+                ['SMEMBERS', self.REPO_DEFAULTS_KEY],
+                ['GET', self.REPO_META_KEY]
+            ])
+            names = list(dict.fromkeys((owned or []) + (defaults or [])))
+            last_updated = (self._decode_kv_value(meta) or {}).get('last_updated')
+            if not names:
+                return self._build_repos_data([], last_updated)
+            
+            # 仓库和它们在索引中的位置一起读取，按添加顺序排列
+            docs, scores = self.kv.pipeline([
+                ['MGET'] + [self._repo_key(name) for name in names],
+                ['ZMSCORE', self.REPO_INDEX_KEY] + names
+            ])
+            ordered = sorted((float(score), index) for index, score in enumerate(scores) if score is not None)
+            repositories = [repo for repo in (self._decode_kv_value(docs[index]) for _, index in ordered) if repo]
+            return self._build_repos_data(repositories, last_updated)
+        
+        if self.storage_type == 'vercel_blob' and self.blob_token:
+            # Blob 没有索引，筛选整个仓库列表
+            all_repos = self.get_repos()
+            repositories = [repo for repo in all_repos.get('repositories', [])
+                            if self._repo_user(repo) == user or repo.get('is_default') is True]
+            return self._build_repos_data(repositories, all_repos.get('last_updated'))
+        
+        with self._repos_lock:
+            index = self._load_repo_index()
+            visible = set(index['users'].get(user, [])) | set(index['defaults'])
+            names = [name for name in index['names'] if name in visible]
+            docs = [self._get_data(self._repo_key(name)) for name in names]
+        return self._build_repos_data([doc for doc in docs if doc], index.get('last_updated'))
+    
     def save_repos(self, data: Dict[str, Any]) -> bool:
-        """保存仓库列表"""
+        """整体替换仓库列表（添加或删除单个仓库请使用 add_repo / remove_repo）"""
         try:
             print(f"💾 开始保存仓库数据 (存储类型: {self.storage_type})")
             
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
+            # 记录更新时间并使 /api/my_repos 的 ETag 失效
+            from datetime import datetime
+            data['last_updated'] = datetime.now().isoformat()
+            self._invalidate_repos()
+            
+            return self._cached_write('repos', data, lambda: self._store_repos(data))
+        except Exception as e:
+            print(f"❌ 保存仓库数据失败: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+    
+    def _store_repos(self, data: Dict[str, Any]) -> bool:
+        """将仓库列表写入存储后端"""
+        try:
+            repositories = data.get('repositories', [])
+            if self.storage_type == 'vercel_kv' and self.kv:
                 print(f"📤 使用 Vercel KV 保存数据")
-                return self._save_to_kv('repos', data)
+                return self._replace_repos_in_kv(repositories, data['last_updated'])
             elif self.storage_type == 'vercel_blob' and self.blob_token:
                 print(f"📤 使用 Vercel Blob 保存数据")
                 return self._save_to_blob('repos', data)
-            elif self.storage_type == 'memory':
-                print(f"📤 使用内存保存数据 (⚠️ 数据不持久化)")
-                return self._save_to_memory('repos', data)
-            elif self.is_vercel:
-                # Vercel 环境下不能使用文件存储
-                print(f"❌ Vercel 环境不支持文件存储，请配置 KV_REST_API_URL 和 KV_REST_API_TOKEN")
-                print(f"⚠️ 降级到内存存储，数据将在重启后丢失")
-                return self._save_to_memory('repos', data)
             else:
-                print(f"📤 使用文件存储保存数据")
-                return self._save_to_file('repos', data)
+                if self.storage_type == 'memory':
+                    print(f"📤 使用内存保存数据 (⚠️ 数据不持久化)")
+                else:
+                    print(f"📤 使用文件存储保存数据")
+                with self._repos_lock:
+                    return self._replace_repo_keys(repositories, data['last_updated'], self._load_repo_index())
         except Exception as e:
             print(f"❌ 保存仓库数据失败: {e}")
             import traceback
             traceback.print_exc()
             return False
     
+    def add_repo(self, repo: Dict[str, Any]) -> Dict[str, Any]:
+        """添加一个仓库（只写入该仓库的键和索引，不重写整个仓库列表）
+        
+        Returns:
+            {'success': True} 或 {'success': False, 'error': ...}（仓库已存在时 exists 为 True）
+        """
+        try:
+            from datetime import datetime
+            now = datetime.now().isoformat()
+            name = repo['full_name'].lower()
+            
+            if self.storage_type == 'vercel_kv' and self.kv:
+                self._ensure_repo_layout_in_kv()
+                # 存在性检查和所有写入在一个脚本中原子执行，并发添加同一仓库时只有一个成功，也不会留下没有索引的仓库键
+                added = self.kv.eval(self.REPO_ADD_SCRIPT, [
+                    self._repo_key(name), self.REPO_INDEX_KEY, self._repo_user_key(self._repo_user(repo)),
+                    self.REPO_META_KEY, self.REPO_DEFAULTS_KEY
+                ], [json.dumps(repo, ensure_ascii=False), time.time(), name, self._repo_meta(now),
+                    '1' if repo.get('is_default') is True else '0'])
+                if not added:
+                    return {'success': False, 'exists': True, 'error': '仓库已存在'}
+                return {'success': True}
+            
+            if self.storage_type == 'vercel_blob' and self.blob_token:
+                # Blob 没有原子操作，仍然读写整个仓库列表
+                data = self.get_repos(force_refresh=True)
+                if any(item.get('full_name', '').lower() == name for item in data.get('repositories', [])):
+                    return {'success': False, 'exists': True, 'error': '仓库已存在'}
+                data.setdefault('repositories', []).append(repo)
+                return {'success': True} if self.save_repos(data) else {'success': False, 'error': '保存仓库信息失败'}
+            
+            def add_name(index):
+                # 其他进程可能同时修改索引（文件存储），按版本检查写入
+                if name in index['names']:
+                    return None
+                index['names'].append(name)
+                index['users'].setdefault(self._repo_user(repo), []).append(name)
+                if repo.get('is_default') is True:
+                    index['defaults'].append(name)
+                index['last_updated'] = now
+                added.append(name)
+                return index
+            
+            added = []
+            with self._repos_lock:
+                self._load_repo_index()
+                self._update_data(self.REPO_INDEX_KEY, add_name)
+                if not added:
+                    return {'success': False, 'exists': True, 'error': '仓库已存在'}
+                # 索引中已有但尚未写入的仓库在读取时会被跳过
+                if not self._save_data(self._repo_key(name), repo):
+                    return {'success': False, 'error': '保存仓库信息失败'}
+            return {'success': True}
+        except Exception as e:
+            print(f"❌ 添加仓库失败: {e}")
+            return {'success': False, 'error': '保存仓库信息失败'}
+        finally:
+            self._invalidate_repos()
+    
+    def remove_repo(self, repo_full_name: str) -> Dict[str, Any]:
+        """删除一个仓库（只删除该仓库的键并更新索引）
+        
+        Returns:
+            {'success': True} 或 {'success': False, 'error': ...}（仓库不存在时 not_found 为 True）
+        """
+        try:
+            from datetime import datetime
+            now = datetime.now().isoformat()
+            name = repo_full_name.lower()
+            
+            if self.storage_type == 'vercel_kv' and self.kv:
+                self._ensure_repo_layout_in_kv()
+                repo = self._get_from_kv(self._repo_key(name))
+                if not repo:
+                    return {'success': False, 'not_found': True, 'error': '仓库不存在'}
+                self.kv.pipeline([
+                    ['DEL', self._repo_key(name)],
+                    ['ZREM', self.REPO_INDEX_KEY, name],
+                    ['SREM', self._repo_user_key(self._repo_user(repo)), name],
+                    ['SREM', self.REPO_DEFAULTS_KEY, name],
+                    ['SET', self.REPO_META_KEY, self._repo_meta(now)]
+                ])
+                return {'success': True}
+            
+            if self.storage_type == 'vercel_blob' and self.blob_token:
+                data = self.get_repos(force_refresh=True)
+                repositories = data.get('repositories', [])
+                data['repositories'] = [item for item in repositories if item.get('full_name', '').lower() != name]
+                if len(data['repositories']) == len(repositories):
+                    return {'success': False, 'not_found': True, 'error': '仓库不存在'}
+                return {'success': True} if self.save_repos(data) else {'success': False, 'error': '保存更改失败'}
+            
+            def remove_name(index):
+                if name not in index['names']:
+                    return None
+                index['names'].remove(name)
+                for names in list(index['users'].values()) + [index['defaults']]:
+                    if name in names:
+                        names.remove(name)
+                index['last_updated'] = now
+                removed.append(name)
+                return index
+            
+            removed = []
+            with self._repos_lock:
+                self._load_repo_index()
+                self._update_data(self.REPO_INDEX_KEY, remove_name)
+                if not removed:
+                    return {'success': False, 'not_found': True, 'error': '仓库不存在'}
+                self._delete_data(self._repo_key(name))
+            return {'success': True}
+        except Exception as e:
+            print(f"❌ 删除仓库失败: {e}")
+            return {'success': False, 'error': '保存更改失败'}
+        finally:
+            self._invalidate_repos()
+    
+    def _invalidate_repos(self) -> None:
+        """仓库变更时丢弃读取缓存（包括各用户的可见仓库），并通知 'repos' 作用域失效"""
+        self._notify_invalidation('repos')
+        self.invalidate_read_cache('repos')
+        with self._cache_lock:
+            # 用户可见仓库的缓存键带有代数，进行中的读取会写入旧代数的键，不会再被读到
+            StorageManager._repos_generation += 1
+            for key in [key for key in self._read_cache if key.startswith('repos:')]:
+                del self._read_cache[key]
+    
+    def _repo_key(self, repo_full_name: str) -> str:
+        """单个仓库的存储键（同时用作文件名，不能包含 /）"""
+        return f"repo_{repo_full_name.lower().replace('/', '__')}"
+    
+    def _repo_user_key(self, username: str) -> str:
+        """用户添加的仓库名集合的存储键（KV）"""
+        return f'repos_user_{username}'
+    
+    def _repo_meta(self, last_updated: str) -> str:
+        """KV 中仓库列表的元数据（更新时间和索引结构版本）"""
+        return json.dumps({'last_updated': last_updated, 'index_version': self.REPO_INDEX_VERSION})
+    
+    def _repo_user(self, repo: Dict[str, Any]) -> str:
+        """仓库归属的用户（优先使用 added_by，回退到 owner），小写"""
+        return (repo.get('added_by') or repo.get('owner') or '').lower()
+    
+    def _build_repos_data(self, repositories: List[Dict[str, Any]], last_updated: Optional[str]) -> Dict[str, Any]:
+        """组装与原先整体存储时相同结构的仓库列表"""
+        return {
+            'repositories': repositories,
+            'total_count': len(repositories),
+            'last_updated': last_updated or ''
+        }
+    
+    def _load_repos_from_kv(self) -> Dict[str, Any]:
+        """从 KV 读取仓库索引和所有仓库（两次往返）"""
+        from datetime import datetime
+        names, meta = self.kv.pipeline([['ZRANGE', self.REPO_INDEX_KEY, 0, -1], ['GET', self.REPO_META_KEY]])
+        names, meta = names or [], self._decode_kv_value(meta)
+        
+        docs = self.kv.mget([self._repo_key(name) for name in names]) if names else []
+        repositories = [repo for repo in map(self._decode_kv_value, docs) if repo]
+        
+        if meta is None or meta.get('index_version') != self.REPO_INDEX_VERSION:
+            if meta is None:
+                # 尚未迁移：读取旧的整体仓库列表并拆分为单独的键
+                legacy = self._get_from_kv('repos') or {}
+                repositories = legacy.get('repositories', [])
+                meta = {'last_updated': legacy.get('last_updated') or datetime.now().isoformat()}
+            # 重写索引（包括用户集合和默认仓库集合）；与其他实例的迁移冲突时下次读取再检查
+            if self._replace_repos_in_kv(repositories, meta.get('last_updated')):
+                StorageManager._repo_layout_ready = True
+        
+        return self._build_repos_data(repositories, meta.get('last_updated'))
+    
+    def _ensure_repo_layout_in_kv(self) -> None:
+        """确认 KV 中的仓库已拆分为单独的键（每个进程只检查一次）"""
+        if StorageManager._repo_layout_ready:
+            return
+        meta = self._decode_kv_value(self.kv.get(self.REPO_META_KEY))
+        if meta is None or meta.get('index_version') != self.REPO_INDEX_VERSION:
+            self._load_repos_from_kv()
+        StorageManager._repo_layout_ready = True
+    
+    def _replace_repos_in_kv(self, repositories: List[Dict[str, Any]], last_updated: str) -> bool:
+        """用给定的仓库列表整体替换 KV 中的仓库键、索引和用户集合
+        
+        读取现有的仓库后用一个脚本原子完成删除和写入；读取之后其他实例修改了仓库（元数据变化）时
+        重新读取并重试，最多 CAS_MAX_RETRIES 次
+        
+        Returns:
+            是否已替换
+        """
+        args = [self._repo_meta(last_updated)]
+        new_keys = []
+        for repo in repositories:
+            name = repo['full_name'].lower()
+            args += [name, json.dumps(repo, ensure_ascii=False), '1' if repo.get('is_default') is True else '0']
+            new_keys += [self._repo_key(name), self._repo_user_key(self._repo_user(repo))]
+        
+        for attempt in range(self.CAS_MAX_RETRIES + 1):
+            old_names, old_meta = self.kv.pipeline([['ZRANGE', self.REPO_INDEX_KEY, 0, -1],
+                                                    ['GET', self.REPO_META_KEY]])
+            old_names = old_names or []
+            old_docs = [repo for repo in map(self._decode_kv_value, self.kv.mget(
+                [self._repo_key(name) for name in old_names])) if repo] if old_names else []
+            old_keys = [self._repo_key(name) for name in old_names]
+            old_keys += [self._repo_user_key(user) for user in {self._repo_user(repo) for repo in old_docs}]
+            
+            self._count_cas('attempts')
+            if self.kv.eval(self.REPO_REPLACE_SCRIPT,
+                            [self.REPO_INDEX_KEY, self.REPO_DEFAULTS_KEY, self.REPO_META_KEY] + old_keys + new_keys,
+                            [old_meta or '', len(old_keys)] + args):
+                return True
+            
+            self._count_cas('conflicts')
+            print(f"⚠️ 替换仓库列表时发生冲突，重新读取后重试 ({attempt + 1}/{self.CAS_MAX_RETRIES})")
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        
+        self._count_cas('exhausted')
+        print(f"❌ 替换仓库列表冲突，已重试 {self.CAS_MAX_RETRIES} 次")
+        return False
+    
+    def _load_repo_index(self) -> Dict[str, Any]:
+        """读取内存 / 文件存储的仓库索引（调用方需持有 _repos_lock），没有索引时从旧的整体仓库列表迁移"""
+        index = self._get_data(self.REPO_INDEX_KEY)
+        if index and index.get('version') == self.REPO_INDEX_VERSION:
+            return index
+        
+        if index and 'names' in index:
+            # 旧版本的索引：按现有仓库重建
+            repositories = [doc for doc in (self._get_data(self._repo_key(name)) for name in index['names']) if doc]
+            self._replace_repo_keys(repositories, index.get('last_updated'), index)
+            return index
+        
+        from datetime import datetime
+        legacy = self._get_data('repos') or {}
+        index = {'names': [], 'last_updated': legacy.get('last_updated') or datetime.now().isoformat()}
+        self._replace_repo_keys(legacy.get('repositories', []), index['last_updated'], index)
+        return index
+    
+    def _replace_repo_keys(self, repositories: List[Dict[str, Any]], last_updated: str,
+                           index: Dict[str, Any]) -> bool:
+        """用给定的仓库列表整体替换内存 / 文件存储中的仓库键和索引（调用方需持有 _repos_lock）"""
+        for name in index['names']:
+            self._delete_data(self._repo_key(name))
+        
+        index.update({'names': [], 'users': {}, 'defaults': [], 'last_updated': last_updated,
+                      'version': self.REPO_INDEX_VERSION})
+        for repo in repositories:
+            name = repo['full_name'].lower()
+            if name in index['names']:
+                continue
+            self._save_data(self._repo_key(name), repo)
+            index['names'].append(name)
+            index['users'].setdefault(self._repo_user(repo), []).append(name)
+            if repo.get('is_default') is True:
+                index['defaults'].append(name)
+        return self._save_data(self.REPO_INDEX_KEY, index)
+    
     def get_user_preferences(self, user_id: str) -> Dict[str, Any]:
         """获取用户偏好设置"""
         try:
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
+            if self.storage_type == 'vercel_kv' and self.kv:
                 return self._get_from_kv(f'user_prefs_{user_id}')
             else:
                 return self._get_from_env(f'USER_PREFS_{user_id}')
@@ -212,7 +732,7 @@ class StorageManager:
     def save_user_preferences(self, user_id: str, data: Dict[str, Any]) -> bool:
         """保存用户偏好设置"""
         try:
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
+            if self.storage_type == 'vercel_kv' and self.kv:
                 return self._save_to_kv(f'user_prefs_{user_id}', data)
             else:
                 print("警告: 当前存储方案不支持写入操作")
@@ -221,197 +741,862 @@ class StorageManager:
             print(f"保存用户偏好失败: {e}")
             return False
     
-    def get_cache(self, key: str) -> Optional[Any]:
-        """获取缓存数据"""
+    def get_cache(self, key: str, namespace: str = 'default') -> Optional[Any]:
+        """获取缓存数据，不存在或已过期时返回 None"""
         try:
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
-                return self._get_from_kv(f'cache_{key}')
-            else:
-                return None
+            return self._get_cache_tier().get(namespace, key)
         except Exception as e:
             print(f"获取缓存失败: {e}")
             return None
     
-    def set_cache(self, key: str, data: Any, ttl: int = 3600) -> bool:
-        """设置缓存数据"""
+    def set_cache(self, key: str, data: Any, ttl: Optional[int] = None,
+                  namespace: str = 'default', tags: Optional[List[str]] = None) -> bool:
+        """设置缓存数据
+        
+        Args:
+            key: 缓存键（在命名空间内唯一）
+            data: 可以 JSON 序列化的数据
+            ttl: 有效期（秒），默认为 Config.CACHE_TIMEOUT
+            namespace: 命名空间，如 'github'
+            tags: 标签，之后可以用 invalidate_cache_tag 批量失效
+        """
         try:
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
-                cache_data = {
-                    'data': data,
-                    'expires_at': self._get_expiry_time(ttl)
-                }
-                return self._save_to_kv(f'cache_{key}', cache_data)
-            else:
-                return False
+            return self._get_cache_tier().set(namespace, key, data, self.CACHE_DEFAULT_TTL if ttl is None else ttl, tags or ())
         except Exception as e:
             print(f"设置缓存失败: {e}")
             return False
     
+    def delete_cache(self, key: str, namespace: str = 'default') -> bool:
+        """删除一个缓存项"""
+        try:
+            return self._get_cache_tier().delete(namespace, key)
+        except Exception as e:
+            print(f"删除缓存失败: {e}")
+            return False
+    
+    def invalidate_cache(self, namespace: str, prefix: str = '') -> int:
+        """删除命名空间中键以 prefix 开头的缓存（prefix 为空时清空整个命名空间），返回删除的数量"""
+        try:
+            return self._get_cache_tier().invalidate_prefix(namespace, prefix)
+        except Exception as e:
+            print(f"批量删除缓存失败: {e}")
+            return 0
+    
+    def invalidate_cache_tag(self, tag: str) -> int:
+        """删除带有该标签的缓存，返回删除的数量"""
+        try:
+            return self._get_cache_tier().invalidate_tag(tag)
+        except Exception as e:
+            print(f"按标签删除缓存失败: {e}")
+            return 0
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """数据缓存的统计（本进程）：命中、未命中、写入、淘汰、过期、失效次数和命中率"""
+        try:
+            return self._get_cache_tier().stats()
+        except Exception as e:
+            print(f"获取缓存统计失败: {e}")
+            return {}
+    
+    def _get_cache_tier(self) -> CacheTier:
+        """按存储类型选择数据缓存：KV 用原生过期，文件存储用 SQLite，内存和 Blob 存储用进程内 LRU"""
+        storage_type = self.storage_type if self.storage_type != 'vercel_kv' or self.kv else 'memory'
+        with self._cache_lock:
+            tier = self._cache_tiers.get(storage_type)
+            if tier is None:
+                if storage_type == 'vercel_kv':
+                    tier = KVCache(self.kv)
+                elif storage_type == 'file':
+                    tier = SQLiteCache(self.CACHE_SQLITE_PATH)
+                else:
+                    tier = MemoryCache(self.CACHE_MEMORY_MAX_BYTES)
+                self._cache_tiers[storage_type] = tier
+        return tier
+    
+    def get_export_checkpoint(self, username: str, repo_full_name: str) -> Optional[Dict[str, Any]]:
+        """获取用户对某个仓库的导出检查点（上次导出时间和最大 updated_at）"""
+        try:
+            return self._get_data(self._get_export_checkpoint_key(username, repo_full_name)) or None
+        except Exception as e:
+            print(f"获取导出检查点失败: {e}")
+            return None
+    
+    def save_export_checkpoint(self, username: str, repo_full_name: str, data: Dict[str, Any]) -> bool:
+        """保存用户对某个仓库的导出检查点"""
+        try:
+            return self._save_data(self._get_export_checkpoint_key(username, repo_full_name), data)
+        except Exception as e:
+            print(f"保存导出检查点失败: {e}")
+            return False
+    
+    def _get_export_checkpoint_key(self, username: str, repo_full_name: str) -> str:
+        """导出检查点的存储键（同时用作文件名，不能包含 /）"""
+        return f"export_checkpoint_{username.lower()}_{repo_full_name.lower().replace('/', '__')}"
+    
+    def get_export_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """获取缓存的导出结果"""
+        try:
+            return self._get_data(f'export_cache_{cache_key}') or None
+        except Exception as e:
+            print(f"获取导出缓存失败: {e}")
+            return None
+    
+    def save_export_cache(self, cache_key: str, data: Dict[str, Any]) -> bool:
+        """保存导出结果缓存"""
+        try:
+            return self._save_data(f'export_cache_{cache_key}', data)
+        except Exception as e:
+            print(f"保存导出缓存失败: {e}")
+            return False
+    
+    def get_export_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取后台导出任务的状态"""
+        try:
+            return self._get_data(f'export_job_{job_id}') or None
+        except Exception as e:
+            print(f"获取导出任务失败: {e}")
+            return None
+    
+    def save_export_job(self, job_id: str, data: Dict[str, Any]) -> bool:
+        """保存后台导出任务的状态"""
+        try:
+            return self._save_data(f'export_job_{job_id}', data, ttl=self.EXPORT_JOB_TTL)
+        except Exception as e:
+            print(f"保存导出任务失败: {e}")
+            return False
+    
+    def supports_export_jobs(self) -> bool:
+        """后台导出任务依赖过期清理和条件写入，只支持 KV、内存和文件存储（Vercel Blob 不支持）"""
+        return self.storage_type != 'vercel_blob'
+    
+    def update_export_job(self, job_id: str,
+                          mutate: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """带版本检查地修改导出任务的状态
+        
+        mutate 接收最新的任务状态，返回新状态（返回 None 表示无需写入）；
+        与其他实例的写入冲突时重新读取后重试
+        
+        Returns:
+            写入（或无需写入时读取到）的任务状态，任务不存在或写入失败时返回 None
+        """
+        try:
+            return self._update_data(f'export_job_{job_id}', lambda job: mutate(job) if job else None,
+                                     ttl=self.EXPORT_JOB_TTL)
+        except Exception as e:
+            print(f"更新导出任务失败: {e}")
+            return None
+    
+    def get_export_job_chunk(self, job_id: str, name: str) -> Optional[Any]:
+        """获取导出任务已获取的一页数据"""
+        try:
+            return self._get_data(f'export_job_{job_id}_{name}') or None
+        except Exception as e:
+            print(f"获取导出任务数据失败: {e}")
+            return None
+    
+    def save_export_job_chunk(self, job_id: str, name: str, data: Any) -> bool:
+        """保存导出任务获取的一页数据"""
+        try:
+            return self._save_data(f'export_job_{job_id}_{name}', data, ttl=self.EXPORT_JOB_TTL)
+        except Exception as e:
+            print(f"保存导出任务数据失败: {e}")
+            return False
+    
+    def delete_export_job(self, job_id: str, chunk_names: List[str]) -> bool:
+        """删除导出任务及其分页数据"""
+        try:
+            for name in chunk_names:
+                self._delete_data(f'export_job_{job_id}_{name}')
+            return self._delete_data(f'export_job_{job_id}')
+        except Exception as e:
+            print(f"删除导出任务失败: {e}")
+            return False
+    
+    def sweep_export_jobs(self, force: bool = False) -> int:
+        """清理超过 EXPORT_JOB_TTL 未更新的导出任务数据（KV 中的键自动过期，无需清理）
+        
+        本进程每 EXPORT_JOB_SWEEP_INTERVAL 秒最多清理一次（force 时立即清理）
+        
+        Returns:
+            删除的键数
+        """
+        now = time.time()
+        if self.storage_type == 'vercel_kv' and self.kv:
+            return 0
+        if not force and now - StorageManager._export_jobs_swept_at < self.EXPORT_JOB_SWEEP_INTERVAL:
+            return 0
+        StorageManager._export_jobs_swept_at = now
+        
+        removed = 0
+        try:
+            if self.storage_type == 'memory':
+                with self._memory_lock:
+                    for key in [key for key, expires_at in self._memory_expiry.items() if expires_at <= now]:
+                        self._delete_data(key)
+                        removed += 1
+            elif os.path.isdir('data'):
+                for name in os.listdir('data'):
+                    file_path = os.path.join('data', name)
+                    if (name.startswith('export_job_') and name.endswith('.json')
+                            and os.path.getmtime(file_path) + self.EXPORT_JOB_TTL <= now):
+                        os.remove(file_path)
+                        removed += 1
+            if removed:
+                print(f"🧹 已清理 {removed} 个过期的导出任务数据")
+        except Exception as e:
+            print(f"清理过期导出任务失败: {e}")
+        return removed
+    
+    def _get_data(self, key: str) -> Any:
+        """按存储类型读取数据"""
+        if self.storage_type == 'vercel_kv' and self.kv:
+            return self._get_from_kv(key)
+        elif self.storage_type == 'memory':
+            return self._get_from_memory(key)
+        else:
+            return self._get_from_file(key)
+    
+    def _save_data(self, key: str, data: Any, ttl: Optional[int] = None) -> bool:
+        """按存储类型写入数据，ttl 为有效期（秒，KV 中自动过期，其他存储由清理任务删除）"""
+        if self.storage_type == 'vercel_kv' and self.kv:
+            return self._save_to_kv(key, data, ttl)
+        elif self.storage_type == 'memory':
+            with self._memory_lock:
+                if ttl:
+                    self._memory_expiry[key] = time.time() + ttl
+                return self._save_to_memory(key, data)
+        else:
+            return self._save_to_file(key, data)
+    
+    def _delete_data(self, key: str) -> bool:
+        """按存储类型删除数据"""
+        if self.storage_type == 'vercel_kv' and self.kv:
+            return self._delete_from_kv(key)
+        elif self.storage_type == 'memory':
+            with self._memory_lock:
+                self._memory_storage.pop(key, None)
+                self._memory_expiry.pop(key, None)
+                self._memory_versions[key] = self._memory_versions.get(key, 0) + 1
+            return True
+        else:
+            file_path = os.path.join('data', f'{key}.json')
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            return True
+    
+    def _get_versioned(self, key: str) -> Any:
+        """读取值和版本号，返回 (值, 版本号)，不存在时值为 None"""
+        if self.storage_type == 'vercel_kv' and self.kv:
+            value, version = self.kv.eval(self.KV_GET_VERSIONED_SCRIPT, [key, f'{key}:version'])
+            return self._decode_kv_value(value), version
+        elif self.storage_type == 'memory':
+            with self._memory_lock:
+                return copy.deepcopy(self._memory_storage.get(key)), self._memory_versions.get(key, 0)
+        else:
+            with self._locked_file(key):
+                file_path = os.path.join('data', f'{key}.json')
+                version = self._file_version(file_path)
+                if version is None:
+                    return None, None
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    return json.load(f), version
+    
+    def _compare_and_set(self, key: str, data: Any, version: Any, ttl: Optional[int] = None) -> bool:
+        """版本号仍为 version 时写入并返回 True，否则（其他写入已发生）返回 False"""
+        if self.storage_type == 'vercel_kv' and self.kv:
+            args = [version, json.dumps(data, ensure_ascii=False)] + ([int(ttl)] if ttl else [])
+            return bool(self.kv.eval(self.KV_COMPARE_AND_SET_SCRIPT, [key, f'{key}:version'], args))
+        elif self.storage_type == 'memory':
+            with self._memory_lock:
+                if self._memory_versions.get(key, 0) != version:
+                    return False
+                if ttl:
+                    self._memory_expiry[key] = time.time() + ttl
+                return self._save_to_memory(key, data)
+        else:
+            with self._locked_file(key):
+                file_path = os.path.join('data', f'{key}.json')
+                if self._file_version(file_path) != version:
+                    return False
+                self._write_file_atomically(file_path, data)
+                return True
+    
+    def _write_file_atomically(self, file_path: str, data: Any) -> None:
+        """先写临时文件再替换，读取方不会读到写了一半的文件，替换后 inode 也会变化"""
+        temp_path = f'{file_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, file_path)
+    
+    def _file_version(self, file_path: str) -> Any:
+        """文件存储的版本号：(inode, 修改时间, 大小)，文件不存在时为 None"""
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    @contextmanager
+    def _locked_file(self, key: str):
+        """文件存储条件写入的锁：进程内用线程锁，多进程之间用锁文件（支持 fcntl 时）"""
+        os.makedirs('data', exist_ok=True)
+        with self._file_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join('data', f'{key}.json.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
     def get_user_whitelist(self) -> Dict[str, Any]:
-        """获取用户白名单"""
+        """获取完整的用户白名单（读取全部用户，检查权限和分页展示请使用
+        check_user_access / list_whitelist_users）
+        
+        Returns:
+            {'allowed_users': [用户名], 'admin_users': [用户名]}
+        """
         try:
-            whitelist = None
-            
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
-                whitelist = self._get_from_kv('user_whitelist')
-            elif self.storage_type == 'memory':
-                whitelist = self._get_from_memory('user_whitelist')
+            if self.storage_type == 'vercel_kv' and self.kv:
+                self._ensure_whitelist_in_kv()
+                names, admins = self.kv.pipeline([['HGETALL', self.WHITELIST_NAMES_KEY],
+                                                  ['SMEMBERS', self.WHITELIST_ADMINS_KEY]])
+                users = self._hash_to_dict(names)
+                admins = set(admins or [])
             else:
-                whitelist = self._get_from_file('user_whitelist')
-            
-            # 如果 KV 中没有数据且本地有文件，自动同步到 KV
-            if whitelist is None and self.is_vercel:
-                print("⚠️ Vercel KV 中未找到用户白名单，尝试从环境变量初始化...")
-                # 从环境变量读取默认管理员
-                default_admin = os.getenv('DEFAULT_ADMIN_USER', '')
-                if default_admin:
-                    default_whitelist = {
-                        'allowed_users': [default_admin],
-                        'admin_users': [default_admin]
-                    }
-                    print(f"✅ 初始化默认管理员: {default_admin}")
-                    if self.save_user_whitelist(default_whitelist):
-                        print("✅ 用户白名单已自动初始化到 KV")
-                        return default_whitelist
-                
-                # 如果没有配置环境变量，返回空白名单
-                print("⚠️ 未配置 DEFAULT_ADMIN_USER 环境变量，返回空白名单")
-                return {'allowed_users': [], 'admin_users': []}
-            
-            return whitelist if whitelist is not None else {'allowed_users': [], 'admin_users': []}
+                whitelist = self._get_whitelist_doc()
+                users, admins = whitelist['users'], set(whitelist['admins'])
             
+            ordered = sorted(users)
+            return {
+                'allowed_users': [users[user] for user in ordered],
+                'admin_users': [users[user] for user in ordered if user in admins]
+            }
         except Exception as e:
             print(f"获取用户白名单失败: {e}")
             import traceback
             traceback.print_exc()
             return {'allowed_users': [], 'admin_users': []}
     
-    def save_user_whitelist(self, data: Dict[str, Any]) -> bool:
-        """保存用户白名单"""
+    def check_user_access(self, username: str) -> Dict[str, bool]:
+        """检查用户是否在白名单中、是否为管理员（O(1) 查找，KV 存储时只需一次往返）
+        
+        白名单为空时允许所有用户（向后兼容）
+        
+        Returns:
+            {'allowed': bool, 'admin': bool}
+        """
+        user = username.lower()
+        if self.storage_type == 'vercel_kv' and self.kv:
+            self._ensure_whitelist_in_kv()
+            count, score, is_admin = self.kv.pipeline([
+                ['ZCARD', self.WHITELIST_USERS_KEY],
+                ['ZSCORE', self.WHITELIST_USERS_KEY, user],
+                ['SISMEMBER', self.WHITELIST_ADMINS_KEY, user]
+            ])
+            return {'allowed': not count or score is not None, 'admin': bool(is_admin)}
+        
+        whitelist = self._get_whitelist_doc()
+        return {'allowed': not whitelist['users'] or user in whitelist['users'],
+                'admin': user in whitelist['admins']}
+    
+    def add_whitelist_users(self, users: Dict[str, bool]) -> Dict[str, Any]:
+        """批量添加用户到白名单
+        
+        Args:
+            users: {用户名: 是否为管理员}；已存在的用户不会被降为普通用户
+        
+        Returns:
+            {'success': True, 'added': 新增用户数} 或 {'success': False, 'error': ...}
+        """
         try:
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
-                return self._save_to_kv('user_whitelist', data)
-            elif self.storage_type == 'memory':
-                return self._save_to_memory('user_whitelist', data)
+            entries = {username.lower(): (username, is_admin) for username, is_admin in users.items() if username}
+            if self.storage_type == 'vercel_kv' and self.kv:
+                self._ensure_whitelist_in_kv()
+                added = 0
+                for batch in self._chunks(list(entries.items()), self.WHITELIST_BATCH_SIZE):
+                    commands = []
+                    for user, (username, is_admin) in batch:
+                        commands += [['ZADD', self.WHITELIST_USERS_KEY, 0, user],
+                                     ['HSETNX', self.WHITELIST_NAMES_KEY, user, username]]
+                        if is_admin:
+                            commands.append(['SADD', self.WHITELIST_ADMINS_KEY, user])
+                    added += sum(result for command, result in zip(commands, self.kv.pipeline(commands))
+                                 if command[0] == 'ZADD')
+                return {'success': True, 'added': added}
+            
+            def add_users(whitelist):
+                whitelist = self._normalize_whitelist(whitelist)
+                for user, (username, is_admin) in entries.items():
+                    if user not in whitelist['users']:
+                        added.append(user)
+                        whitelist['users'][user] = username
+                    if is_admin:
+                        whitelist['admins'][user] = whitelist['users'][user]
+                return whitelist
+            
+            added = []
+            self._update_data('user_whitelist', add_users)
+            return {'success': True, 'added': len(added)}
+        except Exception as e:
+            print(f"添加白名单用户失败: {e}")
+            return {'success': False, 'error': '保存用户白名单失败'}
+        finally:
+            # 白名单和管理员决定用户可见的仓库
+            self._notify_invalidation('repos')
+    
+    def remove_whitelist_users(self, usernames: List[str]) -> Dict[str, Any]:
+        """批量从白名单（包括管理员列表）中移除用户
+        
+        Returns:
+            {'success': True, 'removed': 移除的用户数} 或 {'success': False, 'error': ...}
+        """
+        try:
+            users = list(dict.fromkeys(username.lower() for username in usernames if username))
+            if self.storage_type == 'vercel_kv' and self.kv:
+                self._ensure_whitelist_in_kv()
+                removed = 0
+                for batch in self._chunks(users, self.WHITELIST_BATCH_SIZE):
+                    commands = [['ZREM', self.WHITELIST_USERS_KEY] + batch,
+                                ['HDEL', self.WHITELIST_NAMES_KEY] + batch,
+                                ['SREM', self.WHITELIST_ADMINS_KEY] + batch]
+                    removed += self.kv.pipeline(commands)[0]
+                return {'success': True, 'removed': removed}
+            
+            def remove_users(whitelist):
+                whitelist = self._normalize_whitelist(whitelist)
+                for user in users:
+                    if whitelist['users'].pop(user, None) is not None:
+                        removed.append(user)
+                    whitelist['admins'].pop(user, None)
+                return whitelist
+            
+            removed = []
+            self._update_data('user_whitelist', remove_users)
+            return {'success': True, 'removed': len(removed)}
+        except Exception as e:
+            print(f"移除白名单用户失败: {e}")
+            return {'success': False, 'error': '保存用户白名单失败'}
+        finally:
+            self._notify_invalidation('repos')
+    
+    def list_whitelist_users(self, page: int = 1, per_page: int = 50, query: str = '') -> Dict[str, Any]:
+        """按用户名排序分页列出白名单用户，query 为用户名前缀（不区分大小写）
+        
+        Returns:
+            {'users': [{'username', 'is_admin'}], 'total': 匹配的用户数, 'page', 'per_page',
+             'user_count': 用户总数, 'admin_count': 管理员总数}
+        """
+        page, per_page, query = max(page, 1), max(min(per_page, 500), 1), query.strip().lower()
+        start = (page - 1) * per_page
+        
+        if self.storage_type == 'vercel_kv' and self.kv:
+            self._ensure_whitelist_in_kv()
+            if query:
+                # 所有成员分数相同，按字典序范围查找前缀
+                lex_range = [f'[{query}', f'[{query}\xff']
+                page_command = ['ZRANGE', self.WHITELIST_USERS_KEY] + lex_range + ['BYLEX', 'LIMIT', start, per_page]
+                count_command = ['ZLEXCOUNT', self.WHITELIST_USERS_KEY] + lex_range
+            else:
+                page_command = ['ZRANGE', self.WHITELIST_USERS_KEY, start, start + per_page - 1]
+                count_command = ['ZCARD', self.WHITELIST_USERS_KEY]
+            users, total, user_count, admin_count = self.kv.pipeline([
+                page_command, count_command,
+                ['ZCARD', self.WHITELIST_USERS_KEY], ['SCARD', self.WHITELIST_ADMINS_KEY]
+            ])
+            users = users or []
+            if users:
+                names, admin_flags = self.kv.pipeline([['HMGET', self.WHITELIST_NAMES_KEY] + users,
+                                                       ['SMISMEMBER', self.WHITELIST_ADMINS_KEY] + users])
             else:
-                return self._save_to_file('user_whitelist', data)
+                names, admin_flags = [], []
+            page_users = [{'username': name or user, 'is_admin': bool(flag)}
+                          for user, name, flag in zip(users, names, admin_flags)]
+        else:
+            whitelist = self._get_whitelist_doc()
+            matched = sorted(user for user in whitelist['users'] if user.startswith(query))
+            total, user_count, admin_count = len(matched), len(whitelist['users']), len(whitelist['admins'])
+            page_users = [{'username': whitelist['users'][user], 'is_admin': user in whitelist['admins']}
+                          for user in matched[start:start + per_page]]
+        
+        return {
+            'users': page_users,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'user_count': user_count,
+            'admin_count': admin_count
+        }
+    
+    def save_user_whitelist(self, data: Dict[str, Any]) -> bool:
+        """整体替换用户白名单
+        
+        Args:
+            data: {'allowed_users': [用户名], 'admin_users': [用户名]}
+        """
+        try:
+            if self.storage_type == 'vercel_kv' and self.kv:
+                whitelist = self._normalize_whitelist(data)
+                # 原子替换：读取方不会看到清空后、导入前的空白名单（空白名单表示允许所有用户）
+                return self._replace_whitelist_in_kv(whitelist)
+            
+            self._update_data('user_whitelist', lambda _: self._normalize_whitelist(data))
+            return True
         except Exception as e:
             print(f"保存用户白名单失败: {e}")
             return False
+        finally:
+            self._notify_invalidation('repos')
+    
+    def _get_whitelist_doc(self) -> Dict[str, Any]:
+        """读取内存 / 文件存储的白名单文档（带进程内缓存）
+        
+        Returns:
+            {'users': {小写用户名: 用户名}, 'admins': {小写用户名: 用户名}}
+        """
+        return self._cached_read('user_whitelist', self._load_whitelist_doc)
+    
+    def _load_whitelist_doc(self) -> Dict[str, Any]:
+        """从内存 / 文件存储读取白名单文档（Vercel 环境下不存在时按 DEFAULT_ADMIN_USER 初始化）"""
+        whitelist = self._get_data('user_whitelist')
+        if whitelist:
+            return self._normalize_whitelist(whitelist)
+        
+        default_admin = os.getenv('DEFAULT_ADMIN_USER', '')
+        if self.is_vercel and default_admin:
+            print(f"✅ 初始化默认管理员: {default_admin}")
+            self.add_whitelist_users({default_admin: True})
+            return self._normalize_whitelist({'allowed_users': [default_admin], 'admin_users': [default_admin]})
+        return self._normalize_whitelist(None)
+    
+    def _normalize_whitelist(self, whitelist: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """将旧格式（两个用户名列表）转换为以小写用户名为键的文档"""
+        if not whitelist:
+            return {'users': {}, 'admins': {}}
+        if 'users' in whitelist:
+            return whitelist
+        
+        users = {user.lower(): user for user in whitelist.get('allowed_users', [])}
+        admins = {user.lower(): user for user in whitelist.get('admin_users', []) if user.lower() in users}
+        return {'users': users, 'admins': admins}
+    
+    def _ensure_whitelist_in_kv(self) -> None:
+        """将 KV 中旧的 user_whitelist 文档导入集合（所有实例中只执行一次，每个进程只检查一次）
+        
+        没有旧数据且在 Vercel 环境下时，按 DEFAULT_ADMIN_USER 初始化。
+        集合在临时键中构建完成后才与迁移标记一起原子生效，并发的实例只有一个能替换成功
+        """
+        if StorageManager._whitelist_ready:
+            return
+        if not self.kv.execute('EXISTS', self.WHITELIST_MIGRATED_KEY):
+            legacy = self._normalize_whitelist(self._get_from_kv('user_whitelist'))
+            default_admin = os.getenv('DEFAULT_ADMIN_USER', '')
+            if not legacy['users'] and self.is_vercel and default_admin:
+                print(f"✅ 初始化默认管理员: {default_admin}")
+                legacy = self._normalize_whitelist({'allowed_users': [default_admin], 'admin_users': [default_admin]})
+            if self._replace_whitelist_in_kv(legacy, only_if_unmigrated=True) and legacy['users']:
+                print(f"✅ 已将 {len(legacy['users'])} 个白名单用户导入 KV 集合")
+        StorageManager._whitelist_ready = True
+    
+    def _replace_whitelist_in_kv(self, whitelist: Dict[str, Any], only_if_unmigrated: bool = False) -> bool:
+        """在临时键中构建白名单集合，再用一个脚本原子替换正式键并设置迁移标记
+        
+        Args:
+            whitelist: {'users': {小写用户名: 用户名}, 'admins': {小写用户名: 用户名}}
+            only_if_unmigrated: 只在尚未迁移时替换（迁移旧数据时使用）
+        
+        Returns:
+            是否已替换
+        """
+        suffix = f':tmp:{uuid.uuid4().hex}'
+        keys = [self.WHITELIST_USERS_KEY, self.WHITELIST_NAMES_KEY, self.WHITELIST_ADMINS_KEY]
+        temp_keys = [key + suffix for key in keys]
+        for batch in self._chunks(sorted(whitelist['users'].items()), self.WHITELIST_BATCH_SIZE):
+            commands = [['ZADD', temp_keys[0]] + [part for user, _ in batch for part in (0, user)],
+                        ['HSET', temp_keys[1]] + [part for item in batch for part in item]]
+            admins = [user for user, _ in batch if user in whitelist['admins']]
+            if admins:
+                commands.append(['SADD', temp_keys[2]] + admins)
+            commands += [['EXPIRE', key, self.WHITELIST_TEMP_TTL] for key in temp_keys]
+            self.kv.pipeline(commands)
+        
+        return bool(self.kv.eval(self.WHITELIST_REPLACE_SCRIPT, keys + temp_keys + [self.WHITELIST_MIGRATED_KEY],
+                                 ['1' if only_if_unmigrated else '0']))
+    
+    def _chunks(self, items: List[Any], size: int) -> Any:
+        """按 size 分批"""
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
     
-    def get_user_stats(self) -> Dict[str, Any]:
-        """获取用户统计信息"""
+    def get_user_stats(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """获取完整的用户统计信息（force_refresh 时跳过进程内缓存）
+        
+        页面展示请使用 get_login_summary，只读取需要的汇总值
+        
+        Returns:
+            {'user_stats': {用户名: {login_count, last_login, first_login}}, 'total_logins': 次数,
+             'daily_stats' / 'weekly_stats' / 'monthly_stats': {时间段: {'logins': 次数}}}
+        """
         try:
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
-                return self._get_from_kv('user_stats')
-            elif self.storage_type == 'memory':
-                return self._get_from_memory('user_stats')
-            else:
-                return self._get_from_file('user_stats')
+            return self._cached_read('user_stats', self._load_user_stats, force_refresh)
         except Exception as e:
             print(f"获取用户统计信息失败: {e}")
             return {}
     
-    def save_user_stats(self, data: Dict[str, Any]) -> bool:
-        """保存用户统计信息"""
+    def _load_user_stats(self) -> Dict[str, Any]:
+        """从存储后端读取用户统计信息"""
+        if self.storage_type == 'vercel_kv' and self.kv:
+            self._ensure_login_counters_in_kv()
+            total, users, *rollups = self.kv.pipeline(
+                [['GET', self.LOGIN_TOTAL_KEY], ['SMEMBERS', self.LOGIN_USERS_KEY]]
+                + [['HGETALL', key] for key in self.LOGIN_ROLLUP_KEYS.values()])
+            users = sorted(users or [])
+            user_hashes = self.kv.pipeline([['HGETALL', self._login_user_key(user)] for user in users])
+            
+            user_stats = {}
+            for user, fields in zip(users, user_hashes):
+                fields = self._hash_to_dict(fields)
+                user_stats[user] = {
+                    'login_count': int(fields.get('login_count', 0)),
+                    'last_login': fields.get('last_login'),
+                    'first_login': fields.get('first_login')
+                }
+            stats = {'user_stats': user_stats, 'total_logins': int(total or 0)}
+            for period, fields in zip(self.LOGIN_ROLLUP_KEYS, rollups):
+                stats[f'{period}_stats'] = {bucket: {'logins': int(count)}
+                                            for bucket, count in self._hash_to_dict(fields).items()}
+            return stats
+        return self._get_data('user_stats') or {}
+    
+    def get_login_summary(self, usernames: List[str]) -> Dict[str, Any]:
+        """读取用户管理页面展示的登录汇总（不读取历史明细，KV 存储时只需一次往返）
+        
+        Returns:
+            {'total_logins', 'today_logins', 'week_logins', 'month_logins',
+             'user_stats': {用户名: {login_count, last_login}}}
+        """
+        import datetime
+        buckets = self._login_buckets(datetime.datetime.now())
+        summary = {'total_logins': 0, 'today_logins': 0, 'week_logins': 0, 'month_logins': 0, 'user_stats': {}}
+        
         try:
-            if self.storage_type == 'vercel_kv' and self.kv_url and self.kv_token:
-                return self._save_to_kv('user_stats', data)
-            elif self.storage_type == 'memory':
-                return self._save_to_memory('user_stats', data)
+            if self.storage_type == 'vercel_kv' and self.kv:
+                self._ensure_login_counters_in_kv()
+                results = self.kv.pipeline(
+                    [['GET', self.LOGIN_TOTAL_KEY]]
+                    + [['HGET', key, buckets[period]] for period, key in self.LOGIN_ROLLUP_KEYS.items()]
+                    + [['HMGET', self._login_user_key(user), 'login_count', 'last_login'] for user in usernames])
+                total, today, week, month = (int(value or 0) for value in results[:4])
+                user_stats = {user: {'login_count': int(fields[0] or 0), 'last_login': fields[1]}
+                              for user, fields in zip(usernames, results[4:]) if fields and fields[0]}
             else:
-                return self._save_to_file('user_stats', data)
+                stats = self.get_user_stats()
+                total = stats.get('total_logins', 0)
+                today, week, month = (stats.get(f'{period}_stats', {}).get(buckets[period], {}).get('logins', 0)
+                                      for period in self.LOGIN_ROLLUP_KEYS)
+                user_stats = {user: stats['user_stats'][user] for user in usernames
+                              if user in stats.get('user_stats', {})}
+            
+            summary.update({'total_logins': total, 'today_logins': today, 'week_logins': week,
+                            'month_logins': month, 'user_stats': user_stats})
         except Exception as e:
-            print(f"保存用户统计信息失败: {e}")
-            return False
+            print(f"获取登录汇总失败: {e}")
+        return summary
     
     def record_user_login(self, username: str) -> bool:
-        """记录用户登录"""
+        """记录用户登录
+        
+        同时累加按日 / 周 / 月的汇总；KV 存储使用原子计数（一次往返，与历史数据多少无关），
+        内存 / 文件存储在锁内原地累加。每天第一次记录时清理超过保留期限的按日 / 按周汇总
+        """
         try:
-            stats = self.get_user_stats()
-            
-            # 获取当前时间
             import datetime
             now = datetime.datetime.now()
-            today = now.strftime('%Y-%m-%d')
-            
-            # 初始化用户统计
-            if 'user_stats' not in stats:
-                stats['user_stats'] = {}
-            if 'daily_stats' not in stats:
-                stats['daily_stats'] = {}
-            if 'total_logins' not in stats:
-                stats['total_logins'] = 0
-            
-            # 更新用户统计
-            if username not in stats['user_stats']:
-                stats['user_stats'][username] = {
-                    'login_count': 0,
-                    'last_login': None,
-                    'first_login': None
-                }
-            
-            user_stat = stats['user_stats'][username]
-            user_stat['login_count'] += 1
-            user_stat['last_login'] = now.isoformat()
-            if not user_stat['first_login']:
-                user_stat['first_login'] = now.isoformat()
+            buckets = self._login_buckets(now)
             
-            # 更新总体统计
-            stats['total_logins'] += 1
-            
-            # 更新今日统计
-            if today not in stats['daily_stats']:
-                stats['daily_stats'][today] = {'logins': 0}
-            stats['daily_stats'][today]['logins'] += 1
-            
-            return self.save_user_stats(stats)
+            if self.storage_type == 'vercel_kv' and self.kv:
+                self._ensure_login_counters_in_kv()
+                user_key = self._login_user_key(username)
+                self.kv.pipeline([
+                    ['INCR', self.LOGIN_TOTAL_KEY],
+                    ['HINCRBY', user_key, 'login_count', 1],
+                    ['HSET', user_key, 'last_login', now.isoformat()],
+                    ['HSETNX', user_key, 'first_login', now.isoformat()],
+                    ['SADD', self.LOGIN_USERS_KEY, username]
+                ] + [['HINCRBY', key, buckets[period], 1] for period, key in self.LOGIN_ROLLUP_KEYS.items()])
+                if StorageManager._login_compacted_on != buckets['daily']:
+                    self._compact_login_stats_in_kv(now)
+                    StorageManager._login_compacted_on = buckets['daily']
+            elif self.storage_type == 'memory':
+                with self._memory_lock:
+                    stats = self._memory_storage.setdefault('user_stats', {})
+                    self._add_login(stats, username, now)
+                    self._memory_versions['user_stats'] = self._memory_versions.get('user_stats', 0) + 1
+            else:
+                with self._locked_file('user_stats'):
+                    stats = self._get_from_file('user_stats') or {}
+                    self._add_login(stats, username, now)
+                    self._write_file_atomically(os.path.join('data', 'user_stats.json'), stats)
             
+            self.invalidate_read_cache('user_stats')
+            return True
         except Exception as e:
             print(f"记录用户登录失败: {e}")
             return False
     
-    def _get_from_kv(self, key: str) -> Any:
-        """从 Vercel KV 获取数据"""
-        if not self.kv_url or not self.kv_token:
-            raise Exception("Vercel KV 配置不完整")
+    def _add_login(self, stats: Dict[str, Any], username: str, now: Any) -> None:
+        """在统计信息中记录一次登录（原地修改）"""
+        import datetime
+        buckets = self._login_buckets(now)
         
-        headers = {
-            'Authorization': f'Bearer {self.kv_token}',
-            'Content-Type': 'application/json'
+        user_stat = stats.setdefault('user_stats', {}).setdefault(username, {
+            'login_count': 0,
+            'last_login': None,
+            'first_login': None
+        })
+        user_stat['login_count'] += 1
+        user_stat['last_login'] = now.isoformat()
+        if not user_stat['first_login']:
+            user_stat['first_login'] = now.isoformat()
+        
+        stats['total_logins'] = stats.get('total_logins', 0) + 1
+        
+        # 旧数据只有按日统计，先补齐按周 / 按月汇总
+        if 'monthly_stats' not in stats:
+            for day, daily in stats.get('daily_stats', {}).items():
+                day_buckets = self._login_buckets(datetime.datetime.strptime(day, '%Y-%m-%d'))
+                for period in ('weekly', 'monthly'):
+                    bucket = stats.setdefault(f'{period}_stats', {}).setdefault(day_buckets[period], {'logins': 0})
+                    bucket['logins'] += daily.get('logins', 0)
+        
+        for period in self.LOGIN_ROLLUP_KEYS:
+            bucket = stats.setdefault(f'{period}_stats', {}).setdefault(buckets[period], {'logins': 0})
+            bucket['logins'] += 1
+        
+        if stats.get('compacted_on') != buckets['daily']:
+            cutoffs = self._login_retention_cutoffs(now)
+            for period, cutoff in cutoffs.items():
+                period_stats = stats[f'{period}_stats']
+                for bucket in [bucket for bucket in period_stats if bucket < cutoff]:
+                    del period_stats[bucket]
+            stats['compacted_on'] = buckets['daily']
+    
+    def _login_buckets(self, now: Any) -> Dict[str, str]:
+        """登录时间所属的日 / 周（ISO 周）/ 月汇总时间段，格式可以按字符串比较先后"""
+        year, week, _ = now.isocalendar()
+        return {
+            'daily': now.strftime('%Y-%m-%d'),
+            'weekly': f'{year}-W{week:02d}',
+            'monthly': now.strftime('%Y-%m')
         }
+    
+    def _login_retention_cutoffs(self, now: Any) -> Dict[str, str]:
+        """早于这些时间段的按日 / 按周汇总将被清理"""
+        import datetime
+        return {
+            'daily': self._login_buckets(now - datetime.timedelta(days=self.LOGIN_DAILY_RETENTION_DAYS))['daily'],
+            'weekly': self._login_buckets(now - datetime.timedelta(weeks=self.LOGIN_WEEKLY_RETENTION_WEEKS))['weekly']
+        }
+    
+    def _compact_login_stats_in_kv(self, now: Any) -> None:
+        """清理 KV 中超过保留期限的按日 / 按周汇总（所有实例中每天只有一个执行）"""
+        today = self._login_buckets(now)['daily']
+        if self.kv.execute('SET', f'login_compacted:{today}', '1', 'NX', 'EX', 2 * 24 * 3600) != 'OK':
+            return
         
-        response = requests.get(f"{self.kv_url}/get/{key}", headers=headers)
+        cutoffs = self._login_retention_cutoffs(now)
+        periods = list(cutoffs)
+        bucket_lists = self.kv.pipeline([['HKEYS', self.LOGIN_ROLLUP_KEYS[period]] for period in periods])
+        commands = []
+        for period, buckets in zip(periods, bucket_lists):
+            expired = [bucket for bucket in buckets or [] if bucket < cutoffs[period]]
+            if expired:
+                commands.append(['HDEL', self.LOGIN_ROLLUP_KEYS[period], *expired])
+        if commands:
+            self.kv.pipeline(commands)
+            print(f"🧹 已清理 {sum(len(command) - 2 for command in commands)} 个过期的登录汇总")
+    
+    def _login_user_key(self, username: str) -> str:
+        """KV 中单个用户登录计数的哈希键"""
+        return f'login_user:{username}'
+    
+    def _hash_to_dict(self, fields: Optional[List[str]]) -> Dict[str, str]:
+        """HGETALL 返回 [field, value, ...]，转换为字典"""
+        fields = fields or []
+        return dict(zip(fields[0::2], fields[1::2]))
+    
+    def _ensure_login_counters_in_kv(self) -> None:
+        """将旧的 user_stats 文档并入 KV 计数（所有实例中只执行一次，每个进程只检查一次）
         
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('result'):
-                return json.loads(result['result'])
-            return None
-        elif response.status_code == 404:
-            return None
-        else:
-            raise Exception(f"KV 读取失败: HTTP {response.status_code}")
+        用 INCRBY / HSETNX 合并，迁移期间发生的登录不会被覆盖；迁移标记与合并在同一个脚本中执行
+        """
+        if StorageManager._login_counters_ready:
+            return
+        import datetime
+        if self.kv.get(self.LOGIN_MIGRATED_KEY) is None:
+            legacy = self._get_from_kv('user_stats') or {}
+            commands = []
+            if legacy.get('total_logins'):
+                commands.append(['INCRBY', self.LOGIN_TOTAL_KEY, legacy['total_logins']])
+            for user, stat in legacy.get('user_stats', {}).items():
+                user_key = self._login_user_key(user)
+                commands += [['SADD', self.LOGIN_USERS_KEY, user],
+                             ['HINCRBY', user_key, 'login_count', stat.get('login_count', 0)]]
+                commands += [['HSETNX', user_key, field, stat[field]]
+                             for field in ('last_login', 'first_login') if stat.get(field)]
+            for day, daily in legacy.get('daily_stats', {}).items():
+                # 旧数据只有按日统计，同时计入按周 / 按月汇总
+                day_buckets = self._login_buckets(datetime.datetime.strptime(day, '%Y-%m-%d'))
+                commands += [['HINCRBY', key, day_buckets[period], daily.get('logins', 0)]
+                             for period, key in self.LOGIN_ROLLUP_KEYS.items()]
+            
+            args = [part for command in commands for part in [command[0], len(command) - 2] + command[2:]]
+            migrated = self.kv.eval(self.LOGIN_MIGRATE_SCRIPT,
+                                    [self.LOGIN_MIGRATED_KEY] + [command[1] for command in commands], args)
+            if migrated and commands:
+                print(f"✅ 已将 {len(legacy.get('user_stats', {}))} 个用户的登录统计迁移为 KV 计数")
+        StorageManager._login_counters_ready = True
     
-    def _save_to_kv(self, key: str, data: Any) -> bool:
-        """保存数据到 Vercel KV"""
-        if not self.kv_url or not self.kv_token:
+    def _get_from_kv(self, key: str) -> Any:
+        """从 Vercel KV 获取数据"""
+        if not self.kv:
             raise Exception("Vercel KV 配置不完整")
         
-        headers = {
-            'Authorization': f'Bearer {self.kv_token}',
-            'Content-Type': 'application/json'
-        }
+        return self._decode_kv_value(self.kv.get(key))
+    
+    def _save_to_kv(self, key: str, data: Any, ttl: Optional[int] = None) -> bool:
+        """保存数据到 Vercel KV（指定 ttl 时 ttl 秒后自动过期）"""
+        if not self.kv:
+            raise Exception("Vercel KV 配置不完整")
         
-        payload = {
-            'value': json.dumps(data, ensure_ascii=False)
-        }
+        if ttl:
+            return self.kv.execute('SET', key, json.dumps(data, ensure_ascii=False), 'EX', ttl) == 'OK'
+        return self.kv.set(key, json.dumps(data, ensure_ascii=False))
+    
+    def _delete_from_kv(self, key: str) -> bool:
+        """从 Vercel KV 删除数据"""
+        if not self.kv:
+            raise Exception("Vercel KV 配置不完整")
         
-        response = requests.post(f"{self.kv_url}/set/{key}", 
-                               headers=headers, 
-                               json=payload)
+        self.kv.delete(key)
+        return True
+    
+    def _decode_kv_value(self, value: Optional[str]) -> Any:
+        """解析 KV 中保存的 JSON
         
-        return response.status_code == 200
+        早期版本通过 /set/<key> 写入 {"value": "<JSON>"}，读取时解开这一层
+        """
+        if not value:
+            return None
+        data = json.loads(value)
+        if isinstance(data, dict) and list(data.keys()) == ['value'] and isinstance(data['value'], str):
+            try:
+                return json.loads(data['value'])
+            except ValueError:
+                return data
+        return data
     
     def _get_from_env(self, key: str) -> Any:
         """从环境变量获取数据（降级方案）"""
@@ -421,24 +1606,13 @@ class StorageManager:
         except json.JSONDecodeError:
             return {}
     
-    def _get_expiry_time(self, ttl: int) -> int:
-        """获取过期时间戳"""
-        import time
-        return int(time.time()) + ttl
-    
-    def clear_expired_cache(self) -> bool:
-        """清理过期的缓存数据"""
+    def clear_expired_cache(self) -> int:
+        """清理过期的缓存数据，返回清理的数量（KV 中的缓存由 KV 自动过期）"""
         try:
-            if self.storage_type != 'vercel_kv':
-                return False
-            
-            # 获取所有缓存键
-            # 这里需要实现获取所有键的逻辑
-            # 由于 Vercel KV 的限制，可能需要手动管理缓存键
-            return True
+            return self._get_cache_tier().purge_expired()
         except Exception as e:
             print(f"清理缓存失败: {e}")
-            return False
+            return 0
     
     def _get_from_file(self, key: str) -> Any:
         """从本地文件获取数据（降级方案）"""
@@ -478,75 +1652,115 @@ class StorageManager:
             return False
     
     def _get_from_memory(self, key: str) -> Any:
-        """从内存获取数据"""
-        return self._memory_storage.get(key, self._fallback_data if key == 'repos' else {})
+        """从内存获取数据（返回副本，与读取其他存储后端一样不共享对象）"""
+        with self._memory_lock:
+            if key not in self._memory_storage:
+                return copy.deepcopy(self._fallback_data) if key == 'repos' else {}
+            return copy.deepcopy(self._memory_storage[key])
     
     def _save_to_memory(self, key: str, data: Any) -> bool:
         """保存数据到内存"""
         try:
-            self._memory_storage[key] = data
+            with self._memory_lock:
+                self._memory_storage[key] = copy.deepcopy(data)
+                self._memory_versions[key] = self._memory_versions.get(key, 0) + 1
             return True
         except Exception as e:
             print(f"保存数据到内存失败: {e}")
             return False
     
     def _get_from_blob(self, key: str) -> Any:
-        """从 Vercel Blob 获取数据"""
+        """从 Vercel Blob 获取数据
+        
+        缓存的 URL 未过期（BLOB_URL_TTL）时直接下载；没有 URL、已过期或已失效时按 pathname 前缀分页列出查找，
+        以便读到其他实例上传的新版本。
+        整个读取过程不超过 BLOB_READ_DEADLINE 秒，失败时不等待重试，
+        而是返回上一次成功读取（或写入）的值
+        """
         if not self.blob_token:
             print("Vercel Blob token 未配置，使用降级存储")
             return self._get_from_memory(key)
         
-        max_retries = 10  # 增加重试次数
-        retry_delay = 2.0  # 从2秒开始
+        pathname = f"{key}.json"
+        deadline = time.monotonic() + self.BLOB_READ_DEADLINE
+        default = self._fallback_data if key == 'repos' else {}
         
-        for attempt in range(max_retries):
-            try:
-                # 使用 Vercel Blob REST API 获取文件列表
-                headers = {
-                    'Authorization': f'Bearer {self.blob_token}'
-                }
-                
-                list_url = 'https://blob.vercel-storage.com/'
-                response = requests.get(list_url, headers=headers)
-                
-                if response.status_code == 200:
-                    blobs_data = response.json()
-                    target_filename = f"{key}.json"
-                    
-                    # 查找对应的文件
-                    for blob in blobs_data.get('blobs', []):
-                        if blob.get('pathname') == target_filename:
-                            # 下载并解析 JSON 数据
-                            file_response = requests.get(blob['url'])
-                            if file_response.status_code == 200:
-                                data = file_response.json()
-                                repo_count = len(data.get('repositories', []))
-                                print(f"Blob 读取成功 (尝试 {attempt + 1}/{max_retries}): {repo_count} 个仓库")
-                                
-                                # 如果是第一次读取，记录仓库列表用于调试
-                                if attempt == 0:
-                                    repo_names = [repo.get('full_name') for repo in data.get('repositories', [])]
-                                    print(f"当前仓库列表: {repo_names}")
-                                
-                                return data
-                
-                # 如果没找到文件，返回默认数据
-                if attempt == max_retries - 1:
-                    print(f"Blob 读取失败，已达到最大重试次数")
-                    return self._fallback_data if key == 'repos' else {}
-                
-                print(f"Blob 读取失败，等待 {retry_delay}s 后重试 (尝试 {attempt + 1}/{max_retries})")
-                import time
-                time.sleep(retry_delay)
-                retry_delay = min(retry_delay * 1.5, 30.0)  # 更温和的指数退避，最大30秒
-                
-            except Exception as e:
-                print(f"从 Blob 读取数据失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    return self._fallback_data if key == 'repos' else {}
-                import time
-                time.sleep(retry_delay)
-                retry_delay = min(retry_delay * 1.5, 30.0)
+        try:
+            url, expires_at = self._blob_urls.get(pathname, (None, 0))
+            if url and expires_at > time.monotonic():
+                data = self._download_blob(url, deadline)
+                if data is not None:
+                    self._blob_last_good[key] = copy.deepcopy(data)
+                    return data
+                # URL 已失效（文件被删除或重新上传），重新查找
+                self._blob_urls.pop(pathname, None)
+            
+            url = self._find_blob_url(pathname, deadline)
+            if url is None:
+                # 文件不存在（从未写入过）
+                return self._blob_last_good.get(key, default)
+            
+            data = self._download_blob(url, deadline)
+            if data is not None:
+                return self._remember_blob(key, pathname, url, data)
+            print(f"⚠️ Blob 文件 {pathname} 下载失败，使用上一次读取的数据")
+        except Exception as e:
+            print(f"⚠️ 从 Blob 读取 {pathname} 失败，使用上一次读取的数据: {e}")
+        
+        if key not in self._blob_last_good:
+            # 没有可用的旧数据时抛出异常，避免把默认数据当作真实数据缓存和写回
+            raise Exception(f"Blob 读取 {pathname} 失败，且没有可用的旧数据")
+        return self._blob_last_good[key]
+    
+    def _blob_timeout(self, deadline: float) -> float:
+        """单个 Blob 请求的超时时间（不超过剩余的总时限）"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Blob 读取超过总时限")
+        return min(remaining, self.BLOB_REQUEST_TIMEOUT)
+    
+    def _find_blob_url(self, pathname: str, deadline: float) -> Optional[str]:
+        """按 pathname 前缀分页列出 Blob，返回完全匹配的最新文件 URL"""
+        headers = {
+            'Authorization': f'Bearer {self.blob_token}'
+        }
+        params = {'prefix': pathname, 'limit': 100}
+        latest = None
+        
+        while True:
+            response = self._blob_session.get('https://blob.vercel-storage.com/', headers=headers,
+                                              params=params, timeout=self._blob_timeout(deadline))
+            if response.status_code != 200:
+                raise Exception(f"Blob 列表请求失败: HTTP {response.status_code}")
+            
+            result = response.json()
+            for blob in result.get('blobs', []):
+                if blob.get('pathname') == pathname and (
+                        latest is None or blob.get('uploadedAt', '') > latest.get('uploadedAt', '')):
+                    latest = blob
+            
+            if not result.get('hasMore') or not result.get('cursor'):
+                break
+            params['cursor'] = result['cursor']
+        
+        return latest['url'] if latest else None
+    
+    def _download_blob(self, url: str, deadline: float) -> Any:
+        """下载并解析 Blob 文件，文件不存在时返回 None（带随机查询参数，绕过 CDN 缓存）"""
+        response = self._blob_session.get(url, headers={'Cache-Control': 'no-cache'},
+                                          params={'v': time.time_ns()},
+                                          timeout=self._blob_timeout(deadline))
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise Exception(f"Blob 下载失败: HTTP {response.status_code}")
+        return response.json()
+    
+    def _remember_blob(self, key: str, pathname: str, url: str, data: Any) -> Any:
+        """记录 Blob 的 URL（BLOB_URL_TTL 秒内有效）和最近一次成功读取的数据"""
+        self._blob_urls[pathname] = (url, time.monotonic() + self.BLOB_URL_TTL)
+        self._blob_last_good[key] = copy.deepcopy(data)
+        return data
     
     def _save_to_blob(self, key: str, data: Any) -> bool:
         """保存数据到 Vercel Blob"""
@@ -567,14 +1781,21 @@ class StorageManager:
             filename = f"{key}.json"
             upload_url = f'https://blob.vercel-storage.com/{filename}'
             
-            response = requests.put(
+            response = self._blob_session.put(
                 upload_url,
                 headers=headers,
-                data=json_data.encode('utf-8')
+                data=json_data.encode('utf-8'),
+                timeout=self.BLOB_REQUEST_TIMEOUT
             )
             
             if response.status_code in [200, 201]:
                 print(f"数据成功保存到 Blob: {filename}")
+                # 上传响应中包含文件 URL，之后可以直接读取
+                url = response.json().get('url')
+                if url:
+                    self._remember_blob(key, filename, url, data)
+                else:
+                    self._blob_last_good[key] = copy.deepcopy(data)
                 return True
             else:
                 print(f"保存到 Blob 失败: HTTP {response.status_code}")
@@ -583,3 +1804,19 @@ class StorageManager:
         except Exception as e:
             print(f"保存数据到 Blob 失败: {e}")
             return False
+
+# 进程内共享的存储管理器
+_storage_instance: Optional[StorageManager] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageManager:
+    """获取进程内共享的 StorageManager（首次调用时创建并打印配置）"""
+    global _storage_instance
+    if _storage_instance is None:
+        with _storage_lock:
+            if _storage_instance is None:
+                instance = StorageManager()
+                instance.log_config()
+                _storage_instance = instance
+    return _storage_instance
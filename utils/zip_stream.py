@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式 ZIP 写出
+边生成条目内容边产出压缩后的字节块，不需要先在内存或磁盘中拼出完整的压缩包；
+大量小文件可以在工作线程中并行 deflate（zlib 压缩时会释放 GIL）
+"""
+
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Tuple, Union
+
+# 超过该值的偏移量 / 条目数需要 ZIP64 记录
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+
+# 通用标志位：bit 3 表示大小和 CRC 写在数据之后的数据描述符中，bit 11 表示文件名为 UTF-8
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+
+def _dos_datetime(timestamp: float) -> Tuple[int, int]:
+    """转换为 ZIP 使用的 DOS 日期和时间"""
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((max(t.tm_year, 1980) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+def deflate(data: bytes, compresslevel: int = 6) -> Tuple[bytes, int, int]:
+    """对完整内容做 raw deflate
+
+    Returns:
+        (压缩数据, CRC32, 原始大小)
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(), zlib.crc32(data), len(data)
+
+
+class ZipStreamWriter:
+    """只追加写出的 ZIP 编码器，每个方法返回需要写出的字节"""
+
+    def __init__(self, compresslevel: int = 6):
+        self.compresslevel = compresslevel
+        self.offset = 0
+        self.entries: List[Tuple[bytes, int, int, int, int, int, int, int]] = []
+        self.dos_time, self.dos_date = _dos_datetime(time.time())
+
+    def _local_header(self, name: bytes, flags: int, crc: int, compressed_size: int, size: int) -> bytes:
+        return struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, flags, zlib.DEFLATED,
+                           self.dos_time, self.dos_date, crc, compressed_size, size, len(name), 0) + name
+
+    def _add_entry(self, name: bytes, flags: int, crc: int, compressed_size: int, size: int, offset: int) -> None:
+        if compressed_size >= ZIP64_LIMIT or size >= ZIP64_LIMIT:
+            raise ValueError(f'ZIP 条目过大: {name.decode("utf-8")}')
+        self.entries.append((name, flags, crc, compressed_size, size, offset, self.dos_time, self.dos_date))
+
+    def write_compressed(self, name: str, compressed: bytes, crc: int, size: int) -> bytes:
+        """写出一个已经 deflate 的条目（大小已知，不需要数据描述符）"""
+        encoded = name.encode('utf-8')
+        header = self._local_header(encoded, FLAG_UTF8, crc, len(compressed), size)
+        self._add_entry(encoded, FLAG_UTF8, crc, len(compressed), size, self.offset)
+        self.offset += len(header) + len(compressed)
+        return header + compressed
+
+    def write_stream(self, name: str, chunks: Iterable[Union[str, bytes]]) -> Iterator[bytes]:
+        """边读取边压缩写出一个条目，大小和 CRC 写在末尾的数据描述符中"""
+        encoded = name.encode('utf-8')
+        flags = FLAG_UTF8 | FLAG_DATA_DESCRIPTOR
+        offset = self.offset
+
+        header = self._local_header(encoded, flags, 0, 0, 0)
+        self.offset += len(header)
+        yield header
+
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+        crc = 0
+        size = 0
+        compressed_size = 0
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                compressed_size += len(data)
+                yield data
+
+        data = compressor.flush()
+        compressed_size += len(data)
+        descriptor = struct.pack('<IIII', 0x08074b50, crc, compressed_size, size)
+        self.offset += compressed_size + len(descriptor)
+        self._add_entry(encoded, flags, crc, compressed_size, size, offset)
+        yield data + descriptor
+
+    def finish(self) -> bytes:
+        """写出中央目录和结束记录（条目数或偏移量超限时附带 ZIP64 记录）"""
+        directory = []
+        for name, flags, crc, compressed_size, size, offset, dos_time, dos_date in self.entries:
+            extra = b''
+            if offset >= ZIP64_LIMIT:
+                extra = struct.pack('<HHQ', 0x0001, 8, offset)
+                offset = ZIP64_LIMIT
+            version = 45 if extra else 20
+            directory.append(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | version, version, flags, zlib.DEFLATED,
+                dos_time, dos_date, crc, compressed_size, size, len(name), len(extra), 0, 0, 0,
+                0o100644 << 16, offset) + name + extra)
+
+        directory = b''.join(directory)
+        count = len(self.entries)
+        directory_offset = self.offset
+        end = b''
+
+        if count >= ZIP64_COUNT_LIMIT or directory_offset >= ZIP64_LIMIT:
+            zip64_offset = directory_offset + len(directory)
+            end += struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                               count, count, len(directory), directory_offset)
+            end += struct.pack('<IIQI', 0x07064b50, 0, zip64_offset, 1)
+            count = min(count, ZIP64_COUNT_LIMIT)
+            directory_offset = min(directory_offset, ZIP64_LIMIT)
+
+        end += struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, count, count,
+                           len(directory), directory_offset, 0)
+        self.offset += len(directory) + len(end)
+        return directory + end
+
+
+def stream_zip(entries: Iterable[Tuple[str, Iterable[Union[str, bytes]]]],
+               compresslevel: int = 6) -> Iterator[bytes]:
+    """将 (文件名, 内容块迭代器) 序列写出为 ZIP 字节流
+
+    entries 可以是生成器，后面的条目（如清单文件）可以依赖前面条目写出时累计的统计
+
+    Args:
+        entries: 条目序列，内容块为 str 时按 UTF-8 编码
+        compresslevel: deflate 压缩级别
+
+    Yields:
+        ZIP 文件的字节块
+    """
+    writer = ZipStreamWriter(compresslevel)
+    for name, chunks in entries:
+        yield from writer.write_stream(name, chunks)
+    yield writer.finish()
+
+
+def stream_zip_files(files: Iterable[Tuple[str, Union[str, bytes]]], compresslevel: int = 6,
+                     workers: int = 4) -> Iterator[bytes]:
+    """将大量小文件写出为 ZIP 字节流，文件内容在工作线程中并行压缩
+
+    同时最多有 workers * 2 个文件在压缩或等待写出，条目顺序与输入顺序一致
+
+    Args:
+        files: (文件名, 完整内容) 序列，可以是生成器
+        compresslevel: deflate 压缩级别
+        workers: 压缩线程数，为 0 时在当前线程压缩
+
+    Yields:
+        ZIP 文件的字节块
+    """
+    writer = ZipStreamWriter(compresslevel)
+
+    def encode(content):
+        return content.encode('utf-8') if isinstance(content, str) else content
+
+    if workers <= 0:
+        for name, content in files:
+            yield writer.write_compressed(name, *deflate(encode(content), compresslevel))
+        yield writer.finish()
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for name, content in files:
+            pending.append((name, executor.submit(deflate, encode(content), compresslevel)))
+            if len(pending) >= workers * 2:
+                name, future = pending.popleft()
+                yield writer.write_compressed(name, *future.result())
+
+        while pending:
+            name, future = pending.popleft()
+            yield writer.write_compressed(name, *future.result())
+
+    yield writer.finish()